@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import os
+import threading
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import json_codec
+
+logger = logging.getLogger(__name__)
+
+OUTCOME_OK = "ok"
+OUTCOME_THROTTLED = "throttled"
+OUTCOME_TIMEOUT = "timeout"
+OUTCOME_ERROR = "error"
+# HTTP 404/410: the product is gone. The host answered normally, so it is not an error signal.
+OUTCOME_GONE = "gone"
+# The slot was released without sending (e.g. the circuit breaker opened); not a sample.
+OUTCOME_SKIPPED = "skipped"
+
+ANSWERED_OUTCOMES = (OUTCOME_OK, OUTCOME_GONE)
+
+DEFAULT_METRICS_FILENAME = "fetch_concurrency.json"
+MAX_RECORDED_CHANGES = 50
+
+
+def _utc_now_iso() -> str:
+    return datetime.now(timezone.utc).replace(microsecond=0).isoformat().replace("+00:00", "Z")
+
+
+@dataclass
+class AdaptiveSettings:
+    min_limit: int = 1
+    max_limit: int = 32
+    initial_limit: int = 4
+    target_p95_seconds: float = 3.0
+    max_error_rate: float = 0.05
+    window: int = 20
+    backoff_factor: float = 0.5
+    latency_backoff_factor: float = 0.75
+
+
+class AdaptiveConcurrencyController:
+    """
+    AIMD limit on in-flight product fetches.
+
+    Every `window` completed requests the limit grows by one while p95 latency and the error rate
+    stay under their targets (404/410 answers are not errors), and shrinks by
+    `latency_backoff_factor` when either is too high. HTTP 429/403 and timeouts cut it immediately
+    by `backoff_factor` (at most once per window, so a burst of failures from requests already in
+    flight counts as one signal).
+    """
+
+    def __init__(self, settings: AdaptiveSettings) -> None:
+        self.settings = settings
+        self.limit = max(settings.min_limit, min(settings.max_limit, settings.initial_limit))
+        self.in_flight = 0
+        self.changes: List[Dict[str, Any]] = []
+        self.samples_total = 0
+        self._cond = threading.Condition()
+        self._async_cond: Optional[asyncio.Condition] = None
+        self._window: Deque[Tuple[float, str]] = deque()
+        self._since_cut = settings.window
+        self._last_p95: Optional[float] = None
+        self._last_error_rate = 0.0
+
+    def _set_limit(self, new_limit: int, reason: str) -> None:
+        new_limit = max(self.settings.min_limit, min(self.settings.max_limit, int(new_limit)))
+        if new_limit == self.limit:
+            return
+        logger.info(f"Fetch concurrency {self.limit} -> {new_limit}: {reason}")
+        self.changes.append({"at": _utc_now_iso(), "from": self.limit, "to": new_limit, "reason": reason})
+        del self.changes[:-MAX_RECORDED_CHANGES]
+        self.limit = new_limit
+
+    def _record(self, latency: float, outcome: str) -> None:
+        s = self.settings
+        self.samples_total += 1
+        self._since_cut += 1
+        self._window.append((latency, outcome))
+
+        if outcome in (OUTCOME_THROTTLED, OUTCOME_TIMEOUT):
+            if self._since_cut >= s.window:
+                label = "HTTP 429/403" if outcome == OUTCOME_THROTTLED else "timeout"
+                self._set_limit(math.floor(self.limit * s.backoff_factor), f"{label} (multiplicative decrease)")
+                self._since_cut = 0
+                self._window.clear()
+            return
+
+        if len(self._window) < s.window:
+            return
+        latencies = sorted(lat for lat, o in self._window if o in ANSWERED_OUTCOMES)
+        errors = sum(1 for _, o in self._window if o not in ANSWERED_OUTCOMES)
+        error_rate = errors / len(self._window)
+        p95 = latencies[min(len(latencies) - 1, int(math.ceil(0.95 * len(latencies))) - 1)] if latencies else None
+        self._last_p95 = p95
+        self._last_error_rate = error_rate
+        self._window.clear()
+
+        if p95 is not None and p95 > s.target_p95_seconds:
+            self._set_limit(math.floor(self.limit * s.latency_backoff_factor), f"p95 {p95:.2f}s > target {s.target_p95_seconds:.2f}s")
+        elif error_rate > s.max_error_rate:
+            self._set_limit(math.floor(self.limit * s.latency_backoff_factor), f"error rate {error_rate:.0%} > {s.max_error_rate:.0%}")
+        elif self.in_flight + 1 >= self.limit:
+            # Only grow when the current limit is actually being used.
+            self._set_limit(self.limit + 1, f"healthy (p95 {p95 or 0:.2f}s, error rate {error_rate:.0%}; additive increase)")
+
+    def acquire(self) -> None:
+        with self._cond:
+            while self.in_flight >= self.limit:
+                self._cond.wait()
+            self.in_flight += 1
+
+    def release(self, latency: float, outcome: str) -> None:
+        with self._cond:
+            self.in_flight -= 1
+            if outcome != OUTCOME_SKIPPED:
+                self._record(latency, outcome)
+            self._cond.notify_all()
+
+    async def acquire_async(self) -> None:
+        if self._async_cond is None:
+            self._async_cond = asyncio.Condition()
+        async with self._async_cond:
+            await self._async_cond.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+
+    async def release_async(self, latency: float, outcome: str) -> None:
+        assert self._async_cond is not None
+        async with self._async_cond:
+            self.in_flight -= 1
+            if outcome != OUTCOME_SKIPPED:
+                self._record(latency, outcome)
+            self._async_cond.notify_all()
+
+    def summary(self) -> str:
+        p95 = f"{self._last_p95:.2f}s" if self._last_p95 is not None else "n/a"
+        return (
+            f"limit={self.limit} (min={self.settings.min_limit} max={self.settings.max_limit}) "
+            f"changes={len(self.changes)} samples={self.samples_total} last_p95={p95} last_error_rate={self._last_error_rate:.0%}"
+        )
+
+    def export(self, path: str) -> None:
+        previous: Dict[str, Any] = {}
+        try:
+            loaded = json_codec.load_file(path)
+            previous = loaded if isinstance(loaded, dict) else {}
+        except Exception:
+            pass
+        history = [c for c in (previous.get("changes") or []) if isinstance(c, dict)] + self.changes
+        json_codec.dump_file(
+            path,
+            {
+                "updated_at": _utc_now_iso(),
+                "limit": self.limit,
+                "min_limit": self.settings.min_limit,
+                "max_limit": self.settings.max_limit,
+                "samples": self.samples_total,
+                "last_p95_seconds": self._last_p95,
+                "last_error_rate": self._last_error_rate,
+                "changes": history[-MAX_RECORDED_CHANGES:],
+            },
+            pretty=True,
+        )
+
+
+def load_exported_limit(path: str) -> Optional[int]:
+    if not os.path.exists(path):
+        return None
+    try:
+        data = json_codec.load_file(path)
+        return int(data.get("limit")) if isinstance(data, dict) and data.get("limit") else None
+    except Exception:
+        return None
+
+
+def build_controller(
+    cfg: Optional[Dict[str, Any]],
+    *,
+    initial_limit: int,
+    max_limit: int,
+    metrics_path: str,
+) -> Optional[AdaptiveConcurrencyController]:
+    cfg = cfg if isinstance(cfg, dict) else {}
+    if not bool(cfg.get("enabled", False)):
+        return None
+    settings = AdaptiveSettings(
+        min_limit=max(1, int(cfg.get("min") or 1)),
+        max_limit=max(1, int(cfg.get("max") or max_limit)),
+        initial_limit=int(cfg.get("initial") or load_exported_limit(metrics_path) or initial_limit),
+        target_p95_seconds=float(cfg.get("target_p95_seconds") or AdaptiveSettings.target_p95_seconds),
+        max_error_rate=float(cfg.get("max_error_rate") if cfg.get("max_error_rate") is not None else AdaptiveSettings.max_error_rate),
+        window=max(1, int(cfg.get("window") or AdaptiveSettings.window)),
+        backoff_factor=float(cfg.get("backoff_factor") or AdaptiveSettings.backoff_factor),
+        latency_backoff_factor=float(cfg.get("latency_backoff_factor") or AdaptiveSettings.latency_backoff_factor),
+    )
+    settings.min_limit = min(settings.min_limit, settings.max_limit)
+    return AdaptiveConcurrencyController(settings)
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: `__NEXT_DATA__` extraction from text vs from raw bytes.
+
+Three paths per page and Content-Type:
+- `resp.text`: what the fetchers used before. With no Content-Type `requests` runs charset detection
+  over the whole body; with `text/html` and no charset it decodes as ISO-8859-1, so non-ASCII product
+  names come out as mojibake.
+- `utf-8`: `resp.content.decode("utf-8")` + the str regex, the fair baseline for a correct decode.
+- `bytes`: `bytes.find` on `resp.content`, decoding only the JSON slice (what the fetchers use now).
+
+`same` reports whether `resp.text` yields the same product as the bytes path; the non-ASCII fixture
+shows where the two differ.
+
+Run from the repo root with saved product pages (see bench_next_data.py for how to save them):
+  python3 benchmarks/bench_decode.py data/pages/*.html
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Callable, List, Tuple
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import watch_stock  # noqa: E402
+from bench_next_data import synthetic_page  # noqa: E402
+
+
+def make_response(raw: bytes, content_type: str) -> requests.Response:
+    resp = requests.Response()
+    resp.status_code = 200
+    resp._content = raw
+    if content_type:
+        resp.headers["Content-Type"] = content_type
+    resp.encoding = requests.utils.get_encoding_from_headers(resp.headers)
+    return resp
+
+
+def text_path(raw: bytes, content_type: str) -> object:
+    return watch_stock.extract_next_data(make_response(raw, content_type).text)
+
+
+def utf8_path(raw: bytes, content_type: str) -> object:
+    return watch_stock.extract_next_data(make_response(raw, content_type).content.decode("utf-8"))
+
+
+def bytes_path(raw: bytes, content_type: str) -> object:
+    return watch_stock.extract_next_data_bytes(make_response(raw, content_type).content)
+
+
+def non_ascii_page() -> Tuple[str, bytes]:
+    # Next.js embeds __NEXT_DATA__ as raw UTF-8, not \u escapes.
+    product = {
+        "id": "non-ascii",
+        "name": "Beta Jacket – Édition été",
+        "variants": [{"sizeId": str(i % 20), "colourName": "Noir/Grès", "stockStatus": "InStock"} for i in range(400)],
+    }
+    next_data = json.dumps({"props": {"pageProps": {"product": json.dumps(product, ensure_ascii=False)}}}, ensure_ascii=False)
+    filler = "<div class='tile'>" + ("Veste légère coupe-vent " * 20) + "</div>"
+    html = f'<html><head></head><body>{filler * 3000}<script id="__NEXT_DATA__" type="application/json">{next_data}</script></body></html>'
+    return "synthetic(non-ascii)", html.encode("utf-8")
+
+
+def cpu_per_call(fn: Callable[[bytes, str], object], raw: bytes, content_type: str, repeat: int) -> float:
+    start = time.process_time()
+    for _ in range(repeat):
+        fn(raw, content_type)
+    return (time.process_time() - start) / repeat
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark resp.text vs bytes-level __NEXT_DATA__ extraction")
+    parser.add_argument("pages", nargs="*", help="Saved product page HTML files")
+    parser.add_argument("--repeat", type=int, default=10, help="Iterations per page (default: 10)")
+    args = parser.parse_args()
+
+    pages: List[Tuple[str, bytes]] = []
+    for path in args.pages:
+        with open(path, "rb") as f:
+            pages.append((os.path.basename(path), f.read()))
+    if not pages:
+        pages = [synthetic_page(next_data_in_head=False), non_ascii_page()]
+
+    print(f"{'page':<32} {'content-type':<26} {'text ms':>9} {'utf-8 ms':>9} {'bytes ms':>9} {'saved ms':>9} {'same':>5}")
+    for label, raw in pages:
+        # No Content-Type forces charset detection on resp.text; bare text/html falls back to ISO-8859-1.
+        for content_type in ("", "text/html", "text/html; charset=utf-8"):
+            expected = bytes_path(raw, content_type)
+            if utf8_path(raw, content_type) != expected:
+                print(f"{label}: extractors disagree; skipping")
+                break
+            same = text_path(raw, content_type) == expected
+            text_s = cpu_per_call(text_path, raw, content_type, args.repeat)
+            utf8_s = cpu_per_call(utf8_path, raw, content_type, args.repeat)
+            bytes_s = cpu_per_call(bytes_path, raw, content_type, args.repeat)
+            print(
+                f"{label[:32]:<32} {content_type or '(missing)':<26} {text_s * 1000:>9.2f} {utf8_s * 1000:>9.2f} "
+                f"{bytes_s * 1000:>9.2f} {(utf8_s - bytes_s) * 1000:>9.2f} {'yes' if same else 'NO':>5}"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
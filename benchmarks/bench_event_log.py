@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark: event log queries through the segment indexes vs scanning every segment.
+
+Writes `--days` synthetic runs (`--events` stock events each, over `--products` products) into a
+temporary event log, then times a one-day time-range query and a single-product query both ways.
+
+Run from the repo root:
+  python3 benchmarks/bench_event_log.py
+  python3 benchmarks/bench_event_log.py --days 365 --events 200
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json_codec  # noqa: E402
+from event_log import (  # noqa: E402
+    EVENT_STOCK,
+    EventLog,
+    EventLogSettings,
+    format_utc,
+    list_segments,
+    query_events,
+    segment_path,
+)
+
+
+def timed(fn: Callable[[], int], repeat: int) -> Tuple[float, int]:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        found = fn()
+    return (time.perf_counter() - start) / repeat * 1000, found
+
+
+def scan_events(directory: str) -> Iterator[Dict[str, Any]]:
+    for seq in list_segments(directory):
+        with open(segment_path(directory, seq), "rb") as f:
+            for line in f:
+                yield json_codec.loads(line)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark event log queries")
+    parser.add_argument("--days", type=int, default=90, help="Synthetic runs, one per day (default: 90)")
+    parser.add_argument("--events", type=int, default=500, help="Events per run (default: 500)")
+    parser.add_argument("--products", type=int, default=2000, help="Distinct product URLs (default: 2000)")
+    parser.add_argument("--repeat", type=int, default=5, help="Iterations (default: 5)")
+    args = parser.parse_args()
+
+    base = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    with tempfile.TemporaryDirectory() as tmp:
+        settings = EventLogSettings(directory=tmp)
+        started = time.perf_counter()
+        for day in range(args.days):
+            log = EventLog(settings)
+            for i in range(args.events):
+                log.record(EVENT_STOCK, url=f"https://outlet.arcteryx.com/ca/en/shop/p{(day * args.events + i) % args.products:05d}", size="8", in_stock=bool(i % 2))
+                log.pending[-1]["ts"] = format_utc(base + timedelta(days=day, seconds=i))
+            log.flush()
+        total_bytes = sum(os.path.getsize(segment_path(tmp, seq)) for seq in list_segments(tmp))
+        print(
+            f"write: {args.days * args.events} events, {len(list_segments(tmp))} segments, {total_bytes} B "
+            f"in {(time.perf_counter() - started) * 1000:.0f} ms"
+        )
+
+        since = format_utc(base + timedelta(days=args.days // 2))
+        until = format_utc(base + timedelta(days=args.days // 2, hours=23))
+        product = "p00042"
+        queries: List[Tuple[str, Callable[[], int], Callable[[], int]]] = [
+            (
+                "one day",
+                lambda: sum(1 for _ in query_events(tmp, since=since, until=until)),
+                lambda: sum(1 for e in scan_events(tmp) if since <= e["ts"] <= until),
+            ),
+            (
+                "one product",
+                lambda: sum(1 for _ in query_events(tmp, product=product)),
+                lambda: sum(1 for e in scan_events(tmp) if product in e["url"]),
+            ),
+        ]
+        for label, indexed, scan in queries:
+            indexed_ms, found = timed(indexed, args.repeat)
+            scan_ms, scanned = timed(scan, args.repeat)
+            assert found == scanned, (label, found, scanned)
+            print(f"{label:<12} {found:>6} events  indexed {indexed_ms:8.2f} ms  scan {scan_ms:8.2f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
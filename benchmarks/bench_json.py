@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Benchmark: stdlib json (indent=2) vs json_codec on a large state file and a large product blob.
+
+Run from the repo root:
+  python3 benchmarks/bench_json.py                                  # synthetic state + product
+  python3 benchmarks/bench_json.py --state data/stock_watch_state.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json_codec  # noqa: E402
+
+
+def synthetic_state(products: int, sizes: int) -> Dict[str, Any]:
+    state: Dict[str, Any] = {"version": 1, "products": {}}
+    for i in range(products):
+        state["products"][f"https://outlet.arcteryx.com/ca/en/shop/mens/product-{i}"] = {
+            "name": f"Product {i} GTX",
+            "product_id": f"X0000{i}",
+            "last_checked": "2026-01-01T00:00:00Z",
+            "sizes": {
+                str(8 + s * 0.5): {
+                    "in_stock": bool((i + s) % 3),
+                    "in_stock_colours": ["Black", "Void"],
+                    "stock_status_by_colour": {"Black": "InStock", "Void": "LowStock", "Orca": "OutOfStock"},
+                    "size_ids": [f"s{s}"],
+                    "last_checked": "2026-01-01T00:00:00Z",
+                    "notify_count": 0,
+                    "last_notified_at": None,
+                    "last_change": "2026-01-01T00:00:00Z",
+                }
+                for s in range(sizes)
+            },
+        }
+    return state
+
+
+def synthetic_product_blob(variants: int) -> str:
+    product = {
+        "id": "synthetic",
+        "name": "Synthetic GTX Shoe",
+        "description": "<p>" + ("Gore-Tex waterproof membrane. " * 200) + "</p>",
+        "sizeOptions": {"options": [{"label": str(7 + i * 0.5), "value": f"s{i}"} for i in range(20)]},
+        "colourOptions": {"options": [{"label": f"Colour {i}", "value": f"c{i}"} for i in range(12)]},
+        "variants": [{"sizeId": f"s{i % 20}", "colourId": f"c{i % 12}", "stockStatus": "InStock", "sku": f"SKU{i:06d}"} for i in range(variants)],
+    }
+    return json.dumps(product)
+
+
+def timed(fn: Callable[[], Any], repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark JSON codec paths")
+    parser.add_argument("--state", type=str, default="", help="Existing state file to benchmark (default: synthetic)")
+    parser.add_argument("--products", type=int, default=5000, help="Synthetic state products (default: 5000)")
+    parser.add_argument("--repeat", type=int, default=5, help="Iterations (default: 5)")
+    args = parser.parse_args()
+
+    if args.state:
+        with open(args.state, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    else:
+        state = synthetic_state(args.products, 3)
+    blob = synthetic_product_blob(2000)
+
+    print(f"json_codec backend: {json_codec.backend_name()}")
+    with tempfile.TemporaryDirectory() as tmp:
+        stdlib_path = os.path.join(tmp, "state_stdlib.json")
+        codec_path = os.path.join(tmp, "state_codec.json")
+
+        def stdlib_save() -> None:
+            with open(stdlib_path, "w", encoding="utf-8") as f:
+                json.dump(state, f, ensure_ascii=False, indent=2)
+
+        def stdlib_load() -> Any:
+            with open(stdlib_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+
+        save_std = timed(stdlib_save, args.repeat)
+        save_codec = timed(lambda: json_codec.dump_file(codec_path, state), args.repeat)
+        load_std = timed(stdlib_load, args.repeat)
+        load_codec = timed(lambda: json_codec.load_file(codec_path), args.repeat)
+
+        print(f"state save: stdlib(indent=2) {save_std:8.2f} ms  codec(compact) {save_codec:8.2f} ms")
+        print(f"state load: stdlib(indent=2) {load_std:8.2f} ms  codec(compact) {load_codec:8.2f} ms")
+        print(f"state size: stdlib(indent=2) {os.path.getsize(stdlib_path):>10} B  codec(compact) {os.path.getsize(codec_path):>10} B")
+
+    blob_std = timed(lambda: json.loads(blob), args.repeat * 4)
+    blob_codec = timed(lambda: json_codec.loads(blob), args.repeat * 4)
+    print(f"product blob ({len(blob)} B) loads: stdlib {blob_std:8.2f} ms  codec {blob_codec:8.2f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
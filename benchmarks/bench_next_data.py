@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Benchmark: regex vs streaming `__NEXT_DATA__` extraction on saved product pages.
+
+Save a few product pages first, e.g.:
+  mkdir -p data/pages
+  curl -sL -A "Mozilla/5.0" "https://outlet.arcteryx.com/ca/en/shop/<product>" -o data/pages/p1.html
+
+Then run from the repo root:
+  python3 benchmarks/bench_next_data.py data/pages/*.html
+
+Without arguments, a synthetic Next.js-like page is generated so the script still runs.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+from typing import Callable, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import watch_stock  # noqa: E402
+
+
+def synthetic_page(*, next_data_in_head: bool) -> Tuple[str, bytes]:
+    product = {
+        "id": "synthetic",
+        "name": "Synthetic GTX Shoe",
+        "variants": [{"sizeId": str(i % 20), "colourId": str(i % 7), "stockStatus": "InStock"} for i in range(400)],
+    }
+    next_data = '<script id="__NEXT_DATA__" type="application/json">' + json.dumps({"props": {"pageProps": {"product": json.dumps(product)}}}) + "</script>"
+    body = "<div class='tile'>" + ("lorem ipsum dolor sit amet " * 20) + "</div>"
+    filler = body * 3000
+    if next_data_in_head:
+        html = f"<html><head>{next_data}</head><body>{filler}</body></html>"
+        label = "synthetic(next_data in head)"
+    else:
+        html = f"<html><head></head><body>{filler}{next_data}</body></html>"
+        label = "synthetic(next_data at end)"
+    return label, html.encode("utf-8")
+
+
+def regex_path(raw: bytes) -> object:
+    return watch_stock.extract_next_data(raw.decode("utf-8"))
+
+
+def streaming_path(raw: bytes) -> object:
+    size = watch_stock.STREAM_CHUNK_SIZE
+    return watch_stock.extract_next_data_streaming(raw[i : i + size] for i in range(0, len(raw), size))
+
+
+def bytes_read_streaming(raw: bytes) -> int:
+    size = watch_stock.STREAM_CHUNK_SIZE
+    scanner = watch_stock.NextDataScanner()
+    for i in range(0, len(raw), size):
+        if scanner.feed(raw[i : i + size]):
+            break
+    return scanner.bytes_read
+
+
+def measure(fn: Callable[[bytes], object], raw: bytes, repeat: int) -> Tuple[float, int]:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(raw)
+    elapsed = (time.perf_counter() - start) / repeat
+
+    tracemalloc.start()
+    fn(raw)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark __NEXT_DATA__ extraction paths")
+    parser.add_argument("pages", nargs="*", help="Saved product page HTML files")
+    parser.add_argument("--repeat", type=int, default=20, help="Iterations per page (default: 20)")
+    args = parser.parse_args()
+
+    pages: List[Tuple[str, bytes]] = []
+    for path in args.pages:
+        with open(path, "rb") as f:
+            pages.append((os.path.basename(path), f.read()))
+    if not pages:
+        pages = [synthetic_page(next_data_in_head=True), synthetic_page(next_data_in_head=False)]
+
+    print(f"{'page':<32} {'size':>10} {'regex ms':>9} {'stream ms':>10} {'regex peak':>11} {'stream peak':>12} {'stream read':>12}")
+    for label, raw in pages:
+        if regex_path(raw) != streaming_path(raw):
+            print(f"{label}: extractors disagree; skipping")
+            continue
+        regex_s, regex_peak = measure(regex_path, raw, args.repeat)
+        stream_s, stream_peak = measure(streaming_path, raw, args.repeat)
+        print(
+            f"{label[:32]:<32} {len(raw):>10} {regex_s * 1000:>9.2f} {stream_s * 1000:>10.2f} "
+            f"{regex_peak:>11} {stream_peak:>12} {bytes_read_streaming(raw):>12}"
+        )
+    print("Note: streamed reads also stop the network transfer early; this only measures local CPU/memory.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
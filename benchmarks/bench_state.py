@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Benchmark: one watch run's state I/O with the JSON (plain and journaled) and SQLite backends.
+
+A run opens the state, updates `--touched` products (two sizes each; default: every product, as a
+real run checks every watched product) and saves. The plain JSON backend reads and rewrites the
+whole file; the journaled one reads the file and appends only the changed entries; SQLite reads and
+upserts only the changed rows. `--checked-interval` skips the writes for entries whose values did
+not change (`last_checked_interval_seconds`); without it every touched entry changes each run, and
+the journal compacts on every save.
+
+Run from the repo root:
+  python3 benchmarks/bench_state.py                                  # synthetic state
+  python3 benchmarks/bench_state.py --state data/stock_watch_state.json --checked-interval 3600
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from typing import Any, Callable, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json_codec  # noqa: E402
+from bench_json import synthetic_state  # noqa: E402
+from state_store import (  # noqa: E402
+    STATE_BACKEND_JSON,
+    STATE_BACKEND_SQLITE,
+    JournalSettings,
+    SqliteStateStore,
+    migrate_json_state,
+    open_state_store,
+)
+from watch_stock import StockResult, update_state_with_result  # noqa: E402
+
+
+def timed(fn: Callable[[], Any], repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def run_results(urls: List[str]) -> List[StockResult]:
+    return [
+        StockResult(
+            product_url=url,
+            name="Synthetic GTX",
+            product_id="X",
+            size_label=size,
+            in_stock=False,
+            in_stock_colours=(),
+            stock_status_by_colour={"Black": "OutOfStock"},
+            size_ids=("s0",),
+            currency="CAD",
+            price=100.0,
+            discount_price=None,
+        )
+        for url in urls
+        for size in ("8.0", "8.5")
+    ]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark state backends")
+    parser.add_argument("--state", type=str, default="", help="Existing JSON state file (default: synthetic)")
+    parser.add_argument("--products", type=int, default=5000, help="Synthetic state products (default: 5000)")
+    parser.add_argument("--touched", type=int, default=0, help="Products updated per simulated run (default: all)")
+    parser.add_argument("--checked-interval", type=int, default=0, help="last_checked_interval_seconds (default: 0)")
+    parser.add_argument("--repeat", type=int, default=5, help="Iterations (default: 5)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = os.path.join(tmp, "state.json")
+        db_path = os.path.join(tmp, "state.sqlite3")
+        if args.state:
+            shutil.copyfile(args.state, json_path)
+        else:
+            json_codec.dump_file(json_path, synthetic_state(args.products, 3))
+
+        started = time.perf_counter()
+        db = SqliteStateStore(db_path)
+        products, sizes = migrate_json_state(json_path, db)
+        db.close()
+        print(f"migration: {products} products, {sizes} sizes in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+        urls = list(json_codec.load_file(json_path)["products"])
+        if args.touched > 0:
+            urls = urls[: args.touched]
+        results = run_results(urls)
+
+        journal = JournalSettings()
+
+        def one_run(backend: str, journal: Optional[JournalSettings] = None) -> None:
+            store = open_state_store(backend, state_file=json_path, state_db=db_path, journal=journal)
+            for result in results:
+                update_state_with_result(store, result, checked_interval_seconds=args.checked_interval)
+            started = time.perf_counter()
+            store.save()
+            save_ms.append((time.perf_counter() - started) * 1000)
+            store.close()
+
+        rows = []
+        for label, backend, settings in (
+            ("json", STATE_BACKEND_JSON, None),
+            ("json+journal", STATE_BACKEND_JSON, journal),
+            ("sqlite", STATE_BACKEND_SQLITE, None),
+        ):
+            save_ms: List[float] = []
+            total = timed(lambda: one_run(backend, settings), args.repeat)
+            rows.append((label, total, sum(save_ms) / len(save_ms)))
+        print(f"run ({len(urls)} products touched, checked_interval={args.checked_interval}s):")
+        for label, total, save in rows:
+            print(f"  {label:<13} run {total:8.2f} ms  save {save:8.2f} ms")
+        print(f"size: json {os.path.getsize(json_path):>10} B  sqlite {os.path.getsize(db_path):>10} B")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,1056 @@
+from __future__ import annotations
+
+import base64
+import hashlib
+import logging
+import os
+import time
+from dataclasses import dataclass
+from fnmatch import fnmatchcase
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple, TypeVar
+from urllib.parse import parse_qsl, urlencode, urljoin, urlparse, urlunparse
+
+import json_codec
+import rate_limit
+
+try:
+    import fcntl
+
+    FCNTL_AVAILABLE = True
+except Exception:
+    FCNTL_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+TILE_NAME_SELECTOR = ".product-tile-name, [class*='product-tile-name'], [class*='tile-name']"
+TILE_DESCRIPTION_SELECTOR = "[data-component='body1'], [data-component='body2'], [class*='subtitle'], [class*='description']"
+TILE_PRICE_SELECTOR = ".qa--product-tile__prices, [class*='price']"
+TILE_SOLD_OUT_SELECTOR = "[class*='sold-out' i], [class*='soldout' i], [class*='out-of-stock' i], [data-sold-out='true']"
+# Matched against the whole text of a leaf element, so only a badge that says nothing else counts.
+TILE_SOLD_OUT_TEXT_PATTERN = r"^(sold\s*out|out\s+of\s+stock|unavailable)$"
+TILE_MAX_ANCESTORS = 8
+
+# Availability hint carried by a tile; "" means the tile shows nothing either way.
+TILE_SOLD_OUT = "sold_out"
+TILE_IN_STOCK = "in_stock"
+
+CATEGORY_SOURCE_BROWSER = "browser"
+CATEGORY_SOURCE_HTTP = "http"
+CATEGORY_SOURCES = (CATEGORY_SOURCE_BROWSER, CATEGORY_SOURCE_HTTP)
+
+LISTING_URL_KEYS = ("url", "href", "link", "pdpUrl", "productUrl", "uri")
+LISTING_NAME_KEYS = ("name", "title", "analyticsName", "marketingName")
+LISTING_DESCRIPTION_KEYS = ("shortDescription", "marketingName", "subtitle")
+LISTING_PRODUCT_HINT_KEYS = ("price", "discountPrice", "prices", "priceRange", "colourOptions", "variants")
+LISTING_PAGE_COUNT_KEYS = ("totalPages", "pageCount", "numberOfPages", "lastPage")
+LISTING_SOLD_OUT_KEYS = ("isSoldOut", "soldOut", "outOfStock", "isOutOfStock")
+LISTING_IN_STOCK_KEYS = ("inStock", "isInStock", "available", "isAvailable", "hasStock")
+LISTING_STATUS_KEYS = ("availability", "stockStatus", "inventoryStatus", "status")
+LISTING_SOLD_OUT_STATUSES = {"outofstock", "soldout", "unavailable", "notavailable"}
+LISTING_IN_STOCK_STATUSES = {"instock", "lowstock", "available", "limitedstock"}
+MAX_LISTING_DEPTH = 16
+
+# Chrome's Network.setBlockedURLs wildcard patterns. First-party scripts and XHR stay allowed.
+DEFAULT_BLOCKED_URL_PATTERNS = (
+    "*.png*", "*.jpg*", "*.jpeg*", "*.gif*", "*.webp*", "*.avif*", "*.svg*", "*.ico*",
+    "*.woff*", "*.ttf*", "*.otf*", "*.eot*",
+    "*.mp4*", "*.webm*", "*.mp3*", "*.m3u8*",
+    "*googletagmanager.com*", "*google-analytics.com*", "*doubleclick.net*", "*facebook.net*",
+    "*hotjar.com*", "*tiktok.com*", "*pinterest.com*", "*quantummetric.com*",
+)
+IMAGE_BLOCKING_PREFS = {"profile.managed_default_content_settings.images": 2}
+DEFAULT_RENDER_STATS_FILENAME = "category_render_stats.json"
+DEFAULT_SNAPSHOT_DIRNAME = "category_snapshots"
+DEFAULT_SNAPSHOT_TTL_SECONDS = 0
+
+PAGE_COST_JS = r"""
+const nav = performance.getEntriesByType("navigation")[0];
+const resources = performance.getEntriesByType("resource");
+let bytes = nav ? (nav.transferSize || 0) : 0;
+for (const r of resources) bytes += r.transferSize || 0;
+const load = nav && nav.loadEventEnd ? nav.loadEventEnd - nav.startTime : 0;
+return [bytes, resources.length + (nav ? 1 : 0), load / 1000];
+"""
+RESOURCE_TIMING_BUFFER_JS = "performance.setResourceTimingBufferSize(5000);"
+
+WAIT_MODE_FIXED = "fixed"
+WAIT_MODE_READY = "ready"
+WAIT_MODE_HARVEST = "harvest"
+WAIT_MODES = (WAIT_MODE_FIXED, WAIT_MODE_READY, WAIT_MODE_HARVEST)
+
+HARVEST_SCROLL = "scroll"
+HARVEST_LOAD_MORE = "load_more"
+HARVEST_PAGINATION = "pagination"
+HARVEST_STRATEGIES = (HARVEST_SCROLL, HARVEST_LOAD_MORE, HARVEST_PAGINATION)
+DEFAULT_LOAD_MORE_SELECTOR = "[class*='load-more'] button, button[class*='load-more'], [data-testid*='load-more']"
+
+# Reports whether the viewport already reached the bottom, otherwise scrolls one viewport down;
+# stepping (rather than jumping to the end) keeps virtualized grids from skipping rows.
+SCROLL_STEP_JS = r"""
+const el = document.scrollingElement || document.documentElement;
+const atBottom = el.scrollTop + window.innerHeight >= el.scrollHeight - 4;
+if (!atBottom) window.scrollBy(0, Math.max(200, Math.floor(window.innerHeight * 0.9)));
+return atBottom;
+"""
+LOAD_MORE_JS = r"""
+let btn = arguments[0] ? document.querySelector(arguments[0]) : null;
+if (!btn) {
+  btn = Array.from(document.querySelectorAll("button, a[role='button']"))
+    .find((b) => /\b(load|show|view) more\b/i.test(b.innerText || ""));
+}
+if (!btn || btn.disabled || btn.offsetParent === null) return false;
+btn.scrollIntoView({block: "center"});
+btn.click();
+return true;
+"""
+
+PAGE_PROGRESS_JS = "return [document.querySelectorAll(arguments[0]).length, document.body ? document.body.scrollHeight : 0];"
+
+# Runs in the page: one WebDriver round trip returns every tile instead of several per anchor.
+TILE_EXTRACTION_JS = r"""
+const [linkSelector, nameSelector, descSelector, priceSelector, maxDepth, soldOutSelector, soldOutPattern] = arguments;
+const text = (el) => ((el && (el.innerText || el.textContent)) || "").trim();
+const soldOutText = new RegExp(soldOutPattern, "i");
+// Promo copy or a colour note that mentions "sold out" is not a badge; a childless element whose
+// whole label is the phrase is.
+const soldOutBadge = (el) => el.children.length === 0 && soldOutText.test(text(el));
+const out = [];
+const seen = new Set();
+for (const a of document.querySelectorAll(linkSelector)) {
+  let href = a.href || "";
+  if (!href || href.indexOf("/shop/") < 0) continue;
+  href = href.split("?")[0];
+  if (seen.has(href)) continue;
+  seen.add(href);
+
+  let name = "", description = "", price = "";
+  let node = a, card = null;
+  for (let i = 0; i < maxDepth && node.parentElement; i++) {
+    node = node.parentElement;
+    if (!name) {
+      for (const el of node.querySelectorAll(nameSelector)) {
+        const t = text(el);
+        if (t) { name = t; card = node; break; }
+      }
+    }
+    if (!description) {
+      let best = "";
+      for (const el of node.querySelectorAll(descSelector)) {
+        const t = text(el);
+        if (t.length > best.length) best = t;
+      }
+      description = best;
+    }
+    if (!price) {
+      const el = node.querySelector(priceSelector);
+      if (el) price = text(el).split(/\s+/).filter(Boolean).join(" ");
+    }
+    if (name && description && price) break;
+  }
+  // The first ancestor holding the name is taken as the tile card.
+  card = card || a;
+  const soldOut = !!card.querySelector(soldOutSelector) || card.matches(soldOutSelector) || Array.from(card.querySelectorAll("*")).some(soldOutBadge);
+  out.push({url: href, name: name, description: description, price: price, availability: soldOut ? "sold_out" : ""});
+}
+return out;
+"""
+
+
+@dataclass
+class ScrapeSettings:
+    wait_mode: str = WAIT_MODE_FIXED
+    max_wait_seconds: float = 60.0
+    poll_seconds: float = 0.25
+    scroll_pause_seconds: float = 1.5
+    stable_rounds: int = 2
+    compare_extractors: bool = False
+    http_max_pages: int = 20
+    http_page_param: str = "page"
+    browser_max_pages: int = 20
+    block_resources: bool = False
+    block_images: bool = True
+    deny_patterns: Tuple[str, ...] = DEFAULT_BLOCKED_URL_PATTERNS
+    allow_patterns: Tuple[str, ...] = ()
+    capture_network: bool = False
+    stats_path: str = ""
+    snapshot_dir: str = ""
+    snapshot_ttl_seconds: float = DEFAULT_SNAPSHOT_TTL_SECONDS
+    harvest_strategy: str = HARVEST_SCROLL
+    load_more_selector: str = DEFAULT_LOAD_MORE_SELECTOR
+    harvest_max_pages: int = 20
+
+    @classmethod
+    def from_config(cls, cfg: Any, *, data_dir: str = "") -> "ScrapeSettings":
+        cfg = cfg if isinstance(cfg, dict) else {}
+        wait_mode = str(cfg.get("wait_mode") or cls.wait_mode).strip().lower()
+        if wait_mode not in WAIT_MODES:
+            raise ValueError(f"Unknown category_scrape.wait_mode: {wait_mode!r} (expected one of: {', '.join(WAIT_MODES)})")
+        harvest_strategy = str(cfg.get("harvest_strategy") or cls.harvest_strategy).strip().lower()
+        if harvest_strategy not in HARVEST_STRATEGIES:
+            raise ValueError(
+                f"Unknown category_scrape.harvest_strategy: {harvest_strategy!r} (expected one of: {', '.join(HARVEST_STRATEGIES)})"
+            )
+        return cls(
+            wait_mode=wait_mode,
+            max_wait_seconds=max(1.0, float(cfg.get("max_wait_seconds") or cls.max_wait_seconds)),
+            poll_seconds=max(0.05, float(cfg.get("poll_seconds") or cls.poll_seconds)),
+            scroll_pause_seconds=max(0.1, float(cfg.get("scroll_pause_seconds") or cls.scroll_pause_seconds)),
+            stable_rounds=max(1, int(cfg.get("stable_rounds") or cls.stable_rounds)),
+            compare_extractors=bool(cfg.get("compare_extractors", False)),
+            http_max_pages=max(1, int(cfg.get("http_max_pages") or cls.http_max_pages)),
+            http_page_param=str(cfg.get("http_page_param") or cls.http_page_param),
+            browser_max_pages=max(1, int(cfg.get("browser_max_pages") or cls.browser_max_pages)),
+            block_resources=bool(cfg.get("block_resources", False)),
+            block_images=bool(cfg.get("block_images", True)),
+            deny_patterns=tuple(DEFAULT_BLOCKED_URL_PATTERNS) + tuple(str(p) for p in (cfg.get("deny_patterns") or []) if p),
+            allow_patterns=tuple(str(p) for p in (cfg.get("allow_patterns") or []) if p),
+            capture_network=bool(cfg.get("capture_network", False)),
+            stats_path=os.path.join(data_dir, DEFAULT_RENDER_STATS_FILENAME) if data_dir else "",
+            snapshot_dir=os.path.join(data_dir, DEFAULT_SNAPSHOT_DIRNAME) if data_dir else "",
+            snapshot_ttl_seconds=max(
+                0.0,
+                float(cfg.get("snapshot_ttl_seconds") if cfg.get("snapshot_ttl_seconds") is not None else DEFAULT_SNAPSHOT_TTL_SECONDS),
+            ),
+            harvest_strategy=harvest_strategy,
+            load_more_selector=str(cfg.get("load_more_selector") or cls.load_more_selector),
+            harvest_max_pages=max(1, int(cfg.get("harvest_max_pages") or cls.harvest_max_pages)),
+        )
+
+    def launch_key(self) -> Tuple[bool, bool]:
+        """The settings baked into a Chrome launch; sessions can only be shared when these match."""
+        return (self.block_resources and self.block_images, self.capture_network)
+
+    def snapshot_fingerprint(self, link_selector: str, *extra: Any) -> str:
+        """The settings that shape a render's tiles; snapshots are only reused when these match."""
+        parts = (
+            self.wait_mode,
+            self.max_wait_seconds,
+            self.stable_rounds,
+            self.harvest_strategy,
+            self.harvest_max_pages,
+            self.load_more_selector,
+            self.capture_network,
+            link_selector,
+        ) + extra
+        return hashlib.sha256(repr(parts).encode("utf-8")).hexdigest()[:16]
+
+    def blocked_url_patterns(self) -> List[str]:
+        # CDP blocking has no per-URL exceptions, so allow patterns remove the deny entries they cover.
+        if not self.block_resources:
+            return []
+        return [p for p in dict.fromkeys(self.deny_patterns) if not any(p == a or fnmatchcase(p, a) for a in self.allow_patterns)]
+
+
+def configure_chrome_options(options: Any, settings: Optional[ScrapeSettings]) -> Any:
+    if settings is None:
+        return options
+    block_images, capture_network = settings.launch_key()
+    if block_images:
+        options.add_experimental_option("prefs", IMAGE_BLOCKING_PREFS)
+    if capture_network:
+        options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+    return options
+
+
+def _prepare_driver(driver: Any) -> None:
+    # The default 250-entry resource timing buffer overflows on listing pages; page cost needs them all.
+    if not hasattr(driver, "execute_cdp_cmd"):
+        return
+    try:
+        driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": RESOURCE_TIMING_BUFFER_JS})
+    except Exception as e:
+        logger.debug(f"Could not enlarge the resource timing buffer: {e}")
+
+
+def apply_resource_blocking(driver: Any, settings: ScrapeSettings) -> None:
+    if not hasattr(driver, "execute_cdp_cmd"):
+        if settings.block_resources:
+            logger.warning("Resource blocking needs a Chromium driver with CDP support; loading everything")
+        return
+    patterns = settings.blocked_url_patterns()
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        # Always sent, so a shared browser drops a previous task's block list when this one has none.
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns})
+    except Exception as e:
+        if settings.block_resources:
+            logger.warning(f"Could not enable resource blocking via CDP: {e}")
+
+
+def _drain_performance_log(driver: Any) -> List[Dict[str, Any]]:
+    try:
+        entries = driver.get_log("performance")
+    except Exception as e:
+        logger.debug(f"Performance log unavailable: {e}")
+        return []
+    messages: List[Dict[str, Any]] = []
+    for entry in entries or []:
+        try:
+            message = json_codec.loads(entry["message"]).get("message") or {}
+        except Exception:
+            continue
+        if isinstance(message, dict):
+            messages.append(message)
+    return messages
+
+
+def open_category_page(driver: Any, url: str, settings: ScrapeSettings) -> None:
+    apply_resource_blocking(driver, settings)
+    if settings.capture_network:
+        # Drop whatever a previous page on this (shared) browser left in the log.
+        _drain_performance_log(driver)
+    rate_limit.acquire(url)
+    driver.get(url)
+
+
+def capture_listing_tiles(driver: Any, category_url: str, *, label: str = "") -> List[Dict[str, str]]:
+    """
+    Product tiles from the listing data the page loaded itself: the server-rendered `__NEXT_DATA__`
+    props plus every JSON response in Chrome's performance log (needs `capture_network` at launch).
+    """
+    prefix = f"[{label}] " if label else ""
+    started = time.monotonic()
+    out: Dict[str, Dict[str, str]] = {}
+
+    try:
+        props = driver.execute_script("return window.__NEXT_DATA__ ? JSON.stringify(window.__NEXT_DATA__.props) : null;")
+    except Exception:
+        props = None
+    if isinstance(props, str):
+        _walk_listing(props, category_url, out, 0)
+    from_next_data = len(out)
+
+    responses = 0
+    for message in _drain_performance_log(driver):
+        if message.get("method") != "Network.responseReceived":
+            continue
+        params = message.get("params") or {}
+        response = params.get("response") or {}
+        if "json" not in str(response.get("mimeType") or "") or int(response.get("status") or 0) != 200:
+            continue
+        try:
+            body = driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": params.get("requestId")})
+        except Exception:
+            continue
+        text = body.get("body") or ""
+        if body.get("base64Encoded"):
+            text = base64.b64decode(text).decode("utf-8", errors="replace")
+        before = len(out)
+        _walk_listing(text, category_url, out, 0)
+        if len(out) > before:
+            responses += 1
+
+    logger.info(
+        f"{prefix}Network capture: {len(out)} products ({from_next_data} from __NEXT_DATA__, "
+        f"{len(out) - from_next_data} from {responses} JSON responses) in {time.monotonic() - started:.2f}s"
+    )
+    return list(out.values())
+
+
+def extract_category_tiles(
+    driver: Any,
+    *,
+    category_url: str,
+    link_selector: str,
+    settings: ScrapeSettings,
+    label: str = "",
+    on_tiles: Optional[Callable[[List[Dict[str, str]]], None]] = None,
+) -> List[Dict[str, str]]:
+    harvested: Optional[List[Dict[str, str]]] = None
+    if settings.wait_mode == WAIT_MODE_HARVEST:
+        try:
+            harvested = harvest_tiles(
+                driver,
+                category_url=category_url,
+                link_selector=link_selector,
+                settings=settings,
+                label=label,
+                on_tiles=on_tiles,
+            )
+        except Exception as e:
+            logger.warning(f"{f'[{label}] ' if label else ''}Tile harvesting failed ({e}); falling back to a single extraction pass")
+    if settings.capture_network:
+        tiles = capture_listing_tiles(driver, category_url, label=label)
+        if tiles:
+            return tiles
+        logger.info(f"{f'[{label}] ' if label else ''}No listing data captured; falling back to DOM extraction")
+    if harvested:
+        return harvested
+    return scrape_tiles(driver, link_selector=link_selector, compare=settings.compare_extractors, label=label)
+
+
+class CategorySnapshotCache:
+    """
+    Rendered category tiles on disk, one JSON file per URL and settings fingerprint, reused for
+    `ttl_seconds`. Empty renders and renders that fell back to the legacy extractor are not stored,
+    so a blocked or half-rendered page is never served to later runs.
+
+    A render holds an exclusive lock on the snapshot's lock file, so when two tasks or processes want
+    the same category at once, the second one waits and then reads the first one's snapshot.
+    """
+
+    def __init__(self, cache_dir: str, ttl_seconds: float, fingerprint: str = "") -> None:
+        self.cache_dir = cache_dir
+        self.ttl_seconds = ttl_seconds
+        self.fingerprint = fingerprint
+
+    def _base(self, url: str) -> str:
+        key = f"{url}\0{self.fingerprint}"
+        return os.path.join(self.cache_dir, hashlib.sha256(key.encode("utf-8")).hexdigest()[:32])
+
+    @staticmethod
+    def storable(tiles: List[Dict[str, str]]) -> bool:
+        return bool(tiles) and not isinstance(tiles, FallbackTiles)
+
+    def get(self, url: str) -> Optional[Tuple[List[Dict[str, str]], float]]:
+        """Fresh tiles and their age in seconds, or None."""
+        try:
+            data = json_codec.load_file(self._base(url) + ".json")
+        except Exception:
+            return None
+        if (
+            not isinstance(data, dict)
+            or data.get("url") != url
+            or data.get("fingerprint", "") != self.fingerprint
+            or not isinstance(data.get("tiles"), list)
+        ):
+            return None
+        age = time.time() - float(data.get("rendered_at") or 0)
+        if age < 0 or age > self.ttl_seconds:
+            return None
+        return data["tiles"], age
+
+    def put(self, url: str, tiles: List[Dict[str, str]]) -> None:
+        os.makedirs(self.cache_dir, exist_ok=True)
+        json_codec.dump_file(
+            self._base(url) + ".json",
+            {"url": url, "fingerprint": self.fingerprint, "rendered_at": time.time(), "tiles": tiles},
+        )
+
+    def get_or_render(self, url: str, render: Callable[[], List[Dict[str, str]]], *, label: str = "") -> List[Dict[str, str]]:
+        prefix = f"[{label}] " if label else ""
+        cached = self.get(url)
+        if cached is None:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(self._base(url) + ".lock", "a") as lock_file:
+                if FCNTL_AVAILABLE:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+                try:
+                    # Another task or process may have rendered it while we waited for the lock.
+                    cached = self.get(url)
+                    if cached is None:
+                        tiles = render()
+                        if self.storable(tiles):
+                            self.put(url, tiles)
+                        elif tiles:
+                            logger.info(f"{prefix}Not snapshotting {len(tiles)} tiles from the fallback extractor")
+                        return tiles
+                finally:
+                    if FCNTL_AVAILABLE:
+                        fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+        tiles, age = cached
+        logger.info(f"{prefix}Category snapshot hit: {len(tiles)} tiles rendered {age:.0f}s ago (ttl {self.ttl_seconds:.0f}s)")
+        return tiles
+
+
+def render_with_snapshot(
+    url: str,
+    render: Callable[[], List[Dict[str, str]]],
+    settings: ScrapeSettings,
+    *,
+    link_selector: str,
+    extra: Tuple[Any, ...] = (),
+    label: str = "",
+) -> List[Dict[str, str]]:
+    """`extra` carries caller-side render inputs (such as fixed-mode wait and scroll counts) for the fingerprint."""
+    if not settings.snapshot_dir or settings.snapshot_ttl_seconds <= 0:
+        return render()
+    cache = CategorySnapshotCache(
+        settings.snapshot_dir,
+        settings.snapshot_ttl_seconds,
+        settings.snapshot_fingerprint(link_selector, *extra),
+    )
+    return cache.get_or_render(url, render, label=label)
+
+
+class RenderStats:
+    """Last blocked and unblocked page cost per category URL, used to report what blocking saves."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+    def _load(self) -> Dict[str, Any]:
+        try:
+            data = json_codec.load_file(self.path)
+            return data if isinstance(data, dict) else {}
+        except Exception:
+            return {}
+
+    def record(self, url: str, *, blocked: bool, bytes_transferred: int, requests: int, load_seconds: float) -> Optional[Dict[str, Any]]:
+        """Store this render and return the opposite mode's last render for comparison, if any."""
+        data = self._load()
+        entry = data.setdefault(url, {})
+        entry["blocked" if blocked else "unblocked"] = {
+            "bytes": int(bytes_transferred),
+            "requests": int(requests),
+            "load_seconds": round(float(load_seconds), 3),
+            "at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        }
+        try:
+            json_codec.dump_file(self.path, data, pretty=True)
+        except Exception as e:
+            logger.debug(f"Could not write {self.path}: {e}")
+        other = entry.get("unblocked" if blocked else "blocked")
+        return other if isinstance(other, dict) else None
+
+
+def log_page_cost(driver: Any, url: str, settings: ScrapeSettings, *, label: str = "") -> None:
+    prefix = f"[{label}] " if label else ""
+    try:
+        bytes_transferred, requests, load_seconds = driver.execute_script(PAGE_COST_JS)
+    except Exception as e:
+        logger.debug(f"{prefix}Could not read page cost: {e}")
+        return
+    blocked = bool(settings.blocked_url_patterns())
+    message = (
+        f"{prefix}Page cost ({'blocking on' if blocked else 'blocking off'}): {int(bytes_transferred) / 1024:.0f} KiB "
+        f"over {int(requests)} requests, load event after {float(load_seconds):.2f}s"
+    )
+    if settings.stats_path:
+        other = RenderStats(settings.stats_path).record(
+            url, blocked=blocked, bytes_transferred=int(bytes_transferred), requests=int(requests), load_seconds=float(load_seconds)
+        )
+        if blocked and other:
+            saved_kib = (other["bytes"] - int(bytes_transferred)) / 1024
+            saved_seconds = other["load_seconds"] - float(load_seconds)
+            message += f"; saved {saved_kib:.0f} KiB and {saved_seconds:.2f}s vs the last unblocked render ({other['at']})"
+    logger.info(message)
+
+
+class BrowserSession:
+    """
+    Chrome shared by every category scrape in a run (or process).
+
+    The driver is launched on first use, recycled after `max_pages` page loads to bound memory
+    growth, and relaunched once when a scrape fails because the browser itself died.
+    """
+
+    def __init__(self, factory: Callable[[], Any], *, max_pages: int = 20, label: str = "browser") -> None:
+        self.factory = factory
+        self.max_pages = max(1, int(max_pages))
+        self.label = label
+        self.launches = 0
+        self.pages = 0
+        self.launch_seconds = 0.0
+        self._driver: Any = None
+        self._driver_pages = 0
+
+    def _ensure(self) -> Any:
+        if self._driver is None:
+            started = time.monotonic()
+            self._driver = self.factory()
+            _prepare_driver(self._driver)
+            elapsed = time.monotonic() - started
+            self.launches += 1
+            self.launch_seconds += elapsed
+            self._driver_pages = 0
+            logger.info(f"[{self.label}] Browser launched in {elapsed:.1f}s (launch #{self.launches})")
+        return self._driver
+
+    def _alive(self) -> bool:
+        if self._driver is None:
+            return False
+        try:
+            self._driver.execute_script("return 1;")
+            return True
+        except Exception:
+            return False
+
+    def run(self, fn: Callable[[Any], T]) -> T:
+        """Call `fn(driver)` for one page load."""
+        try:
+            result = fn(self._ensure())
+        except Exception as e:
+            if self._alive():
+                self._count_page()
+                raise
+            logger.warning(f"[{self.label}] Browser crashed ({e}); relaunching")
+            self.close()
+            try:
+                result = fn(self._ensure())
+            except Exception:
+                if not self._alive():
+                    self.close()
+                raise
+        self._count_page()
+        return result
+
+    def _count_page(self) -> None:
+        self.pages += 1
+        self._driver_pages += 1
+        if self._driver_pages >= self.max_pages:
+            logger.info(f"[{self.label}] Recycling browser after {self._driver_pages} pages")
+            self.close()
+
+    def close(self) -> None:
+        driver, self._driver = self._driver, None
+        if driver is not None:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+
+    def summary(self) -> str:
+        return f"launches={self.launches} pages={self.pages} launch_time={self.launch_seconds:.1f}s"
+
+
+def parse_category_source(value: Any) -> str:
+    source = str(value or CATEGORY_SOURCE_BROWSER).strip().lower()
+    if source not in CATEGORY_SOURCES:
+        raise ValueError(f"Unknown category_source: {value!r} (expected one of: {', '.join(CATEGORY_SOURCES)})")
+    return source
+
+
+def _page_progress(driver: Any, link_selector: str) -> Tuple[int, int]:
+    count, height = driver.execute_script(PAGE_PROGRESS_JS, link_selector)
+    return int(count or 0), int(height or 0)
+
+
+def wait_until_ready(driver: Any, *, link_selector: str, settings: ScrapeSettings, label: str = "") -> float:
+    """
+    Wait for the first tile, then scroll until neither the tile count nor the page height grows for
+    `stable_rounds` consecutive scrolls. Bounded by `max_wait_seconds`; returns the seconds spent.
+    """
+    prefix = f"[{label}] " if label else ""
+    started = time.monotonic()
+    deadline = started + settings.max_wait_seconds
+
+    count, height = _page_progress(driver, link_selector)
+    while count == 0 and time.monotonic() < deadline:
+        time.sleep(settings.poll_seconds)
+        count, height = _page_progress(driver, link_selector)
+    first_tile_seconds = time.monotonic() - started
+
+    scrolls = 0
+    stable = 0
+    while count and stable < settings.stable_rounds and time.monotonic() < deadline:
+        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+        scrolls += 1
+        pause_until = min(deadline, time.monotonic() + settings.scroll_pause_seconds)
+        grew = False
+        while time.monotonic() < pause_until:
+            time.sleep(settings.poll_seconds)
+            new_count, new_height = _page_progress(driver, link_selector)
+            if new_count > count or new_height > height:
+                count, height = new_count, new_height
+                grew = True
+                break
+        stable = 0 if grew else stable + 1
+
+    spent = time.monotonic() - started
+    timed_out = time.monotonic() >= deadline
+    logger.info(
+        f"{prefix}Page ready in {spent:.1f}s (first tile after {first_tile_seconds:.1f}s, {scrolls} scrolls, "
+        f"{count} tile links{', hit max_wait_seconds' if timed_out else ''})"
+    )
+    return spent
+
+
+def settle_page(
+    driver: Any,
+    *,
+    link_selector: str,
+    settings: ScrapeSettings,
+    render_wait_seconds: float,
+    scroll_times: int,
+    scroll_sleep_seconds: float,
+    label: str = "",
+) -> float:
+    """Bring lazy-loaded tiles into the DOM, either with fixed sleeps or by waiting for readiness."""
+    if settings.wait_mode == WAIT_MODE_HARVEST:
+        # harvest_tiles waits and scrolls as it extracts.
+        return 0.0
+    if settings.wait_mode == WAIT_MODE_READY:
+        return wait_until_ready(driver, link_selector=link_selector, settings=settings, label=label)
+
+    started = time.monotonic()
+    if render_wait_seconds > 0:
+        time.sleep(render_wait_seconds)
+    for _ in range(max(0, scroll_times)):
+        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+        time.sleep(max(0.0, scroll_sleep_seconds))
+    spent = time.monotonic() - started
+    logger.info(f"{f'[{label}] ' if label else ''}Fixed render wait + {max(0, scroll_times)} scrolls took {spent:.1f}s")
+    return spent
+
+
+def _normalize_tile(raw: Any) -> Optional[Dict[str, str]]:
+    if not isinstance(raw, dict):
+        return None
+    url = str(raw.get("url") or "").split("?")[0]
+    if not url or "/shop/" not in url:
+        return None
+    return {
+        "url": url,
+        "name": str(raw.get("name") or "").strip(),
+        "description": str(raw.get("description") or "").strip(),
+        "price": " ".join(str(raw.get("price") or "").split()),
+        "availability": str(raw.get("availability") or ""),
+    }
+
+
+def extract_tiles_js(driver: Any, link_selector: str) -> List[Dict[str, str]]:
+    raw = driver.execute_script(
+        TILE_EXTRACTION_JS,
+        link_selector,
+        TILE_NAME_SELECTOR,
+        TILE_DESCRIPTION_SELECTOR,
+        TILE_PRICE_SELECTOR,
+        TILE_MAX_ANCESTORS,
+        TILE_SOLD_OUT_SELECTOR,
+        TILE_SOLD_OUT_TEXT_PATTERN,
+    )
+    if not isinstance(raw, list):
+        raise RuntimeError(f"Unexpected tile extraction result: {type(raw).__name__}")
+    tiles: List[Dict[str, str]] = []
+    for item in raw:
+        tile = _normalize_tile(item)
+        if tile:
+            tiles.append(tile)
+    return tiles
+
+
+def extract_tiles_webdriver(driver: Any, link_selector: str) -> List[Dict[str, str]]:
+    """Legacy per-element walk (several WebDriver round trips per anchor); kept as a fallback."""
+    from selenium.webdriver.common.by import By
+
+    elems = driver.find_elements(By.CSS_SELECTOR, link_selector)
+    tiles: List[Dict[str, str]] = []
+    seen: Set[str] = set()
+    for e in elems:
+        href = e.get_attribute("href")
+        if not href or "/shop/" not in href:
+            continue
+        href = href.split("?")[0]
+        if href in seen:
+            continue
+        seen.add(href)
+
+        name = ""
+        description = ""
+        price = ""
+
+        node = e
+        for _ in range(TILE_MAX_ANCESTORS):
+            try:
+                node = node.find_element(By.XPATH, "..")
+            except Exception:
+                break
+
+            if not name:
+                try:
+                    for ne in node.find_elements(By.CSS_SELECTOR, TILE_NAME_SELECTOR):
+                        t = (ne.text or "").strip()
+                        if t:
+                            name = t
+                            break
+                except Exception:
+                    pass
+
+            if not description:
+                try:
+                    best = ""
+                    for de in node.find_elements(By.CSS_SELECTOR, TILE_DESCRIPTION_SELECTOR):
+                        t = (de.text or "").strip()
+                        if len(t) > len(best):
+                            best = t
+                    if best:
+                        description = best
+                except Exception:
+                    pass
+
+            if not price:
+                try:
+                    price_elems = node.find_elements(By.CSS_SELECTOR, TILE_PRICE_SELECTOR)
+                    if price_elems:
+                        price = " ".join((price_elems[0].text or "").split())
+                except Exception:
+                    pass
+
+            if name and description and price:
+                break
+
+        tiles.append({"url": href, "name": name, "description": description, "price": price, "availability": ""})
+    return tiles
+
+
+class FallbackTiles(list):
+    """Tiles from the legacy WebDriver walk, which only runs when the fast extractor failed or found nothing."""
+
+
+def scrape_tiles(driver: Any, *, link_selector: str, compare: bool = False, label: str = "") -> List[Dict[str, str]]:
+    """
+    Extract product tiles (url, name, description, price, availability) from the rendered category page.
+
+    Uses the single `execute_script` extractor and falls back to the legacy WebDriver walk when it
+    fails or finds nothing. With `compare=True` both run and their timings are logged side by side.
+    """
+    prefix = f"[{label}] " if label else ""
+    tiles: Optional[List[Dict[str, str]]] = None
+    started = time.monotonic()
+    try:
+        tiles = extract_tiles_js(driver, link_selector)
+    except Exception as e:
+        logger.warning(f"{prefix}JS tile extraction failed ({e}); falling back to WebDriver walk")
+    js_seconds = time.monotonic() - started
+    timing = f"js={len(tiles) if tiles is not None else 'failed'} in {js_seconds:.2f}s"
+
+    if tiles is None or not tiles or compare:
+        started = time.monotonic()
+        legacy = extract_tiles_webdriver(driver, link_selector)
+        timing += f", webdriver={len(legacy)} in {time.monotonic() - started:.2f}s"
+        if not tiles:
+            tiles = FallbackTiles(legacy)
+
+    logger.info(f"{prefix}Tile extraction: {timing}")
+    return tiles or []
+
+
+def with_query_param(url: str, key: str, value: Any) -> str:
+    parsed = urlparse(url)
+    query = [(k, v) for k, v in parse_qsl(parsed.query, keep_blank_values=True) if k != key]
+    query.append((key, str(value)))
+    return urlunparse(parsed._replace(query=urlencode(query)))
+
+
+def _merge_tiles(out: Dict[str, Dict[str, str]], tiles: Iterable[Dict[str, str]]) -> int:
+    added = 0
+    for tile in tiles:
+        known = out.get(tile["url"])
+        if known is None:
+            out[tile["url"]] = tile
+            added += 1
+        else:
+            # A tile seen half-rendered earlier may have gained its name/price since.
+            for key, value in tile.items():
+                if value and not known.get(key):
+                    known[key] = value
+    return added
+
+
+def _harvest_page(
+    driver: Any,
+    link_selector: str,
+    settings: ScrapeSettings,
+    out: Dict[str, Dict[str, str]],
+    emit: Callable[[], None],
+) -> Tuple[int, int]:
+    """Step through the current page one viewport at a time, extracting after every step."""
+    deadline = time.monotonic() + settings.max_wait_seconds
+    while _page_progress(driver, link_selector)[0] == 0 and time.monotonic() < deadline:
+        time.sleep(settings.poll_seconds)
+
+    added_total = 0
+    steps = 0
+    idle_at_bottom = 0
+    while time.monotonic() < deadline:
+        added = _merge_tiles(out, extract_tiles_js(driver, link_selector))
+        added_total += added
+        emit()
+        steps += 1
+        at_bottom = bool(driver.execute_script(SCROLL_STEP_JS))
+        if not at_bottom:
+            idle_at_bottom = 0
+            time.sleep(settings.poll_seconds)
+            continue
+        if settings.harvest_strategy == HARVEST_LOAD_MORE and driver.execute_script(LOAD_MORE_JS, settings.load_more_selector):
+            idle_at_bottom = 0
+            time.sleep(settings.scroll_pause_seconds)
+            continue
+        idle_at_bottom = 0 if added else idle_at_bottom + 1
+        if idle_at_bottom >= settings.stable_rounds:
+            break
+        # At the bottom: give infinite scroll time to append the next batch.
+        time.sleep(settings.scroll_pause_seconds)
+    return added_total, steps
+
+
+def harvest_tiles(
+    driver: Any,
+    *,
+    category_url: str,
+    link_selector: str,
+    settings: ScrapeSettings,
+    label: str = "",
+    on_tiles: Optional[Callable[[List[Dict[str, str]]], None]] = None,
+) -> List[Dict[str, str]]:
+    """
+    Collect tiles while scrolling, so grids that virtualize or recycle nodes cannot drop earlier ones.
+    Stops once the bottom is reached and `stable_rounds` passes there added nothing; `load_more`
+    clicks a "load more" button at the bottom, `pagination` walks `?page=N` until a page adds nothing.
+    `on_tiles` receives new tiles after every extraction step, before the harvest finishes.
+    """
+    prefix = f"[{label}] " if label else ""
+    started = time.monotonic()
+    out: Dict[str, Dict[str, str]] = {}
+    emitted: Set[str] = set()
+
+    def emit() -> None:
+        if on_tiles is None:
+            return
+        # Tiles still missing a name are held back; a later step (or the returned list) fills them in.
+        ready = [tile for url, tile in out.items() if url not in emitted and tile.get("name")]
+        if ready:
+            emitted.update(tile["url"] for tile in ready)
+            on_tiles(ready)
+
+    pages = 1
+    _, steps = _harvest_page(driver, link_selector, settings, out, emit)
+
+    while settings.harvest_strategy == HARVEST_PAGINATION and pages < settings.harvest_max_pages:
+        page_url = with_query_param(category_url, settings.http_page_param, pages + 1)
+        rate_limit.acquire(page_url)
+        driver.get(page_url)
+        pages += 1
+        added, page_steps = _harvest_page(driver, link_selector, settings, out, emit)
+        steps += page_steps
+        if not added:
+            break
+
+    logger.info(
+        f"{prefix}Harvested {len(out)} tiles in {steps} extraction steps over {pages} page(s) "
+        f"({settings.harvest_strategy}) in {time.monotonic() - started:.1f}s"
+    )
+    return list(out.values())
+
+
+def _first_str(item: Dict[str, Any], keys: Iterable[str]) -> str:
+    for key in keys:
+        value = item.get(key)
+        if isinstance(value, str) and value.strip():
+            return value.strip()
+    return ""
+
+
+def listing_product_url(item: Dict[str, Any], category_url: str) -> str:
+    """Product page URL for a listing entry: an explicit `/shop/` link, else built from its slug."""
+    for key in LISTING_URL_KEYS:
+        value = item.get(key)
+        if isinstance(value, str) and "/shop/" in value:
+            return urljoin(category_url, value).split("?")[0]
+
+    slug = item.get("slug")
+    if not isinstance(slug, str) or not slug.strip() or not any(k in item for k in LISTING_PRODUCT_HINT_KEYS):
+        return ""
+    # /ca/en/c/mens/footwear -> /ca/en/shop/mens/<slug>, the layout product pages use.
+    parsed = urlparse(category_url)
+    prefix, sep, rest = parsed.path.partition("/c/")
+    if not sep:
+        return ""
+    section = rest.split("/")[0]
+    path = "/".join(p for p in (prefix.rstrip("/"), "shop", section, slug.strip().strip("/")) if p)
+    return f"{parsed.scheme}://{parsed.netloc}/{path.lstrip('/')}"
+
+
+def _format_listing_price(item: Dict[str, Any]) -> str:
+    price = item.get("price")
+    discount = item.get("discountPrice")
+    currency = str(item.get("currencyCode") or "")
+    parts = []
+    for value in (discount, price):
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            text = f"${value:.0f}" if float(value).is_integer() else f"${value:.2f}"
+            if text not in parts:
+                parts.append(text)
+    if not parts:
+        return ""
+    return " ".join(([currency] if currency else []) + parts)
+
+
+def listing_availability(item: Dict[str, Any]) -> str:
+    """Availability hint from a listing entry's stock flags or status, "" when it has none."""
+    for key in LISTING_SOLD_OUT_KEYS:
+        if isinstance(item.get(key), bool):
+            return TILE_SOLD_OUT if item[key] else TILE_IN_STOCK
+    for key in LISTING_IN_STOCK_KEYS:
+        if isinstance(item.get(key), bool):
+            return TILE_IN_STOCK if item[key] else TILE_SOLD_OUT
+    for key in LISTING_STATUS_KEYS:
+        value = item.get(key)
+        if isinstance(value, str):
+            status = "".join(ch for ch in value.lower() if ch.isalpha())
+            if status in LISTING_SOLD_OUT_STATUSES:
+                return TILE_SOLD_OUT
+            if status in LISTING_IN_STOCK_STATUSES:
+                return TILE_IN_STOCK
+    return ""
+
+
+def _decode_embedded_json(text: str) -> Any:
+    # Some pageProps carry the listing as a JSON string (as product pages do with `product`).
+    text = text.strip()
+    if len(text) > 1 and text[0] in "[{":
+        try:
+            return json_codec.loads(text)
+        except Exception:
+            pass
+    return None
+
+
+def _walk_listing(node: Any, category_url: str, out: Dict[str, Dict[str, str]], depth: int) -> None:
+    if depth > MAX_LISTING_DEPTH:
+        return
+    if isinstance(node, str):
+        node = _decode_embedded_json(node)
+    if isinstance(node, list):
+        for child in node:
+            _walk_listing(child, category_url, out, depth + 1)
+        return
+    if not isinstance(node, dict):
+        return
+
+    name = _first_str(node, LISTING_NAME_KEYS)
+    url = listing_product_url(node, category_url) if name else ""
+    if url:
+        if url not in out:
+            out[url] = {
+                "url": url,
+                "name": name,
+                "description": _first_str(node, LISTING_DESCRIPTION_KEYS),
+                "price": _format_listing_price(node),
+                "availability": listing_availability(node),
+            }
+        return
+    for child in node.values():
+        _walk_listing(child, category_url, out, depth + 1)
+
+
+def find_listing_products(data: Any, category_url: str) -> List[Dict[str, str]]:
+    """Walk a Next.js listing payload and return product tiles in the same shape as `scrape_tiles`."""
+    out: Dict[str, Dict[str, str]] = {}
+    _walk_listing(data, category_url, out, 0)
+    return list(out.values())
+
+
+def find_page_count(data: Any, depth: int = 0) -> Optional[int]:
+    if depth > MAX_LISTING_DEPTH:
+        return None
+    if isinstance(data, str):
+        data = _decode_embedded_json(data)
+    if isinstance(data, dict):
+        for key in LISTING_PAGE_COUNT_KEYS:
+            value = data.get(key)
+            if isinstance(value, int) and not isinstance(value, bool) and value > 0:
+                return value
+        children: Iterable[Any] = data.values()
+    elif isinstance(data, list):
+        children = data
+    else:
+        return None
+    for child in children:
+        found = find_page_count(child, depth + 1)
+        if found:
+            return found
+    return None
@@ -0,0 +1,224 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, Optional
+
+from rate_limit import host_of
+
+logger = logging.getLogger(__name__)
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+BLOCKED_STATUSES = (403, 429)
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, host: str, reason: str) -> None:
+        super().__init__(f"Circuit breaker open for {host}: {reason}")
+        self.host = host
+        self.reason = reason
+
+
+@dataclass
+class BreakerSettings:
+    failure_threshold: int = 5
+    blocked_ratio: float = 0.5
+    min_requests: int = 10
+    window: int = 20
+    cooldown_seconds: int = 900
+
+
+@dataclass
+class _HostCircuit:
+    state: str = STATE_CLOSED
+    consecutive_failures: int = 0
+    open_until: float = 0.0
+    reason: str = ""
+    probe_in_flight: bool = False
+    skipped: int = 0
+    recent_blocked: Deque[bool] = field(default_factory=deque)
+
+
+def _to_iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).replace(microsecond=0).isoformat().replace("+00:00", "Z")
+
+
+def _from_iso(value: Any) -> float:
+    if not isinstance(value, str) or not value:
+        return 0.0
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except Exception:
+        return 0.0
+
+
+class HostCircuitBreaker:
+    """
+    Per-host circuit breaker for product fetches.
+
+    A host opens after `failure_threshold` consecutive failures, or once at least `min_requests`
+    of the last `window` requests have been seen and the share answered with HTTP 403/429 reaches
+    `blocked_ratio`. While open, requests fail fast with CircuitOpenError. After the cooldown (kept
+    in the watch state, so it survives between runs) a single probe is let through: success closes
+    the circuit, failure re-opens it for another cooldown. Requests arriving during the probe wait
+    for its outcome.
+    """
+
+    def __init__(self, settings: BreakerSettings, persisted: Optional[Dict[str, Any]] = None) -> None:
+        self.settings = settings
+        self._cond = threading.Condition()
+        self._hosts: Dict[str, _HostCircuit] = {}
+        for host, data in (persisted or {}).items():
+            if not isinstance(data, dict) or data.get("state") != STATE_OPEN:
+                continue
+            self._hosts[host] = _HostCircuit(
+                state=STATE_OPEN,
+                open_until=_from_iso(data.get("open_until")),
+                reason=str(data.get("reason") or ""),
+            )
+
+    def _circuit(self, host: str) -> _HostCircuit:
+        circuit = self._hosts.get(host)
+        if circuit is None:
+            circuit = self._hosts[host] = _HostCircuit()
+        return circuit
+
+    def _check(self, host: str) -> Optional[bool]:
+        # True = proceed, False = fail fast, None = wait for the in-flight probe.
+        circuit = self._circuit(host)
+        if circuit.state == STATE_CLOSED:
+            return True
+        if circuit.state == STATE_OPEN:
+            if time.time() < circuit.open_until:
+                circuit.skipped += 1
+                return False
+            circuit.state = STATE_HALF_OPEN
+            circuit.probe_in_flight = False
+            logger.info(f"Circuit breaker half-open for {host}; sending a probe request")
+        if not circuit.probe_in_flight:
+            circuit.probe_in_flight = True
+            return True
+        return None
+
+    def allow(self, url: str) -> bool:
+        """
+        Non-blocking pre-check: False while the host's circuit is open and cooling down (counted as a
+        skip). Leaves half-open probing to `before_request`, so callers can fail fast before taking a
+        concurrency slot or rate-limit token and still re-check right before sending.
+        """
+        host = host_of(url)
+        with self._cond:
+            circuit = self._hosts.get(host)
+            if circuit is None or circuit.state != STATE_OPEN or time.time() >= circuit.open_until:
+                return True
+            circuit.skipped += 1
+            return False
+
+    def open_error(self, url: str) -> CircuitOpenError:
+        host = host_of(url)
+        return CircuitOpenError(host, self.reason_for(host))
+
+    def before_request(self, url: str) -> None:
+        host = host_of(url)
+        with self._cond:
+            while True:
+                verdict = self._check(host)
+                if verdict is None:
+                    self._cond.wait()
+                    continue
+                if not verdict:
+                    raise CircuitOpenError(host, self._circuit(host).reason)
+                return
+
+    async def before_request_async(self, url: str) -> None:
+        host = host_of(url)
+        while True:
+            with self._cond:
+                verdict = self._check(host)
+                reason = self._circuit(host).reason
+            if verdict is None:
+                await asyncio.sleep(0.05)
+                continue
+            if not verdict:
+                raise CircuitOpenError(host, reason)
+            return
+
+    def _open(self, host: str, circuit: _HostCircuit, reason: str) -> None:
+        circuit.state = STATE_OPEN
+        circuit.open_until = time.time() + self.settings.cooldown_seconds
+        circuit.reason = reason
+        circuit.probe_in_flight = False
+        circuit.recent_blocked.clear()
+        logger.warning(f"Circuit breaker opened for {host} until {_to_iso(circuit.open_until)}: {reason}")
+
+    def record(self, url: str, *, failed: bool, status_code: Optional[int] = None) -> None:
+        host = host_of(url)
+        s = self.settings
+        with self._cond:
+            circuit = self._circuit(host)
+            if circuit.state == STATE_OPEN:
+                return
+            blocked = status_code in BLOCKED_STATUSES
+            if circuit.state == STATE_HALF_OPEN:
+                if failed:
+                    label = f"HTTP {status_code}" if status_code else "request failure"
+                    self._open(host, circuit, f"probe failed ({label})")
+                else:
+                    circuit.state = STATE_CLOSED
+                    circuit.consecutive_failures = 0
+                    circuit.probe_in_flight = False
+                    logger.info(f"Circuit breaker closed for {host}: probe succeeded")
+                self._cond.notify_all()
+                return
+
+            circuit.recent_blocked.append(blocked)
+            while len(circuit.recent_blocked) > s.window:
+                circuit.recent_blocked.popleft()
+            circuit.consecutive_failures = circuit.consecutive_failures + 1 if failed else 0
+
+            if circuit.consecutive_failures >= s.failure_threshold:
+                self._open(host, circuit, f"{circuit.consecutive_failures} consecutive failures")
+            elif len(circuit.recent_blocked) >= s.min_requests:
+                ratio = sum(circuit.recent_blocked) / len(circuit.recent_blocked)
+                if ratio >= s.blocked_ratio:
+                    self._open(host, circuit, f"{ratio:.0%} of the last {len(circuit.recent_blocked)} requests blocked (HTTP 403/429)")
+
+    def skipped_by_host(self) -> Dict[str, int]:
+        with self._cond:
+            return {host: c.skipped for host, c in self._hosts.items() if c.skipped}
+
+    def reason_for(self, host: str) -> str:
+        with self._cond:
+            circuit = self._hosts.get(host)
+            return circuit.reason if circuit else ""
+
+    def to_state(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                host: {"state": STATE_OPEN, "open_until": _to_iso(c.open_until), "reason": c.reason}
+                for host, c in self._hosts.items()
+                if c.state == STATE_OPEN
+            }
+
+
+def build_circuit_breaker(cfg: Optional[Dict[str, Any]], persisted: Any = None) -> Optional[HostCircuitBreaker]:
+    cfg = cfg if isinstance(cfg, dict) else {}
+    if not bool(cfg.get("enabled", True)):
+        return None
+    defaults = BreakerSettings()
+    settings = BreakerSettings(
+        failure_threshold=max(1, int(cfg.get("failure_threshold") or defaults.failure_threshold)),
+        blocked_ratio=float(cfg.get("blocked_ratio") or defaults.blocked_ratio),
+        min_requests=max(1, int(cfg.get("min_requests") or defaults.min_requests)),
+        window=max(1, int(cfg.get("window") or defaults.window)),
+        cooldown_seconds=max(0, int(cfg.get("cooldown_seconds") if cfg.get("cooldown_seconds") is not None else defaults.cooldown_seconds)),
+    )
+    return HostCircuitBreaker(settings, persisted if isinstance(persisted, dict) else None)
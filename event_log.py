@@ -0,0 +1,521 @@
+#!/usr/bin/env python3
+"""
+Append-only event log for watch_stock.py.
+
+The state file keeps only the latest status per product+size; the event log keeps the history:
+one JSON line per stock transition (including first sight), price change, notification, error and
+a per-run summary. Events are appended to numbered segments under `data/events`
+(`events-000001.jsonl`, ...) and a new segment starts once the current one reaches
+`max_segment_bytes`.
+
+Every segment has a sidecar index (`events-000001.idx.json`) with blocks of byte offsets and
+their timestamp span plus the offsets of each product URL's events, and `index.json` summarises
+all segments, so queries seek straight to the matching lines instead of scanning files. Indexes
+are caches: a segment whose index is missing or behind the file is (re)indexed from where the
+index stops, and a torn last line is truncated. Compaction (on rotation, or `compact`) drops events
+older than `retention_days`, keeps at most `max_segments` segments, merges undersized ones and
+rebuilds their indexes.
+
+  python3 event_log.py query --since 7d --type stock --product beta-ar
+  python3 event_log.py query --since 2026-10-01 --until 2026-10-07 --json   # Oct 1-7 inclusive
+  python3 event_log.py stats
+  python3 event_log.py compact --retention-days 90
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import re
+import sys
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+import json_codec
+
+logger = logging.getLogger(__name__)
+
+EVENT_STOCK = "stock"
+EVENT_PRICE = "price"
+EVENT_NOTIFY = "notify"
+EVENT_ERROR = "error"
+EVENT_RUN = "run"
+EVENT_TYPES = (EVENT_STOCK, EVENT_PRICE, EVENT_NOTIFY, EVENT_ERROR, EVENT_RUN)
+
+DEFAULT_DIRNAME = "events"
+MANIFEST_FILENAME = "index.json"
+SEGMENT_PREFIX = "events-"
+SEGMENT_SUFFIX = ".jsonl"
+INDEX_SUFFIX = ".idx.json"
+SEGMENT_RE = re.compile(r"^events-(\d{6,})\.jsonl$")
+INDEX_VERSION = 1
+# Events per time block; a time-range query reads whole blocks that overlap the range.
+INDEX_BLOCK_EVENTS = 128
+
+DEFAULT_MAX_SEGMENT_BYTES = 4 * 1024 * 1024
+DEFAULT_MAX_SEGMENTS = 0
+DEFAULT_RETENTION_DAYS = 0
+
+
+def utc_now_iso() -> str:
+    return datetime.now(timezone.utc).replace(microsecond=0).isoformat().replace("+00:00", "Z")
+
+
+def format_utc(dt: datetime) -> str:
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc).replace(microsecond=0).isoformat().replace("+00:00", "Z")
+
+
+def parse_time_arg(value: str, *, now: Optional[datetime] = None, end_of_day: bool = False) -> str:
+    """
+    `7d`, `12h`, `30m`, `45s` (ago) or an ISO date/datetime -> the log's UTC timestamp format. With
+    `end_of_day`, a bare date means its last second, so an inclusive upper bound covers that day.
+    """
+    value = (value or "").strip()
+    match = re.fullmatch(r"(\d+)([smhd])", value)
+    if match:
+        unit = {"s": "seconds", "m": "minutes", "h": "hours", "d": "days"}[match.group(2)]
+        return format_utc((now or datetime.now(timezone.utc)) - timedelta(**{unit: int(match.group(1))}))
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected an ISO date/datetime or an age like 7d/12h/30m, got {value!r}")
+    if end_of_day and re.fullmatch(r"\d{4}-\d{2}-\d{2}", value):
+        parsed += timedelta(days=1, seconds=-1)
+    return format_utc(parsed)
+
+
+@dataclass
+class EventLogSettings:
+    directory: str
+    max_segment_bytes: int = DEFAULT_MAX_SEGMENT_BYTES
+    max_segments: int = DEFAULT_MAX_SEGMENTS
+    retention_days: int = DEFAULT_RETENTION_DAYS
+
+
+def build_event_log_settings(cfg: Optional[Dict[str, Any]], *, data_dir: str) -> Optional[EventLogSettings]:
+    cfg = cfg if isinstance(cfg, dict) else {}
+    if not bool(cfg.get("enabled", False)):
+        return None
+    return EventLogSettings(
+        directory=str(cfg.get("dir") or os.path.join(data_dir, DEFAULT_DIRNAME)),
+        max_segment_bytes=max(1024, int(cfg.get("max_segment_bytes") or DEFAULT_MAX_SEGMENT_BYTES)),
+        max_segments=max(0, int(cfg.get("max_segments") or DEFAULT_MAX_SEGMENTS)),
+        retention_days=max(0, int(cfg.get("retention_days") or DEFAULT_RETENTION_DAYS)),
+    )
+
+
+def build_event_log(cfg: Optional[Dict[str, Any]], *, data_dir: str) -> Optional["EventLog"]:
+    settings = build_event_log_settings(cfg, data_dir=data_dir)
+    return EventLog(settings) if settings is not None else None
+
+
+def segment_path(directory: str, seq: int) -> str:
+    return os.path.join(directory, f"{SEGMENT_PREFIX}{seq:06d}{SEGMENT_SUFFIX}")
+
+
+def index_path(directory: str, seq: int) -> str:
+    return os.path.join(directory, f"{SEGMENT_PREFIX}{seq:06d}{INDEX_SUFFIX}")
+
+
+def list_segments(directory: str) -> List[int]:
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    return sorted(int(m.group(1)) for m in map(SEGMENT_RE.match, names) if m)
+
+
+def empty_index(seq: int) -> Dict[str, Any]:
+    return {
+        "version": INDEX_VERSION,
+        "segment": seq,
+        "bytes": 0,
+        "count": 0,
+        "first_ts": None,
+        "last_ts": None,
+        "types": {},
+        # [offset, events, min_ts, max_ts] per block of INDEX_BLOCK_EVENTS events.
+        "blocks": [],
+        "products": {},
+    }
+
+
+def _index_line(index: Dict[str, Any], offset: int, event: Dict[str, Any]) -> None:
+    ts = str(event.get("ts") or "")
+    blocks = index["blocks"]
+    if not blocks or blocks[-1][1] >= INDEX_BLOCK_EVENTS:
+        blocks.append([offset, 0, ts, ts])
+    block = blocks[-1]
+    block[1] += 1
+    block[2] = min(block[2], ts)
+    block[3] = max(block[3], ts)
+    index["count"] += 1
+    index["first_ts"] = ts if index["first_ts"] is None else min(index["first_ts"], ts)
+    index["last_ts"] = ts if index["last_ts"] is None else max(index["last_ts"], ts)
+    kind = str(event.get("type") or "")
+    index["types"][kind] = index["types"].get(kind, 0) + 1
+    url = event.get("url")
+    if url:
+        index["products"].setdefault(str(url), []).append(offset)
+
+
+def index_segment(directory: str, seq: int, index: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Extend `index` (or a fresh one) with the lines past `index["bytes"]`. A torn or undecodable
+    tail (a crash mid-append) is truncated so the next append starts on a line boundary.
+    """
+    path = segment_path(directory, seq)
+    if index is None or index.get("version") != INDEX_VERSION or index.get("bytes", 0) > os.path.getsize(path):
+        index = empty_index(seq)
+    offset = int(index["bytes"])
+    with open(path, "rb") as f:
+        f.seek(offset)
+        data = f.read()
+    good = offset
+    for line in data.splitlines(keepends=True):
+        if not line.endswith(b"\n"):
+            break
+        try:
+            event = json_codec.loads(line)
+        except Exception:
+            break
+        if isinstance(event, dict):
+            _index_line(index, good, event)
+        good += len(line)
+    if good < offset + len(data):
+        logger.warning(f"Event log {path}: dropping {offset + len(data) - good} bytes of torn entries")
+        with open(path, "r+b") as f:
+            f.truncate(good)
+    index["bytes"] = good
+    return index
+
+
+def load_index(directory: str, seq: int) -> Dict[str, Any]:
+    """The segment's index, brought up to date with the segment file when it lags behind."""
+    path = index_path(directory, seq)
+    try:
+        index = json_codec.load_file(path)
+    except Exception:
+        index = None
+    if not isinstance(index, dict) or index.get("bytes") != os.path.getsize(segment_path(directory, seq)):
+        index = index_segment(directory, seq, index if isinstance(index, dict) else None)
+        json_codec.dump_file(path, index)
+    return index
+
+
+def _summary(index: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: index[k] for k in ("segment", "bytes", "count", "first_ts", "last_ts", "types")}
+
+
+def load_manifest(directory: str) -> List[Dict[str, Any]]:
+    """Per-segment summaries; segments whose summary is missing or stale are reindexed."""
+    try:
+        cached = json_codec.load_file(os.path.join(directory, MANIFEST_FILENAME))
+        by_seq = {int(s["segment"]): s for s in cached.get("segments", [])}
+    except Exception:
+        by_seq = {}
+    summaries: List[Dict[str, Any]] = []
+    changed = False
+    for seq in list_segments(directory):
+        summary = by_seq.get(seq)
+        if summary is None or summary.get("bytes") != os.path.getsize(segment_path(directory, seq)):
+            summary = _summary(load_index(directory, seq))
+            changed = True
+        summaries.append(summary)
+    if changed or len(by_seq) != len(summaries):
+        write_manifest(directory, summaries)
+    return summaries
+
+
+def write_manifest(directory: str, summaries: List[Dict[str, Any]]) -> None:
+    json_codec.dump_file(os.path.join(directory, MANIFEST_FILENAME), {"version": INDEX_VERSION, "segments": summaries})
+
+
+def _overlaps(first: Optional[str], last: Optional[str], since: Optional[str], until: Optional[str]) -> bool:
+    if first is None or last is None:
+        return False
+    return (since is None or last >= since) and (until is None or first <= until)
+
+
+def query_events(
+    directory: str,
+    *,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    product: str = "",
+    types: Sequence[str] = (),
+) -> Iterator[Dict[str, Any]]:
+    """
+    Events with `since <= ts <= until`, optionally limited to product URLs containing `product` and
+    to `types`, in log order. Segments are picked from the manifest; within a segment a product
+    query seeks to that product's offsets and a time query reads only the overlapping blocks.
+    """
+    wanted_types = set(types)
+    for summary in load_manifest(directory):
+        if not _overlaps(summary.get("first_ts"), summary.get("last_ts"), since, until):
+            continue
+        if wanted_types and not wanted_types & set(summary.get("types") or {}):
+            continue
+        seq = int(summary["segment"])
+        index = load_index(directory, seq)
+        if product:
+            offsets = sorted(off for url, offs in index["products"].items() if product in url for off in offs)
+            reads = [(off, 1) for off in offsets]
+        else:
+            reads = [(b[0], b[1]) for b in index["blocks"] if _overlaps(b[2], b[3], since, until)]
+        if not reads:
+            continue
+        with open(segment_path(directory, seq), "rb") as f:
+            for offset, lines in reads:
+                f.seek(offset)
+                for _ in range(lines):
+                    event = json_codec.loads(f.readline())
+                    ts = str(event.get("ts") or "")
+                    if (since is not None and ts < since) or (until is not None and ts > until):
+                        continue
+                    if wanted_types and event.get("type") not in wanted_types:
+                        continue
+                    yield event
+
+
+class EventLog:
+    """
+    Buffers a run's events and appends them as one fsynced write on `flush`/`close`, rotating to a
+    new segment first when the batch would push the current one past `max_segment_bytes`.
+    """
+
+    def __init__(self, settings: EventLogSettings) -> None:
+        self.settings = settings
+        self.directory = settings.directory
+        self.run = utc_now_iso()
+        self.pending: List[Dict[str, Any]] = []
+
+    def record(self, kind: str, **fields: Any) -> None:
+        event = {"ts": utc_now_iso(), "type": kind, "run": self.run}
+        event.update({k: v for k, v in fields.items() if v is not None})
+        self.pending.append(event)
+
+    def flush(self) -> None:
+        if not self.pending:
+            return
+        started = time.monotonic()
+        os.makedirs(self.directory, exist_ok=True)
+        lines = [json_codec.dumps_bytes(event) + b"\n" for event in self.pending]
+        batch_bytes = sum(len(line) for line in lines)
+
+        segments = list_segments(self.directory)
+        seq = segments[-1] if segments else 1
+        index = load_index(self.directory, seq) if segments else empty_index(seq)
+        rotated = bool(index["bytes"]) and index["bytes"] + batch_bytes > self.settings.max_segment_bytes
+        if rotated:
+            seq += 1
+            index = empty_index(seq)
+
+        path = segment_path(self.directory, seq)
+        with open(path, "ab") as f:
+            f.write(b"".join(lines))
+            f.flush()
+            os.fsync(f.fileno())
+        offset = int(index["bytes"])
+        for line, event in zip(lines, self.pending):
+            _index_line(index, offset, event)
+            offset += len(line)
+        index["bytes"] = offset
+        json_codec.dump_file(index_path(self.directory, seq), index)
+        self.pending = []
+
+        summaries = [s for s in load_manifest(self.directory) if int(s["segment"]) != seq]
+        write_manifest(self.directory, summaries + [_summary(index)])
+        logger.info(
+            f"Event log: appended {len(lines)} event(s) ({batch_bytes} B) to {os.path.basename(path)} "
+            f"in {(time.monotonic() - started) * 1000:.1f} ms"
+        )
+        if rotated:
+            self.compact()
+
+    def close(self) -> None:
+        try:
+            self.flush()
+        except Exception:
+            logger.warning(f"Failed to write the event log in {self.directory}", exc_info=True)
+
+    def compact(self, *, now: Optional[datetime] = None) -> Dict[str, int]:
+        """
+        Drop events older than `retention_days`, delete the oldest segments beyond `max_segments`,
+        merge adjacent closed segments that fit in one `max_segment_bytes` segment, and rebuild the
+        indexes of every rewritten segment. The newest segment (still being appended) is only
+        subject to retention.
+        """
+        started = time.monotonic()
+        stats = {"dropped_events": 0, "deleted_segments": 0, "merged_segments": 0}
+        summaries = load_manifest(self.directory)
+        if not summaries:
+            return stats
+
+        if self.settings.retention_days > 0:
+            cutoff = format_utc((now or datetime.now(timezone.utc)) - timedelta(days=self.settings.retention_days))
+            for position, summary in enumerate(summaries):
+                if summary["first_ts"] is None or summary["first_ts"] >= cutoff:
+                    continue
+                seq = int(summary["segment"])
+                if summary["last_ts"] < cutoff and position < len(summaries) - 1:
+                    stats["dropped_events"] += int(summary["count"])
+                    stats["deleted_segments"] += 1
+                    self._delete(seq)
+                else:
+                    stats["dropped_events"] += self._rewrite(seq, [seq], cutoff)
+
+        summaries = load_manifest(self.directory)
+        closed = summaries[:-1]
+        if self.settings.max_segments > 0:
+            excess = len(summaries) - self.settings.max_segments
+            for summary in closed[: max(0, excess)]:
+                stats["dropped_events"] += int(summary["count"])
+                stats["deleted_segments"] += 1
+                self._delete(int(summary["segment"]))
+            closed = closed[max(0, excess) :]
+        for summary in closed:
+            if not summary["count"]:
+                stats["deleted_segments"] += 1
+                self._delete(int(summary["segment"]))
+        closed = [s for s in closed if s["count"]]
+
+        groups: List[List[Dict[str, Any]]] = []
+        for summary in closed:
+            if groups and sum(s["bytes"] for s in groups[-1]) + summary["bytes"] <= self.settings.max_segment_bytes:
+                groups[-1].append(summary)
+            else:
+                groups.append([summary])
+        for group in groups:
+            if len(group) > 1:
+                self._rewrite(int(group[0]["segment"]), [int(s["segment"]) for s in group], None)
+                stats["merged_segments"] += len(group) - 1
+
+        load_manifest(self.directory)
+        if any(stats.values()):
+            logger.info(
+                f"Event log compacted: dropped {stats['dropped_events']} event(s), deleted {stats['deleted_segments']} "
+                f"segment(s), merged {stats['merged_segments']} in {(time.monotonic() - started) * 1000:.1f} ms"
+            )
+        return stats
+
+    def _rewrite(self, target: int, sources: List[int], cutoff: Optional[str]) -> int:
+        """Write the events of `sources` (at or after `cutoff`) into segment `target`; returns events dropped."""
+        kept: List[bytes] = []
+        dropped = 0
+        for seq in sources:
+            with open(segment_path(self.directory, seq), "rb") as f:
+                for line in f:
+                    if cutoff is not None and str(json_codec.loads(line).get("ts") or "") < cutoff:
+                        dropped += 1
+                        continue
+                    kept.append(line)
+        path = segment_path(self.directory, target)
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(b"".join(kept))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+        json_codec.dump_file(index_path(self.directory, target), index_segment(self.directory, target))
+        for seq in sources:
+            if seq != target:
+                self._delete(seq)
+        return dropped
+
+    def _delete(self, seq: int) -> None:
+        for path in (segment_path(self.directory, seq), index_path(self.directory, seq)):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+def format_event(event: Dict[str, Any]) -> str:
+    kind = event.get("type")
+    head = f"{event.get('ts')} {kind:<6}"
+    if kind == EVENT_STOCK:
+        previous = {True: "in", False: "out", None: "new"}[event.get("previous")]
+        now = "in" if event.get("in_stock") else "out"
+        return f"{head} {previous}->{now} size={event.get('size')} {event.get('name', '')} {event.get('url')}"
+    if kind == EVENT_PRICE:
+        return (
+            f"{head} {event.get('previous_price')}/{event.get('previous_discount_price')} -> "
+            f"{event.get('price')}/{event.get('discount_price')} {event.get('currency', '')} {event.get('name', '')} {event.get('url')}"
+        )
+    if kind == EVENT_NOTIFY:
+        target = f"size={event.get('size')} {event.get('url')}" if event.get("url") else f"errors={event.get('errors')}"
+        return f"{head} {event.get('channel')} watch={event.get('watch', '')} {target}"
+    if kind == EVENT_ERROR:
+        return f"{head} {event.get('context')}: {event.get('message')}"
+    if kind == EVENT_RUN:
+        return (
+            f"{head} products={event.get('products')} results={event.get('results')} "
+            f"errors={event.get('errors')} duration={event.get('duration_seconds')}s"
+        )
+    return f"{head} {json_codec.dumps_bytes(event).decode('utf-8')}"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="watch_stock event log tools")
+    parser.add_argument("--dir", type=str, default=os.path.join("data", DEFAULT_DIRNAME), help="Event log directory (default: data/events)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    query = sub.add_parser("query", help="Print events by time range, product and type")
+    query.add_argument("--since", type=parse_time_arg, default=None, help="Start: ISO date/datetime (UTC) or age like 7d, 12h")
+    query.add_argument(
+        "--until",
+        type=lambda value: parse_time_arg(value, end_of_day=True),
+        default=None,
+        help="End (inclusive; a bare date covers that whole day): ISO date/datetime (UTC) or age like 1d",
+    )
+    query.add_argument("--product", type=str, default="", help="Only product URLs containing this text")
+    query.add_argument("--type", action="append", default=[], choices=EVENT_TYPES, help="Event type (repeatable)")
+    query.add_argument("--limit", type=int, default=0, help="Stop after this many events (default: all)")
+    query.add_argument("--json", action="store_true", help="Print raw JSON lines")
+    sub.add_parser("stats", help="Summarise segments and event counts")
+    compact = sub.add_parser("compact", help="Apply retention/segment limits, merge small segments, rebuild indexes")
+    compact.add_argument("--retention-days", type=int, default=0, help="Drop events older than this (default: keep)")
+    compact.add_argument("--max-segments", type=int, default=0, help="Keep at most this many segments (default: all)")
+    compact.add_argument("--max-segment-bytes", type=int, default=DEFAULT_MAX_SEGMENT_BYTES, help="Merge target size")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    if not os.path.isdir(args.dir):
+        print(f"No event log at {args.dir}", file=sys.stderr)
+        return 1
+
+    if args.command == "query":
+        shown = 0
+        for event in query_events(args.dir, since=args.since, until=args.until, product=args.product, types=args.type):
+            print(json_codec.dumps_bytes(event).decode("utf-8") if args.json else format_event(event))
+            shown += 1
+            if args.limit and shown >= args.limit:
+                break
+    elif args.command == "stats":
+        totals: Dict[str, int] = {}
+        for s in load_manifest(args.dir):
+            print(f"{os.path.basename(segment_path(args.dir, int(s['segment'])))}: {s['count']} events, {s['bytes']} B, {s['first_ts']} .. {s['last_ts']}")
+            for kind, count in (s.get("types") or {}).items():
+                totals[kind] = totals.get(kind, 0) + int(count)
+        print("Totals: " + (", ".join(f"{kind}={count}" for kind, count in sorted(totals.items())) or "(empty)"))
+    elif args.command == "compact":
+        log = EventLog(
+            EventLogSettings(
+                directory=args.dir,
+                max_segment_bytes=max(1024, args.max_segment_bytes),
+                max_segments=max(0, args.max_segments),
+                retention_days=max(0, args.retention_days),
+            )
+        )
+        stats = log.compact()
+        print(f"Dropped {stats['dropped_events']} events, deleted {stats['deleted_segments']} segments, merged {stats['merged_segments']}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+import json_codec
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIRNAME = "http_cache"
+DEFAULT_MAX_ENTRIES = 5000
+DEFAULT_MAX_BYTES = 200_000_000
+
+
+@dataclass(frozen=True)
+class CacheEntry:
+    url: str
+    etag: str
+    last_modified: str
+
+
+class ProductPageCache:
+    """
+    On-disk conditional-request cache for product pages.
+
+    One file per URL: a small JSON header line with the response validators (ETag / Last-Modified),
+    then the already extracted product payload, so a 304 response can be served without downloading
+    or parsing HTML. `get()` reads the header line only; the payload is parsed by `load_product()`
+    once the server has answered 304. File mtimes double as LRU timestamps; `prune()` evicts the
+    least recently used entries once the cache exceeds `max_entries` or `max_bytes`.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str,
+        *,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ) -> None:
+        self.cache_dir = cache_dir
+        self.max_entries = max(1, int(max_entries))
+        self.max_bytes = max(1, int(max_bytes))
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _path_for(self, url: str) -> str:
+        digest = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.json")
+
+    def get(self, url: str) -> Optional[CacheEntry]:
+        path = self._path_for(url)
+        try:
+            with open(path, "rb") as f:
+                header = json_codec.loads(f.readline())
+        except FileNotFoundError:
+            return None
+        except Exception:
+            logger.debug(f"Ignoring unreadable cache entry: {path}", exc_info=True)
+            return None
+        # Entries written before the header line existed hold the product inline; they count as a
+        # miss once and are rewritten by the next 200 response.
+        if not isinstance(header, dict) or header.get("url") != url or "product" in header:
+            return None
+        return CacheEntry(
+            url=url,
+            etag=str(header.get("etag") or ""),
+            last_modified=str(header.get("last_modified") or ""),
+        )
+
+    def load_product(self, entry: CacheEntry) -> Optional[Dict[str, Any]]:
+        """The cached payload behind `entry`, or None (and the entry dropped) when it cannot be read."""
+        path = self._path_for(entry.url)
+        try:
+            with open(path, "rb") as f:
+                header = json_codec.loads(f.readline())
+                product = json_codec.loads(f.read())
+            if isinstance(header, dict) and header.get("url") == entry.url and isinstance(product, dict):
+                return product
+        except FileNotFoundError:
+            return None
+        except Exception:
+            logger.debug(f"Unreadable cache entry: {path}", exc_info=True)
+        logger.warning(f"Dropping unreadable cache entry for {entry.url}")
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        return None
+
+    @staticmethod
+    def conditional_headers(entry: Optional[CacheEntry]) -> Dict[str, str]:
+        headers: Dict[str, str] = {}
+        if entry is None:
+            return headers
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    def record_hit(self, entry: CacheEntry) -> None:
+        with self._lock:
+            self.hits += 1
+        try:
+            os.utime(self._path_for(entry.url), None)
+        except OSError:
+            pass
+
+    def record_miss(self) -> None:
+        with self._lock:
+            self.misses += 1
+
+    def put(self, url: str, *, etag: str, last_modified: str, product: Dict[str, Any]) -> None:
+        if not etag and not last_modified:
+            return
+        path = self._path_for(url)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        header = {"url": url, "etag": etag, "last_modified": last_modified, "stored_at": int(time.time())}
+        try:
+            with open(tmp, "wb") as f:
+                # Compact JSON never contains a raw newline, so the header is exactly the first line.
+                f.write(json_codec.dumps_bytes(header) + b"\n" + json_codec.dumps_bytes(product))
+            os.replace(tmp, path)
+        except Exception:
+            logger.debug(f"Failed to write cache entry: {path}", exc_info=True)
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            return
+        with self._lock:
+            self.stores += 1
+
+    def prune(self) -> Tuple[int, int]:
+        """Evict least recently used entries; returns (evicted_count, remaining_bytes)."""
+        entries = []
+        total = 0
+        try:
+            with os.scandir(self.cache_dir) as it:
+                for de in it:
+                    if not de.is_file() or not de.name.endswith(".json"):
+                        continue
+                    st = de.stat()
+                    entries.append((st.st_mtime, st.st_size, de.path))
+                    total += st.st_size
+        except FileNotFoundError:
+            return 0, 0
+
+        entries.sort()
+        evicted = 0
+        count = len(entries)
+        for _, size, path in entries:
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            evicted += 1
+            count -= 1
+            total -= size
+        return evicted, total
+
+    def summary(self) -> str:
+        return f"hits(304)={self.hits} misses={self.misses} stored={self.stores}"
+
+
+def build_product_cache(data_dir: str, cfg: Optional[Dict[str, Any]]) -> Optional[ProductPageCache]:
+    cfg = cfg if isinstance(cfg, dict) else {}
+    if not bool(cfg.get("enabled", True)):
+        return None
+    cache_dir = str(cfg.get("dir") or os.path.join(data_dir, DEFAULT_CACHE_DIRNAME))
+    return ProductPageCache(
+        cache_dir,
+        max_entries=int(cfg.get("max_entries") or DEFAULT_MAX_ENTRIES),
+        max_bytes=int(cfg.get("max_bytes") or DEFAULT_MAX_BYTES),
+    )
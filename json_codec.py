@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+from typing import Any, Union
+
+try:
+    import orjson
+
+    ORJSON_AVAILABLE = True
+except Exception:
+    ORJSON_AVAILABLE = False
+
+JSONInput = Union[str, bytes, bytearray, memoryview]
+
+# os.umask can only be read by setting it; done once at import, before any writer threads exist.
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def backend_name() -> str:
+    return "orjson" if ORJSON_AVAILABLE else "json"
+
+
+def loads(data: JSONInput) -> Any:
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    if isinstance(data, memoryview):
+        data = data.tobytes()
+    return json.loads(data)
+
+
+def dumps_bytes(obj: Any, *, pretty: bool = False) -> bytes:
+    """Serialize to UTF-8 bytes; compact unless `pretty` (2-space indent) is requested."""
+    if ORJSON_AVAILABLE:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if pretty else 0)
+        return orjson.dumps(obj, option=option)
+    if pretty:
+        return json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def load_file(path: str) -> Any:
+    with open(path, "rb") as f:
+        return loads(f.read())
+
+
+def dump_file(path: str, obj: Any, *, pretty: bool = False) -> None:
+    """Atomically replace `path`; concurrent writers each use their own temp file, so the last one wins whole."""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        # mkstemp creates the file 0600; keep the permissions a plain open() would have given it.
+        os.chmod(tmp, 0o666 & ~_UMASK)
+        with os.fdopen(fd, "wb") as f:
+            f.write(dumps_bytes(obj, pretty=pretty))
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
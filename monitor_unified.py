@@ -11,19 +11,42 @@ Config is JSON. Telegram credentials are configured via environment variables:
 from __future__ import annotations
 
 import argparse
-import json
+import functools
 import logging
 import os
-import time
 from datetime import datetime
-from typing import Any, Dict, List, Optional, Tuple
-
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import json_codec
+import rate_limit
+from category_scraper import (
+    CATEGORY_SOURCE_HTTP,
+    BrowserSession,
+    ScrapeSettings,
+    configure_chrome_options,
+    extract_category_tiles,
+    log_page_cost,
+    open_category_page,
+    parse_category_source,
+    render_with_snapshot,
+    settle_page,
+)
 from logging_utils import setup_logging
+from uc_driver_cache import DEFAULT_DIRNAME as UC_DRIVER_DIRNAME
+from uc_driver_cache import UcDriverCache
 
 logger = logging.getLogger(__name__)
 
 DEFAULT_CONFIG = "monitor_config.json"
 DEFAULT_LOG_FILE = os.path.join("logs", "monitor_unified.log")
+DEFAULT_DATA_DIR = "data"
+CATALOG_LINK_SELECTOR = ".qa--product-tile__link, a[href*='/shop/']"
+
+# Browser drivers: catalog_changes tasks use undetected-chromedriver, stock_watch tasks keep
+# watch_stock.py's plain selenium Chrome unless their config sets `browser_driver: "uc"`.
+DRIVER_SELENIUM = "selenium"
+DRIVER_UC = "uc"
+BROWSER_DRIVERS = (DRIVER_SELENIUM, DRIVER_UC)
 
 
 def now_local_str() -> str:
@@ -31,16 +54,12 @@ def now_local_str() -> str:
 
 
 def load_json_file(path: str) -> Any:
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
+    return json_codec.load_file(path)
 
 
-def save_json_file(path: str, data: Any) -> None:
-    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
-    tmp = f"{path}.tmp"
-    with open(tmp, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-    os.replace(tmp, path)
+def save_json_file(path: str, data: Any, *, pretty: bool = False) -> None:
+    # Baselines are machine-only; compact output keeps them small and fast to write.
+    json_codec.dump_file(path, data, pretty=pretty)
 
 
 def load_baseline_products(path: str) -> List[dict]:
@@ -128,6 +147,156 @@ def parse_bool(value: Any, default: bool) -> bool:
     return bool(value)
 
 
+def catalog_products_from_tiles(tiles: List[Dict[str, str]], *, max_products: int = 0) -> List[dict]:
+    products: List[dict] = []
+    for tile in tiles:
+        href = tile["url"]
+        product_id = href.rstrip("/").split("/")[-1]
+        products.append(
+            {
+                "id": product_id or href,
+                "name": tile["name"] or product_id or href,
+                "price": tile["price"] or None,
+                "link": href,
+                "timestamp": datetime.now().isoformat(),
+            }
+        )
+
+        if max_products and max_products > 0 and len(products) >= max_products:
+            break
+    return products
+
+
+def fetch_catalog_products_http(*, url: str, max_products: int = 0, scrape: Optional[ScrapeSettings] = None) -> List[dict]:
+    import watch_stock
+
+    scrape = scrape or ScrapeSettings()
+    session = watch_stock.build_http_session(1)
+    try:
+        tiles = watch_stock.fetch_category_tiles_http(
+            session,
+            url,
+            max_pages=scrape.http_max_pages,
+            page_param=scrape.http_page_param,
+        )
+    finally:
+        session.close()
+    return catalog_products_from_tiles(tiles, max_products=max_products)
+
+
+def resolve_chrome_version_main(value: Any) -> Optional[int]:
+    if value is None:
+        env_ver = os.getenv("CHROME_VERSION_MAIN")
+        return int(env_ver) if env_ver and env_ver.isdigit() else None
+    return int(value)
+
+
+def build_uc_driver(
+    *,
+    headless: bool = True,
+    chrome_version_main: Optional[int] = None,
+    scrape: Optional[ScrapeSettings] = None,
+    data_dir: str = DEFAULT_DATA_DIR,
+) -> Any:
+    import undetected_chromedriver as uc
+
+    def make_options() -> Any:
+        # uc refuses to reuse a ChromeOptions object, so every launch attempt gets a fresh one.
+        options = uc.ChromeOptions()
+        options.add_argument("--window-size=1920,1080")
+        options.add_argument("--no-sandbox")
+        options.add_argument("--disable-dev-shm-usage")
+        options.add_argument("--disable-gpu")
+        if headless:
+            options.headless = True
+        configure_chrome_options(options, scrape)
+        return options
+
+    cache = UcDriverCache(os.path.join(data_dir or DEFAULT_DATA_DIR, UC_DRIVER_DIRNAME))
+    chrome_path = uc.find_chrome_executable()
+    cached_driver, detected_major = None, None
+    if chrome_path:
+        try:
+            cached_driver, detected_major = cache.lookup(chrome_path)
+        except Exception as e:
+            logger.warning(f"uc driver cache unavailable: {e}")
+    version_main = int(chrome_version_main) if chrome_version_main else detected_major
+
+    kwargs: Dict[str, Any] = {}
+    if version_main:
+        kwargs["version_main"] = version_main
+    if cached_driver:
+        kwargs["driver_executable_path"] = cached_driver
+
+    try:
+        driver = uc.Chrome(options=make_options(), **kwargs)
+    except Exception as e:
+        if not kwargs:
+            raise
+        logger.warning(f"uc.Chrome({', '.join(f'{k}={v}' for k, v in kwargs.items())}) failed, retrying with defaults: {e}")
+        if cached_driver:
+            cache.invalidate()
+        # The default launch picks whatever driver uc resolves, which may not match the detected version.
+        cached_driver, version_main = None, None
+        driver = uc.Chrome(options=make_options())
+
+    if not cached_driver and version_main:
+        patcher = getattr(driver, "patcher", None)
+        try:
+            cache.store(getattr(patcher, "executable_path", "") or "", version_main)
+        except Exception as e:
+            logger.warning(f"Could not cache the patched chromedriver: {e}")
+    return driver
+
+
+def parse_browser_driver(value: Any, default: str) -> str:
+    driver = str(value or default).strip().lower()
+    if driver not in BROWSER_DRIVERS:
+        raise ValueError(f"Unknown browser_driver: {driver!r} (expected one of: {', '.join(BROWSER_DRIVERS)})")
+    return driver
+
+
+# One Chrome per process per driver kind and launch options, shared by the tasks that ask for it.
+_catalog_browsers: Dict[Tuple[Any, ...], BrowserSession] = {}
+
+
+def get_catalog_browser(
+    *,
+    headless: bool,
+    chrome_version_main: Optional[int],
+    scrape: ScrapeSettings,
+    data_dir: str = DEFAULT_DATA_DIR,
+    driver: str = DRIVER_UC,
+) -> BrowserSession:
+    if driver == DRIVER_SELENIUM:
+        # Plain selenium Chrome ignores chrome_version_main and the uc driver cache.
+        key: Tuple[Any, ...] = (driver, bool(headless), scrape.launch_key())
+    else:
+        key = (driver, bool(headless), chrome_version_main, scrape.launch_key(), data_dir)
+    browser = _catalog_browsers.get(key)
+    if browser is None:
+        if driver == DRIVER_SELENIUM:
+            import watch_stock
+
+            factory: Callable[[], Any] = functools.partial(watch_stock.build_chrome_driver, headless, scrape)
+        else:
+            factory = functools.partial(build_uc_driver, headless=headless, chrome_version_main=chrome_version_main, scrape=scrape, data_dir=data_dir)
+        browser = _catalog_browsers[key] = BrowserSession(
+            factory,
+            max_pages=scrape.browser_max_pages,
+            label="chrome" if driver == DRIVER_SELENIUM else "uc-chrome",
+        )
+    return browser
+
+
+def close_catalog_browsers() -> None:
+    for browser in _catalog_browsers.values():
+        browser.close()
+        if browser.pages:
+            logger.info(f"Browser {browser.label}: {browser.summary()}")
+    _catalog_browsers.clear()
+
+
 def fetch_catalog_products_uc(
     *,
     url: str,
@@ -138,109 +307,40 @@ def fetch_catalog_products_uc(
     max_products: int = 0,
     chrome_version_main: Optional[int] = None,
     page_load_timeout_seconds: int = 90,
+    scrape: Optional[ScrapeSettings] = None,
+    data_dir: str = DEFAULT_DATA_DIR,
 ) -> List[dict]:
-    import undetected_chromedriver as uc
-    from selenium.webdriver.common.by import By
-
-    options = uc.ChromeOptions()
-    options.add_argument("--window-size=1920,1080")
-    options.add_argument("--no-sandbox")
-    options.add_argument("--disable-dev-shm-usage")
-    options.add_argument("--disable-gpu")
-    if headless:
-        options.headless = True
-
-    driver = None
-    try:
-        try:
-            if chrome_version_main:
-                driver = uc.Chrome(options=options, version_main=int(chrome_version_main))
-            else:
-                driver = uc.Chrome(options=options)
-        except Exception:
-            driver = uc.Chrome(options=options)
+    scrape = scrape or ScrapeSettings()
 
+    def scrape_page(driver: Any) -> List[Dict[str, str]]:
         driver.set_page_load_timeout(page_load_timeout_seconds)
-        driver.get(url)
-
-        if render_wait_seconds > 0:
-            time.sleep(render_wait_seconds)
-
-        for _ in range(max(0, scroll_times)):
-            driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(max(0.0, scroll_sleep_seconds))
-
-        elems = driver.find_elements(By.CSS_SELECTOR, ".qa--product-tile__link, a[href*='/shop/']")
-        products: List[dict] = []
-        seen: set[str] = set()
-
-        for e in elems:
-            href = e.get_attribute("href")
-            if not href or "/shop/" not in href:
-                continue
-            href = href.split("?")[0]
-            if href in seen:
-                continue
-            seen.add(href)
-
-            product_id = href.rstrip("/").split("/")[-1] if href else ""
-            name = ""
-            price = ""
-
-            node = e
-            for _ in range(8):
-                try:
-                    node = node.find_element(By.XPATH, "..")
-                except Exception:
-                    break
-
-                if not name:
-                    try:
-                        name_elems = node.find_elements(By.CSS_SELECTOR, ".product-tile-name, [class*='product-tile-name'], [class*='tile-name']")
-                        for ne in name_elems:
-                            t = (ne.text or "").strip()
-                            if t:
-                                name = t
-                                break
-                    except Exception:
-                        pass
-
-                if not price:
-                    try:
-                        price_elems = node.find_elements(By.CSS_SELECTOR, ".qa--product-tile__prices, [class*='price']")
-                        if price_elems:
-                            t = " ".join((price_elems[0].text or "").split())
-                            if t:
-                                price = t
-                    except Exception:
-                        pass
-
-                if name and price:
-                    break
-
-            if not name:
-                name = product_id or href
-
-            products.append(
-                {
-                    "id": product_id or href,
-                    "name": name,
-                    "price": price or None,
-                    "link": href,
-                    "timestamp": datetime.now().isoformat(),
-                }
-            )
-
-            if max_products and max_products > 0 and len(products) >= max_products:
-                break
-
-        return products
-    finally:
-        if driver:
-            try:
-                driver.quit()
-            except Exception:
-                pass
+        open_category_page(driver, url, scrape)
+        settle_page(
+            driver,
+            link_selector=CATALOG_LINK_SELECTOR,
+            settings=scrape,
+            render_wait_seconds=render_wait_seconds,
+            scroll_times=scroll_times,
+            scroll_sleep_seconds=scroll_sleep_seconds,
+            label=url,
+        )
+        tiles = extract_category_tiles(driver, category_url=url, link_selector=CATALOG_LINK_SELECTOR, settings=scrape, label=url)
+        log_page_cost(driver, url, scrape, label=url)
+        return tiles
+
+    def render() -> List[Dict[str, str]]:
+        browser = get_catalog_browser(headless=headless, chrome_version_main=chrome_version_main, scrape=scrape, data_dir=data_dir)
+        return browser.run(scrape_page)
+
+    tiles = render_with_snapshot(
+        url,
+        render,
+        scrape,
+        link_selector=CATALOG_LINK_SELECTOR,
+        extra=(render_wait_seconds, scroll_times, scroll_sleep_seconds),
+        label=url,
+    )
+    return catalog_products_from_tiles(tiles, max_products=max_products)
 
 
 def run_catalog_changes_task(task: Dict[str, Any], *, dry_run: bool) -> bool:
@@ -249,7 +349,7 @@ def run_catalog_changes_task(task: Dict[str, Any], *, dry_run: bool) -> bool:
     if not url:
         raise ValueError("catalog_changes task requires `url`")
 
-    baseline_file = str(task.get("baseline_file") or os.path.join("data", f"catalog_baseline_{name}.json"))
+    baseline_file = str(task.get("baseline_file") or os.path.join(DEFAULT_DATA_DIR, f"catalog_baseline_{name}.json"))
     notify_on_first_run = parse_bool(task.get("notify_on_first_run"), False)
     notify_cfg = task.get("notify") if isinstance(task.get("notify"), dict) else {}
 
@@ -258,26 +358,36 @@ def run_catalog_changes_task(task: Dict[str, Any], *, dry_run: bool) -> bool:
     scroll_times = parse_int(task.get("scroll_times"), 3)
     scroll_sleep_seconds = parse_float(task.get("scroll_sleep_seconds"), 3.0)
     max_products = parse_int(task.get("max_products"), 0)
-    chrome_version_main = task.get("chrome_version_main")
-    if chrome_version_main is None:
-        env_ver = os.getenv("CHROME_VERSION_MAIN")
-        chrome_version_main = int(env_ver) if env_ver and env_ver.isdigit() else None
-    else:
-        chrome_version_main = int(chrome_version_main)
+    chrome_version_main = resolve_chrome_version_main(task.get("chrome_version_main"))
 
     baseline_exists = os.path.exists(baseline_file)
     old_products = load_baseline_products(baseline_file) if baseline_exists else []
 
-    logger.info(f"[{name}] Fetching catalog products: {url}")
-    new_products = fetch_catalog_products_uc(
-        url=url,
-        headless=headless,
-        render_wait_seconds=render_wait_seconds,
-        scroll_times=scroll_times,
-        scroll_sleep_seconds=scroll_sleep_seconds,
-        max_products=max_products,
-        chrome_version_main=chrome_version_main,
-    )
+    category_source = parse_category_source(task.get("category_source"))
+    data_dir = str(task.get("data_dir") or DEFAULT_DATA_DIR)
+    scrape = ScrapeSettings.from_config(task.get("category_scrape"), data_dir=data_dir)
+
+    new_products: Optional[List[dict]] = None
+    if category_source == CATEGORY_SOURCE_HTTP:
+        logger.info(f"[{name}] Reading catalog listing over HTTP: {url}")
+        try:
+            new_products = fetch_catalog_products_http(url=url, max_products=max_products, scrape=scrape)
+        except Exception as e:
+            logger.warning(f"[{name}] HTTP category discovery failed ({e}); falling back to the browser")
+
+    if new_products is None:
+        logger.info(f"[{name}] Fetching catalog products: {url}")
+        new_products = fetch_catalog_products_uc(
+            url=url,
+            headless=headless,
+            render_wait_seconds=render_wait_seconds,
+            scroll_times=scroll_times,
+            scroll_sleep_seconds=scroll_sleep_seconds,
+            max_products=max_products,
+            chrome_version_main=chrome_version_main,
+            scrape=scrape,
+            data_dir=data_dir,
+        )
     logger.info(f"[{name}] Current products: {len(new_products)} baseline_exists={baseline_exists}")
 
     if not baseline_exists:
@@ -336,10 +446,44 @@ def run_stock_watch_task(task: Dict[str, Any], *, dry_run: bool) -> bool:
         config_data = {k: v for k, v in task.items() if k not in {"type", "name"}}
 
     cfg = watch_stock.build_config_from_file(config_data)
-    rc = watch_stock.run_stock_watch(cfg, dry_run=dry_run or bool(task.get("dry_run")))
+    driver = parse_browser_driver(config_data.get("browser_driver") or task.get("browser_driver"), DRIVER_SELENIUM)
+    browser = get_catalog_browser(
+        headless=not cfg.show_browser,
+        chrome_version_main=resolve_chrome_version_main(config_data.get("chrome_version_main")) if driver == DRIVER_UC else None,
+        scrape=ScrapeSettings.from_config(cfg.category_scrape),
+        data_dir=cfg.data_dir,
+        driver=driver,
+    )
+    rc = watch_stock.run_stock_watch(cfg, dry_run=dry_run or bool(task.get("dry_run")), browser=browser)
     return rc == 0
 
 
+def run_tasks(tasks: List[Any], *, dry_run: bool) -> bool:
+    all_ok = True
+    for idx, task in enumerate(tasks):
+        if not isinstance(task, dict):
+            logger.error(f"tasks[{idx}] must be an object")
+            all_ok = False
+            continue
+
+        task_type = str(task.get("type") or "").strip()
+        task_name = str(task.get("name") or f"task-{idx+1}")
+        logger.info(f"==> Running task: {task_type} name={task_name}")
+
+        try:
+            if task_type == "catalog_changes":
+                ok = run_catalog_changes_task(task, dry_run=dry_run)
+            elif task_type == "stock_watch":
+                ok = run_stock_watch_task(task, dry_run=dry_run)
+            else:
+                raise ValueError(f"Unknown task type: {task_type}")
+            all_ok = all_ok and ok
+        except Exception as e:
+            all_ok = False
+            logger.error(f"Task failed: type={task_type} name={task_name} error={e}", exc_info=True)
+    return all_ok
+
+
 def main() -> int:
     parser = argparse.ArgumentParser(description="Arc'teryx unified runner (catalog_changes + stock_watch)")
     parser.add_argument("--config", type=str, default=DEFAULT_CONFIG, help=f"Unified JSON config (default: {DEFAULT_CONFIG})")
@@ -357,34 +501,18 @@ def main() -> int:
 
     setup_logging(level=str(cfg.get("log_level") or "INFO"), log_file=str(cfg.get("log_file") or DEFAULT_LOG_FILE))
 
+    # One limiter for the whole process, so every task paces the same hosts together.
+    rate_limit.configure(rate_limit.build_rate_limiter(cfg.get("rate_limit"), data_dir=str(cfg.get("data_dir") or DEFAULT_DATA_DIR)))
+
     tasks = cfg.get("tasks") or []
     if not isinstance(tasks, list) or not tasks:
         logger.error("Config file must contain a non-empty `tasks` array")
         return 2
 
-    all_ok = True
-    for idx, task in enumerate(tasks):
-        if not isinstance(task, dict):
-            logger.error(f"tasks[{idx}] must be an object")
-            all_ok = False
-            continue
-
-        task_type = str(task.get("type") or "").strip()
-        task_name = str(task.get("name") or f"task-{idx+1}")
-        logger.info(f"==> Running task: {task_type} name={task_name}")
-
-        try:
-            if task_type == "catalog_changes":
-                ok = run_catalog_changes_task(task, dry_run=bool(args.dry_run))
-            elif task_type == "stock_watch":
-                ok = run_stock_watch_task(task, dry_run=bool(args.dry_run))
-            else:
-                raise ValueError(f"Unknown task type: {task_type}")
-            all_ok = all_ok and ok
-        except Exception as e:
-            all_ok = False
-            logger.error(f"Task failed: type={task_type} name={task_name} error={e}", exc_info=True)
-
+    try:
+        all_ok = run_tasks(tasks, dry_run=bool(args.dry_run))
+    finally:
+        close_catalog_browsers()
     return 0 if all_ok else 1
 
 
@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, Optional
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REQUESTS_PER_SECOND = 5.0
+DEFAULT_BURST = 10
+DEFAULT_HOST_LIMITS: Dict[str, Dict[str, float]] = {
+    # Telegram allows roughly one message per second per chat.
+    "api.telegram.org": {"requests_per_second": 1.0, "burst": 3},
+}
+DEFAULT_SHARED_STORE_FILENAME = "rate_limit.sqlite"
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    requests_per_second: float
+    burst: float
+
+    @classmethod
+    def from_config(cls, data: Any, default: "RateLimit") -> "RateLimit":
+        data = data if isinstance(data, dict) else {}
+        rate = float(data.get("requests_per_second") or default.requests_per_second)
+        burst = float(data.get("burst") or default.burst)
+        return cls(requests_per_second=max(0.001, rate), burst=max(1.0, burst))
+
+
+def host_of(url: str) -> str:
+    return (urlparse(url).hostname or "").lower()
+
+
+class _MemoryBuckets:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, Any] = {}
+
+    def reserve(self, host: str, limit: RateLimit) -> float:
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(host, (limit.burst, now))
+            tokens = min(limit.burst, tokens + (now - updated) * limit.requests_per_second) - 1.0
+            self._buckets[host] = (tokens, now)
+        return max(0.0, -tokens / limit.requests_per_second)
+
+
+class _SqliteBuckets:
+    """Token buckets shared between processes through one small SQLite file."""
+
+    def __init__(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS buckets (host TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)")
+
+    def reserve(self, host: str, limit: RateLimit) -> float:
+        # Wall-clock time, because monotonic clocks are not comparable across processes.
+        with self._lock:
+            cur = self._conn.cursor()
+            cur.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                row = cur.execute("SELECT tokens, updated FROM buckets WHERE host = ?", (host,)).fetchone()
+                tokens, updated = row if row else (limit.burst, now)
+                elapsed = max(0.0, now - updated)
+                tokens = min(limit.burst, tokens + elapsed * limit.requests_per_second) - 1.0
+                cur.execute(
+                    "INSERT INTO buckets (host, tokens, updated) VALUES (?, ?, ?) "
+                    "ON CONFLICT(host) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated",
+                    (host, tokens, now),
+                )
+                cur.execute("COMMIT")
+            except Exception:
+                cur.execute("ROLLBACK")
+                raise
+        return max(0.0, -tokens / limit.requests_per_second)
+
+
+class HostRateLimiter:
+    """
+    Per-host token-bucket limiter.
+
+    `reserve()` takes a token immediately and returns how long the caller must wait before sending,
+    letting the bucket go negative; concurrent callers therefore queue up in arrival order without
+    polling. Buckets live in memory, or in a SQLite file when `shared_store` is set so several
+    processes pace the same host together.
+    """
+
+    def __init__(
+        self,
+        *,
+        default: RateLimit,
+        hosts: Optional[Dict[str, RateLimit]] = None,
+        shared_store: str = "",
+    ) -> None:
+        self.default = default
+        self.hosts = {h.lower(): lim for h, lim in (hosts or {}).items()}
+        self.shared_store = shared_store
+        self._buckets: Any = _SqliteBuckets(shared_store) if shared_store else _MemoryBuckets()
+        self._stats_lock = threading.Lock()
+        self._waited: Dict[str, float] = {}
+        self._requests: Dict[str, int] = {}
+
+    def limit_for(self, host: str) -> RateLimit:
+        return self.hosts.get(host, self.default)
+
+    def reserve(self, url: str) -> float:
+        host = host_of(url)
+        if not host:
+            return 0.0
+        try:
+            wait = self._buckets.reserve(host, self.limit_for(host))
+        except Exception as e:
+            # Never let a broken shared store stop the run; fall back to local pacing.
+            logger.warning(f"Rate limiter store failed ({e}); using in-process buckets")
+            self._buckets = _MemoryBuckets()
+            wait = self._buckets.reserve(host, self.limit_for(host))
+        with self._stats_lock:
+            self._requests[host] = self._requests.get(host, 0) + 1
+            self._waited[host] = self._waited.get(host, 0.0) + wait
+        return wait
+
+    def acquire(self, url: str) -> float:
+        wait = self.reserve(url)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, url: str) -> float:
+        if isinstance(self._buckets, _SqliteBuckets):
+            # The shared store is a blocking SQLite transaction with a busy timeout; keep it off the loop.
+            wait = await asyncio.get_running_loop().run_in_executor(None, self.reserve, url)
+        else:
+            wait = self.reserve(url)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def summary(self) -> str:
+        with self._stats_lock:
+            parts = [f"{host}: requests={n} waited={self._waited.get(host, 0.0):.1f}s" for host, n in sorted(self._requests.items())]
+        return "; ".join(parts) or "no requests"
+
+
+def build_rate_limiter(cfg: Optional[Dict[str, Any]], *, data_dir: str = "data") -> Optional[HostRateLimiter]:
+    cfg = cfg if isinstance(cfg, dict) else {}
+    if not bool(cfg.get("enabled", True)):
+        return None
+
+    default = RateLimit.from_config(cfg, RateLimit(DEFAULT_REQUESTS_PER_SECOND, DEFAULT_BURST))
+    hosts_cfg: Dict[str, Any] = dict(DEFAULT_HOST_LIMITS)
+    if isinstance(cfg.get("hosts"), dict):
+        hosts_cfg.update(cfg["hosts"])
+    hosts = {host: RateLimit.from_config(value, default) for host, value in hosts_cfg.items()}
+
+    shared_store = cfg.get("shared_store")
+    if shared_store is True:
+        shared_store = os.path.join(data_dir, DEFAULT_SHARED_STORE_FILENAME)
+    return HostRateLimiter(default=default, hosts=hosts, shared_store=str(shared_store or ""))
+
+
+_active_limiter: Optional[HostRateLimiter] = None
+_active_configured = False
+
+
+def configure(limiter: Optional[HostRateLimiter]) -> None:
+    global _active_limiter, _active_configured
+    _active_limiter = limiter
+    _active_configured = True
+
+
+@contextmanager
+def scoped(limiter: Optional[HostRateLimiter]) -> Iterator[Optional[HostRateLimiter]]:
+    """Make `limiter` the active one inside the block (e.g. one task's own limits), then restore the previous one."""
+    global _active_limiter, _active_configured
+    saved = (_active_limiter, _active_configured)
+    configure(limiter)
+    try:
+        yield limiter
+    finally:
+        _active_limiter, _active_configured = saved
+
+
+def get_rate_limiter() -> Optional[HostRateLimiter]:
+    global _active_limiter, _active_configured
+    if not _active_configured:
+        # Defaults apply even when nothing configured the process explicitly (e.g. library use).
+        configure(build_rate_limiter(None))
+    return _active_limiter
+
+
+def acquire(url: str) -> float:
+    limiter = get_rate_limiter()
+    return limiter.acquire(url) if limiter is not None else 0.0
+
+
+async def acquire_async(url: str) -> float:
+    limiter = get_rate_limiter()
+    return await limiter.acquire_async(url) if limiter is not None else 0.0
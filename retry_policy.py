@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import random
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, FrozenSet, Optional, Tuple
+
+import requests
+
+DEFAULT_RETRY_STATUSES: FrozenSet[int] = frozenset({429, 500, 502, 503, 504})
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    max_attempts: int = 3
+    base_delay_seconds: float = 1.0
+    max_delay_seconds: float = 30.0
+    retry_statuses: FrozenSet[int] = DEFAULT_RETRY_STATUSES
+
+
+@dataclass
+class RetryBudget:
+    """Per-run cap on retries and total backoff time, shared by every fetch worker."""
+
+    max_retries: int = 50
+    max_delay_seconds: float = 120.0
+    retries: int = 0
+    recovered: int = 0
+    exhausted: int = 0
+    delay_spent: float = 0.0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def try_spend(self, delay: float) -> bool:
+        with self._lock:
+            if self.retries >= self.max_retries or self.delay_spent + delay > self.max_delay_seconds:
+                self.exhausted += 1
+                return False
+            self.retries += 1
+            self.delay_spent += delay
+            return True
+
+    def record_recovered(self) -> None:
+        with self._lock:
+            self.recovered += 1
+
+    def summary(self) -> str:
+        return (
+            f"retries={self.retries}/{self.max_retries} recovered={self.recovered} "
+            f"backoff={self.delay_spent:.1f}s/{self.max_delay_seconds:.0f}s budget_exhausted={self.exhausted}"
+        )
+
+
+def status_code_of(exc: BaseException) -> Optional[int]:
+    return getattr(getattr(exc, "response", None), "status_code", None)
+
+
+def retry_after_seconds(exc: BaseException) -> Optional[float]:
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    value = str(headers.get("Retry-After") or "").strip()
+    if not value:
+        return None
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except Exception:
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+def is_retryable(exc: BaseException, policy: RetryPolicy) -> bool:
+    if isinstance(exc, requests.exceptions.HTTPError):
+        return status_code_of(exc) in policy.retry_statuses
+    return isinstance(exc, (requests.exceptions.ConnectionError, requests.exceptions.Timeout, requests.exceptions.ChunkedEncodingError))
+
+
+def plan_retry(
+    exc: BaseException,
+    *,
+    attempt: int,
+    policy: RetryPolicy,
+    budget: Optional[RetryBudget],
+) -> Optional[float]:
+    """Return the delay before the next attempt, or None when the failure should be surfaced."""
+    if attempt >= policy.max_attempts or not is_retryable(exc, policy):
+        return None
+
+    retry_after = retry_after_seconds(exc)
+    if retry_after is not None:
+        # The server told us when to come back; if that is beyond our cap, give up for this run.
+        if retry_after > policy.max_delay_seconds:
+            return None
+        delay = retry_after
+    else:
+        # Capped exponential backoff with full jitter.
+        ceiling = min(policy.max_delay_seconds, policy.base_delay_seconds * (2 ** (attempt - 1)))
+        delay = random.uniform(0, ceiling)
+
+    if budget is not None and not budget.try_spend(delay):
+        return None
+    return delay
+
+
+def build_retry_settings(cfg: Optional[Dict[str, Any]]) -> Tuple[RetryPolicy, RetryBudget]:
+    cfg = cfg if isinstance(cfg, dict) else {}
+    statuses = cfg.get("retry_statuses")
+    policy = RetryPolicy(
+        max_attempts=max(1, int(cfg.get("max_attempts") or RetryPolicy.max_attempts)),
+        base_delay_seconds=max(0.0, float(cfg.get("base_delay_seconds") or RetryPolicy.base_delay_seconds)),
+        max_delay_seconds=max(0.0, float(cfg.get("max_delay_seconds") or RetryPolicy.max_delay_seconds)),
+        retry_statuses=frozenset(int(x) for x in statuses) if isinstance(statuses, list) else DEFAULT_RETRY_STATUSES,
+    )
+    budget = RetryBudget(
+        max_retries=max(0, int(cfg.get("budget_retries") if cfg.get("budget_retries") is not None else RetryBudget.max_retries)),
+        max_delay_seconds=max(0.0, float(cfg.get("budget_seconds") if cfg.get("budget_seconds") is not None else RetryBudget.max_delay_seconds)),
+    )
+    return policy, budget
@@ -0,0 +1,562 @@
+#!/usr/bin/env python3
+"""
+Watch state backends for watch_stock.py.
+
+`json` (default) keeps the whole state in one JSON file, loaded and rewritten per run; with the
+optional journal it appends only changed entries to `<state_file>.journal` and folds them into the
+file once the journal grows. `sqlite` keeps it in tables (products, sizes, notifications,
+error_notify, meta), so a run reads only the rows it looks up and writes only the rows it changes.
+
+One-shot migration of an existing JSON state file:
+  python3 state_store.py migrate data/stock_watch_state.json data/stock_watch_state.sqlite3
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import sqlite3
+import sys
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import json_codec
+
+logger = logging.getLogger(__name__)
+
+STATE_BACKEND_JSON = "json"
+STATE_BACKEND_SQLITE = "sqlite"
+STATE_BACKENDS = (STATE_BACKEND_JSON, STATE_BACKEND_SQLITE)
+DEFAULT_SQLITE_FILENAME = "stock_watch_state.sqlite3"
+STATE_VERSION = 1
+
+JOURNAL_SUFFIX = ".journal"
+DEFAULT_JOURNAL_MAX_BYTES = 8 * 1024 * 1024
+DEFAULT_JOURNAL_MAX_RATIO = 0.5
+JOURNAL_OP_PRODUCT = "product"
+JOURNAL_OP_SIZE = "size"
+JOURNAL_OP_META = "meta"
+JOURNAL_OP_COMMIT = "commit"
+
+PRODUCT_COLUMNS = ("name", "product_id", "last_checked", "tile_availability")
+SIZE_COLUMNS = ("in_stock", "in_stock_colours", "stock_status_by_colour", "size_ids", "last_checked", "last_change")
+SIZE_JSON_COLUMNS = ("in_stock_colours", "stock_status_by_colour", "size_ids")
+NOTIFICATION_COLUMNS = ("notify_count", "last_notified_at")
+ERROR_NOTIFY_COLUMNS = ("last_signature", "last_notified_at")
+ERROR_NOTIFY_KEY = "error_notify"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    url TEXT PRIMARY KEY,
+    name TEXT,
+    product_id TEXT,
+    last_checked TEXT,
+    tile_availability TEXT,
+    extra TEXT
+);
+CREATE TABLE IF NOT EXISTS sizes (
+    url TEXT NOT NULL,
+    size_label TEXT NOT NULL,
+    in_stock INTEGER,
+    in_stock_colours TEXT,
+    stock_status_by_colour TEXT,
+    size_ids TEXT,
+    last_checked TEXT,
+    last_change TEXT,
+    extra TEXT,
+    PRIMARY KEY (url, size_label)
+);
+CREATE TABLE IF NOT EXISTS notifications (
+    url TEXT NOT NULL,
+    size_label TEXT NOT NULL,
+    notify_count INTEGER NOT NULL DEFAULT 0,
+    last_notified_at TEXT,
+    PRIMARY KEY (url, size_label)
+);
+CREATE TABLE IF NOT EXISTS error_notify (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    last_signature TEXT,
+    last_notified_at TEXT
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class StateStore(ABC):
+    """
+    Per-product and per-size watch state plus run metadata (`circuit_breakers`, `error_notify`,
+    `updated_at`). Getters return plain dicts shaped like the JSON state file's entries; callers
+    mutate them and hand them back through the matching `put_*` call.
+    """
+
+    existed: bool = False
+
+    @abstractmethod
+    def get_product(self, product_url: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def put_product(self, product_url: str, fields: Dict[str, Any]) -> None:
+        ...
+
+    @abstractmethod
+    def get_size(self, product_url: str, size_label: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def put_size(self, product_url: str, size_label: str, size_state: Dict[str, Any]) -> None:
+        ...
+
+    @abstractmethod
+    def get_meta(self, key: str) -> Any:
+        ...
+
+    @abstractmethod
+    def set_meta(self, key: str, value: Any) -> None:
+        ...
+
+    @abstractmethod
+    def save(self) -> None:
+        ...
+
+    def close(self) -> None:
+        pass
+
+
+def load_state(path: str) -> Dict[str, Any]:
+    if not os.path.exists(path):
+        return {"version": STATE_VERSION, "products": {}}
+    try:
+        data = json_codec.load_file(path)
+        if not isinstance(data, dict):
+            return {"version": STATE_VERSION, "products": {}}
+        if "products" not in data or not isinstance(data.get("products"), dict):
+            data["products"] = {}
+        data.setdefault("version", STATE_VERSION)
+        return data
+    except Exception:
+        return {"version": STATE_VERSION, "products": {}}
+
+
+def save_state(path: str, state: Dict[str, Any], *, pretty: bool = False) -> None:
+    # The state file is machine-only, so it is written compact unless `pretty_state` is set.
+    json_codec.dump_file(path, state, pretty=pretty)
+
+
+@dataclass
+class JournalSettings:
+    max_bytes: int = DEFAULT_JOURNAL_MAX_BYTES
+    max_ratio: float = DEFAULT_JOURNAL_MAX_RATIO
+
+
+def build_journal_settings(cfg: Optional[Dict[str, Any]]) -> Optional[JournalSettings]:
+    cfg = cfg if isinstance(cfg, dict) else {}
+    if not bool(cfg.get("enabled", False)):
+        return None
+    defaults = JournalSettings()
+    return JournalSettings(
+        max_bytes=max(0, int(cfg.get("max_bytes") or defaults.max_bytes)),
+        max_ratio=max(0.0, float(cfg.get("max_ratio") or defaults.max_ratio)),
+    )
+
+
+class JsonStateStore(StateStore):
+    """
+    The whole state as one nested dict, read at open.
+
+    Without a journal every save rewrites the file. With one, `put_*`/`set_meta` mark entries dirty
+    and a save appends just those entries to `<path>.journal` as one batch closed by a commit line
+    (fsynced). Opening the store replays committed batches on top of the file and drops a torn or
+    uncommitted tail. Once the journal passes `max_bytes`, or `max_ratio` of the file's size, it is
+    compacted: the full state is written atomically and the journal removed. Entries are whole
+    values, so replaying a journal that outlived its compaction is harmless.
+    """
+
+    def __init__(self, path: str, *, pretty: bool = False, journal: Optional[JournalSettings] = None) -> None:
+        self.path = path
+        self.pretty = pretty
+        self.journal = journal
+        self.journal_path = path + JOURNAL_SUFFIX
+        self.existed = os.path.exists(path) or os.path.exists(self.journal_path)
+        self.state = load_state(path)
+        self._dirty_products: Set[str] = set()
+        self._dirty_sizes: Set[Tuple[str, str]] = set()
+        self._dirty_meta: Set[str] = set()
+        self._replay()
+
+    def _products(self) -> Dict[str, Any]:
+        return self.state.setdefault("products", {})
+
+    def get_product(self, product_url: str) -> Optional[Dict[str, Any]]:
+        prod = self._products().get(product_url)
+        return prod if isinstance(prod, dict) else None
+
+    def put_product(self, product_url: str, fields: Dict[str, Any]) -> None:
+        prod = self._products().setdefault(product_url, {})
+        if prod is not fields:
+            prod.update(fields)
+        self._dirty_products.add(product_url)
+
+    def get_size(self, product_url: str, size_label: str) -> Optional[Dict[str, Any]]:
+        prod = self.get_product(product_url)
+        sizes = prod.get("sizes") if prod is not None else None
+        if not isinstance(sizes, dict):
+            return None
+        size_state = sizes.get(size_label)
+        return size_state if isinstance(size_state, dict) else None
+
+    def put_size(self, product_url: str, size_label: str, size_state: Dict[str, Any]) -> None:
+        prod = self._products().setdefault(product_url, {})
+        sizes = prod.get("sizes")
+        if not isinstance(sizes, dict):
+            sizes = prod["sizes"] = {}
+        sizes[size_label] = size_state
+        self._dirty_sizes.add((product_url, size_label))
+
+    def get_meta(self, key: str) -> Any:
+        return self.state.get(key)
+
+    def set_meta(self, key: str, value: Any) -> None:
+        self.state[key] = value
+        self._dirty_meta.add(key)
+
+    def _apply(self, entry: Dict[str, Any]) -> None:
+        op = entry.get("op")
+        value = entry.get("value")
+        if op == JOURNAL_OP_PRODUCT and isinstance(value, dict):
+            self._products().setdefault(str(entry.get("url")), {}).update(value)
+        elif op == JOURNAL_OP_SIZE and isinstance(value, dict):
+            prod = self._products().setdefault(str(entry.get("url")), {})
+            sizes = prod.get("sizes")
+            if not isinstance(sizes, dict):
+                sizes = prod["sizes"] = {}
+            sizes[str(entry.get("size"))] = value
+        elif op == JOURNAL_OP_META:
+            self.state[str(entry.get("key"))] = value
+
+    def _replay(self) -> None:
+        try:
+            with open(self.journal_path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return
+        batch: List[Dict[str, Any]] = []
+        applied = batches = 0
+        committed_at = offset = 0
+        for line in data.splitlines(keepends=True):
+            if not line.endswith(b"\n"):
+                break
+            try:
+                entry = json_codec.loads(line)
+            except Exception:
+                break
+            offset += len(line)
+            if not isinstance(entry, dict):
+                break
+            if entry.get("op") == JOURNAL_OP_COMMIT:
+                for pending in batch:
+                    self._apply(pending)
+                applied += len(batch)
+                batches += 1
+                batch = []
+                committed_at = offset
+            else:
+                batch.append(entry)
+        if committed_at < len(data):
+            logger.warning(f"State journal {self.journal_path}: dropping {len(data) - committed_at} bytes of uncommitted or torn entries")
+            with open(self.journal_path, "r+b") as f:
+                f.truncate(committed_at)
+        logger.info(f"State journal: replayed {applied} entries from {batches} batch(es)")
+
+    def _journal_lines(self) -> List[bytes]:
+        entries: List[Dict[str, Any]] = []
+        for url in sorted(self._dirty_products):
+            prod = self.get_product(url)
+            if prod is not None:
+                entries.append({"op": JOURNAL_OP_PRODUCT, "url": url, "value": {k: v for k, v in prod.items() if k != "sizes"}})
+        for url, size_label in sorted(self._dirty_sizes):
+            size_state = self.get_size(url, size_label)
+            if size_state is not None:
+                entries.append({"op": JOURNAL_OP_SIZE, "url": url, "size": size_label, "value": size_state})
+        for key in sorted(self._dirty_meta):
+            entries.append({"op": JOURNAL_OP_META, "key": key, "value": self.state.get(key)})
+        if not entries:
+            return []
+        entries.append({"op": JOURNAL_OP_COMMIT, "at": time.time()})
+        return [json_codec.dumps_bytes(entry) + b"\n" for entry in entries]
+
+    def _clear_dirty(self) -> None:
+        self._dirty_products.clear()
+        self._dirty_sizes.clear()
+        self._dirty_meta.clear()
+
+    def _should_compact(self, pending_bytes: int = 0) -> bool:
+        assert self.journal is not None
+        try:
+            journal_bytes = os.path.getsize(self.journal_path) + pending_bytes
+        except OSError:
+            journal_bytes = pending_bytes
+        if not journal_bytes:
+            return False
+        if not os.path.exists(self.path) or journal_bytes >= self.journal.max_bytes:
+            return True
+        return journal_bytes >= self.journal.max_ratio * os.path.getsize(self.path)
+
+    def _mostly_dirty(self) -> bool:
+        assert self.journal is not None
+        dirty = len(self._dirty_products) + len(self._dirty_sizes)
+        if not dirty:
+            return False
+        products = self._products()
+        total = len(products) + sum(len(p.get("sizes") or {}) for p in products.values() if isinstance(p, dict))
+        return dirty >= self.journal.max_ratio * total
+
+    def compact(self) -> None:
+        started = time.monotonic()
+        save_state(self.path, self.state, pretty=self.pretty)
+        try:
+            os.remove(self.journal_path)
+        except FileNotFoundError:
+            pass
+        self._clear_dirty()
+        logger.info(f"State journal compacted into {self.path} in {(time.monotonic() - started) * 1000:.1f} ms")
+
+    def save(self) -> None:
+        if self.journal is None:
+            # A journal left by an earlier journaled run was replayed at open and is folded in here.
+            if os.path.exists(self.journal_path):
+                self.compact()
+            else:
+                save_state(self.path, self.state, pretty=self.pretty)
+                self._clear_dirty()
+            return
+        started = time.monotonic()
+        if self._mostly_dirty():
+            # Most entries changed (e.g. `last_checked` rewritten everywhere): a journal batch would
+            # be about as large as the file and compact right away, so write the snapshot directly.
+            self.compact()
+            return
+        lines = self._journal_lines()
+        if lines and self._should_compact(sum(len(line) for line in lines)):
+            # Appending this batch would push the journal past its limits: write the snapshot directly.
+            self.compact()
+            return
+        self._clear_dirty()
+        if lines:
+            with open(self.journal_path, "ab") as f:
+                f.write(b"".join(lines))
+                f.flush()
+                os.fsync(f.fileno())
+            logger.info(
+                f"State journal: appended {len(lines) - 1} entries ({sum(len(line) for line in lines)} B) "
+                f"in {(time.monotonic() - started) * 1000:.1f} ms"
+            )
+        if self._should_compact():
+            self.compact()
+
+
+def _dump_json(value: Any) -> Optional[str]:
+    return None if value is None else json_codec.dumps_bytes(value).decode("utf-8")
+
+
+def _load_json(text: Any) -> Any:
+    if not text:
+        return None
+    try:
+        return json_codec.loads(text)
+    except Exception:
+        return None
+
+
+class SqliteStateStore(StateStore):
+    """
+    State in a SQLite database. Reads are per-row lookups; writes are upserts inside one
+    transaction that `save` commits, so a crashed run leaves the previous state intact.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.existed = os.path.exists(path)
+        parent = os.path.dirname(path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+
+    def get_product(self, product_url: str) -> Optional[Dict[str, Any]]:
+        row = self.conn.execute(
+            f"SELECT {', '.join(PRODUCT_COLUMNS)}, extra FROM products WHERE url = ?", (product_url,)
+        ).fetchone()
+        if row is None:
+            return None
+        prod = _load_json(row[-1]) or {}
+        prod.update({k: v for k, v in zip(PRODUCT_COLUMNS, row) if v is not None})
+        return prod
+
+    def put_product(self, product_url: str, fields: Dict[str, Any]) -> None:
+        merged = self.get_product(product_url) or {}
+        merged.update(fields)
+        merged.pop("sizes", None)
+        extra = {k: v for k, v in merged.items() if k not in PRODUCT_COLUMNS}
+        self.conn.execute(
+            f"INSERT OR REPLACE INTO products (url, {', '.join(PRODUCT_COLUMNS)}, extra) VALUES (?{', ?' * (len(PRODUCT_COLUMNS) + 1)})",
+            (product_url, *(merged.get(k) for k in PRODUCT_COLUMNS), _dump_json(extra) if extra else None),
+        )
+
+    def get_size(self, product_url: str, size_label: str) -> Optional[Dict[str, Any]]:
+        row = self.conn.execute(
+            f"SELECT {', '.join(SIZE_COLUMNS)}, extra FROM sizes WHERE url = ? AND size_label = ?",
+            (product_url, size_label),
+        ).fetchone()
+        if row is None:
+            return None
+        size_state = _load_json(row[-1]) or {}
+        for key, value in zip(SIZE_COLUMNS, row):
+            if key == "in_stock":
+                if value is not None:
+                    size_state[key] = bool(value)
+            elif key in SIZE_JSON_COLUMNS:
+                size_state[key] = _load_json(value) or ({} if key == "stock_status_by_colour" else [])
+            else:
+                size_state[key] = value
+        notify = self.conn.execute(
+            "SELECT notify_count, last_notified_at FROM notifications WHERE url = ? AND size_label = ?",
+            (product_url, size_label),
+        ).fetchone()
+        size_state["notify_count"] = int(notify[0]) if notify else 0
+        size_state["last_notified_at"] = notify[1] if notify else None
+        return size_state
+
+    def put_size(self, product_url: str, size_label: str, size_state: Dict[str, Any]) -> None:
+        values = []
+        for key in SIZE_COLUMNS:
+            value = size_state.get(key)
+            if key == "in_stock":
+                value = None if value is None else int(bool(value))
+            elif key in SIZE_JSON_COLUMNS:
+                value = _dump_json(value)
+            values.append(value)
+        extra = {k: v for k, v in size_state.items() if k not in SIZE_COLUMNS and k not in NOTIFICATION_COLUMNS}
+        self.conn.execute(
+            f"INSERT OR REPLACE INTO sizes (url, size_label, {', '.join(SIZE_COLUMNS)}, extra) VALUES (?, ?{', ?' * (len(SIZE_COLUMNS) + 1)})",
+            (product_url, size_label, *values, _dump_json(extra) if extra else None),
+        )
+        try:
+            notify_count = int(size_state.get("notify_count") or 0)
+        except Exception:
+            notify_count = 0
+        self.conn.execute(
+            "INSERT OR REPLACE INTO notifications (url, size_label, notify_count, last_notified_at) VALUES (?, ?, ?, ?)",
+            (product_url, size_label, notify_count, size_state.get("last_notified_at")),
+        )
+
+    def get_meta(self, key: str) -> Any:
+        if key == ERROR_NOTIFY_KEY:
+            row = self.conn.execute(f"SELECT {', '.join(ERROR_NOTIFY_COLUMNS)} FROM error_notify WHERE id = 1").fetchone()
+            return dict(zip(ERROR_NOTIFY_COLUMNS, row)) if row else None
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return _load_json(row[0]) if row else None
+
+    def set_meta(self, key: str, value: Any) -> None:
+        if key == ERROR_NOTIFY_KEY:
+            value = value if isinstance(value, dict) else {}
+            self.conn.execute(
+                f"INSERT OR REPLACE INTO error_notify (id, {', '.join(ERROR_NOTIFY_COLUMNS)}) VALUES (1, ?, ?)",
+                tuple(value.get(k) for k in ERROR_NOTIFY_COLUMNS),
+            )
+            return
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, _dump_json(value)))
+
+    def save(self) -> None:
+        self.conn.commit()
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+def migrate_json_state(json_path: str, store: SqliteStateStore) -> Tuple[int, int]:
+    """Copy every product, size and metadata entry of a JSON state file (and its journal) into `store`; returns (products, sizes)."""
+    state = JsonStateStore(json_path).state
+    products = sizes = 0
+    for url, prod in state.get("products", {}).items():
+        if not isinstance(prod, dict):
+            continue
+        store.put_product(url, {k: v for k, v in prod.items() if k != "sizes"})
+        products += 1
+        for size_label, size_state in (prod.get("sizes") or {}).items():
+            if isinstance(size_state, dict):
+                store.put_size(url, str(size_label), size_state)
+                sizes += 1
+    for key, value in state.items():
+        if key not in ("products", "version"):
+            store.set_meta(key, value)
+    store.set_meta("version", state.get("version", STATE_VERSION))
+    store.save()
+    return products, sizes
+
+
+def open_state_store(
+    backend: str,
+    *,
+    state_file: str,
+    state_db: str = "",
+    pretty: bool = False,
+    journal: Optional[JournalSettings] = None,
+) -> StateStore:
+    """Open the configured backend. A new SQLite database is seeded once from `state_file` if that exists."""
+    if backend == STATE_BACKEND_JSON:
+        return JsonStateStore(state_file, pretty=pretty, journal=journal)
+    if backend != STATE_BACKEND_SQLITE:
+        raise ValueError(f"Unknown state_backend: {backend!r} (expected one of: {', '.join(STATE_BACKENDS)})")
+
+    db_path = state_db or os.path.join(os.path.dirname(state_file), DEFAULT_SQLITE_FILENAME)
+    store = SqliteStateStore(db_path)
+    if not store.existed and (os.path.exists(state_file) or os.path.exists(state_file + JOURNAL_SUFFIX)):
+        started = time.monotonic()
+        products, sizes = migrate_json_state(state_file, store)
+        store.existed = True
+        logger.info(f"Migrated {state_file} to {db_path}: {products} products, {sizes} sizes in {time.monotonic() - started:.2f}s")
+    return store
+
+
+def parse_state_backend(value: Any) -> str:
+    backend = str(value or STATE_BACKEND_JSON).strip().lower()
+    if backend not in STATE_BACKENDS:
+        raise ValueError(f"Unknown state_backend: {value!r} (expected one of: {', '.join(STATE_BACKENDS)})")
+    return backend
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="watch_stock state tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+    migrate = sub.add_parser("migrate", help="Copy a JSON state file into a new SQLite database")
+    migrate.add_argument("json_path")
+    migrate.add_argument("sqlite_path")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    if args.command == "migrate":
+        if os.path.exists(args.sqlite_path):
+            print(f"Refusing to overwrite existing database: {args.sqlite_path}", file=sys.stderr)
+            return 1
+        store = SqliteStateStore(args.sqlite_path)
+        try:
+            started = time.monotonic()
+            products, sizes = migrate_json_state(args.json_path, store)
+        finally:
+            store.close()
+        print(f"Migrated {products} products, {sizes} sizes in {time.monotonic() - started:.2f}s -> {args.sqlite_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
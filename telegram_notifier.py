@@ -18,6 +18,8 @@ from typing import Any, Dict, Iterable, List, Optional, Sequence
 
 import requests
 
+import rate_limit
+
 logger = logging.getLogger(__name__)
 
 TELEGRAM_MAX_MESSAGE_LEN = 4096
@@ -90,6 +92,7 @@ class TelegramNotifier:
                     "disable_web_page_preview": disable_web_page_preview,
                 }
                 try:
+                    rate_limit.acquire(url)
                     resp = requests.post(url, data=payload, timeout=self.timeout)
                     if resp.status_code != 200:
                         ok = False
@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import rate_limit  # noqa: E402
+
+
+class _BlockingHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    hits: Dict[str, int] = {}
+    lock = threading.Lock()
+
+    def log_message(self, *args: object) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        with self.lock:
+            self.hits[self.path] = self.hits.get(self.path, 0) + 1
+        self.send_response(403)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+
+@pytest.fixture
+def blocking_server() -> Iterator[ThreadingHTTPServer]:
+    """Local server answering every GET with HTTP 403; `server.hits` counts requests per path."""
+    handler = type("Handler", (_BlockingHandler,), {"hits": {}, "lock": threading.Lock()})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.hits = handler.hits  # type: ignore[attr-defined]
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def restore_rate_limiter() -> Iterator[None]:
+    saved = (rate_limit._active_limiter, rate_limit._active_configured)
+    try:
+        yield
+    finally:
+        rate_limit._active_limiter, rate_limit._active_configured = saved
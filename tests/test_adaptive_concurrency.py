@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import requests
+
+from adaptive_concurrency import (
+    OUTCOME_ERROR,
+    OUTCOME_GONE,
+    OUTCOME_OK,
+    OUTCOME_SKIPPED,
+    OUTCOME_THROTTLED,
+    AdaptiveConcurrencyController,
+    AdaptiveSettings,
+    build_controller,
+)
+from watch_stock import classify_fetch_outcome
+
+
+def controller(**overrides: object) -> AdaptiveConcurrencyController:
+    settings = AdaptiveSettings(min_limit=1, max_limit=32, initial_limit=8, window=10, **overrides)  # type: ignore[arg-type]
+    return AdaptiveConcurrencyController(settings)
+
+
+def run_window(c: AdaptiveConcurrencyController, outcomes: list, latency: float = 0.1) -> None:
+    for outcome in outcomes:
+        c.acquire()
+        c.release(latency, outcome)
+
+
+def test_additive_increase_when_saturated() -> None:
+    c = controller()
+    # Keep every slot in use so growth is allowed.
+    for _ in range(c.limit):
+        c.acquire()
+    for _ in range(10):
+        c.release(0.1, OUTCOME_OK)
+        c.acquire()
+    assert c.limit == 9
+
+
+def test_throttling_cuts_multiplicatively_once_per_window() -> None:
+    c = controller()
+    run_window(c, [OUTCOME_THROTTLED] * 3)
+    assert c.limit == 4
+    assert [ch["to"] for ch in c.changes] == [4]
+
+
+def test_latency_backoff_factor_from_config(tmp_path) -> None:
+    c = build_controller(
+        {"enabled": True, "window": 10, "target_p95_seconds": 1.0, "latency_backoff_factor": 0.5},
+        initial_limit=8,
+        max_limit=32,
+        metrics_path=str(tmp_path / "m.json"),
+    )
+    assert c is not None and c.settings.latency_backoff_factor == 0.5
+    run_window(c, [OUTCOME_OK] * 10, latency=2.0)
+    assert c.limit == 4
+
+
+def test_missing_products_are_not_errors() -> None:
+    c = controller(max_error_rate=0.05)
+    run_window(c, [OUTCOME_GONE] * 5 + [OUTCOME_OK] * 5)
+    assert c.limit == 8
+    run_window(c, [OUTCOME_ERROR] * 5 + [OUTCOME_OK] * 5)
+    assert c.limit == 6
+
+
+def test_skipped_slots_are_not_samples() -> None:
+    c = controller()
+    c.acquire()
+    c.release(0.0, OUTCOME_SKIPPED)
+    assert c.in_flight == 0 and c.samples_total == 0
+
+
+def http_error(status: int) -> requests.exceptions.HTTPError:
+    response = requests.Response()
+    response.status_code = status
+    return requests.exceptions.HTTPError(f"{status}", response=response)
+
+
+def test_classify_fetch_outcome() -> None:
+    assert classify_fetch_outcome(None) == OUTCOME_OK
+    assert classify_fetch_outcome(http_error(429)) == OUTCOME_THROTTLED
+    assert classify_fetch_outcome(http_error(404)) == OUTCOME_GONE
+    assert classify_fetch_outcome(http_error(410)) == OUTCOME_GONE
+    assert classify_fetch_outcome(http_error(500)) == OUTCOME_ERROR
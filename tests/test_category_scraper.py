@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import json
+import shutil
+import subprocess
+from typing import Dict, List
+
+import pytest
+
+from category_scraper import (
+    DEFAULT_SNAPSHOT_TTL_SECONDS,
+    TILE_EXTRACTION_JS,
+    TILE_MAX_ANCESTORS,
+    TILE_SOLD_OUT_TEXT_PATTERN,
+    FallbackTiles,
+    ScrapeSettings,
+    render_with_snapshot,
+)
+
+URL = "https://outlet.arcteryx.com/ca/en/c/mens"
+TILES = [{"url": "https://outlet.arcteryx.com/ca/en/shop/beta-jacket", "name": "Beta Jacket", "description": "", "price": "", "availability": ""}]
+
+
+class Renderer:
+    def __init__(self, *results: List[Dict[str, str]]) -> None:
+        self.results = list(results)
+        self.calls = 0
+
+    def __call__(self) -> List[Dict[str, str]]:
+        self.calls += 1
+        return self.results.pop(0) if len(self.results) > 1 else self.results[0]
+
+
+def snapshot_settings(tmp_path: str, **overrides: object) -> ScrapeSettings:
+    return ScrapeSettings.from_config({"snapshot_ttl_seconds": 300, **overrides}, data_dir=str(tmp_path))
+
+
+def test_snapshots_are_opt_in(tmp_path: str) -> None:
+    assert DEFAULT_SNAPSHOT_TTL_SECONDS == 0
+    settings = ScrapeSettings.from_config({}, data_dir=str(tmp_path))
+    render = Renderer(TILES)
+    for _ in range(2):
+        assert render_with_snapshot(URL, render, settings, link_selector="a") == TILES
+    assert render.calls == 2
+
+
+def test_snapshot_is_reused_only_for_matching_settings(tmp_path: str) -> None:
+    render = Renderer(TILES)
+    settings = snapshot_settings(tmp_path)
+    for _ in range(2):
+        assert render_with_snapshot(URL, render, settings, link_selector="a") == TILES
+    assert render.calls == 1
+
+    render_with_snapshot(URL, render, settings, link_selector="a.tile")
+    render_with_snapshot(URL, render, snapshot_settings(tmp_path, wait_mode="harvest"), link_selector="a")
+    render_with_snapshot(URL, render, settings, link_selector="a", extra=(30, 5))
+    assert render.calls == 4
+
+
+def test_empty_and_fallback_renders_are_not_stored(tmp_path: str) -> None:
+    settings = snapshot_settings(tmp_path)
+    render = Renderer([], FallbackTiles(TILES), TILES)
+    assert render_with_snapshot(URL, render, settings, link_selector="a") == []
+    assert render_with_snapshot(URL, render, settings, link_selector="a") == TILES
+    assert render_with_snapshot(URL, render, settings, link_selector="a") == TILES
+    assert render_with_snapshot(URL, render, settings, link_selector="a") == TILES
+    assert render.calls == 3
+
+
+# Minimal DOM for running TILE_EXTRACTION_JS under node: selectors are role names, and an element
+# matches a selector when it carries that role.
+FAKE_DOM_JS = r"""
+class El {
+  constructor(spec, parent) {
+    this.roles = spec.roles || [];
+    this.ownText = spec.text || "";
+    this.href = spec.href || "";
+    this.parentElement = parent;
+    this.children = (spec.children || []).map((c) => new El(c, this));
+  }
+  get innerText() { return [this.ownText, ...this.children.map((c) => c.innerText)].filter(Boolean).join("\n"); }
+  descendants() { return this.children.flatMap((c) => [c, ...c.descendants()]); }
+  matches(sel) { return sel === "*" || this.roles.includes(sel); }
+  querySelectorAll(sel) { return this.descendants().filter((e) => e.matches(sel)); }
+  querySelector(sel) { return this.querySelectorAll(sel)[0] || null; }
+}
+const document = new El(JSON.parse(process.argv[1]), null);
+const args = JSON.parse(process.argv[2]);
+const extract = new Function("document", "arguments", process.argv[3]);
+process.stdout.write(JSON.stringify(extract(document, args)));
+"""
+
+
+def card(slug: str, *extra: Dict[str, object]) -> Dict[str, object]:
+    return {
+        "children": [
+            {"roles": ["link"], "href": f"https://outlet.arcteryx.com/ca/en/shop/{slug}"},
+            {"roles": ["name"], "text": slug},
+            {"roles": ["price"], "text": "$300"},
+            *extra,
+        ]
+    }
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="node not installed")
+def test_sold_out_needs_a_badge_not_a_mention() -> None:
+    page = {
+        "children": [
+            card("mentions", {"roles": ["desc"], "text": "Sold out in Black, other colours available"}),
+            card("badge-text", {"roles": ["desc"], "text": "Gore-Tex shell"}, {"children": [{"text": " Sold Out "}]}),
+            card("badge-class", {"roles": ["desc"], "text": "Fleece"}, {"roles": ["soldout"]}),
+            card("plain", {"roles": ["desc"], "text": "Out of stock sizes restock weekly"}),
+        ]
+    }
+    args = ["link", "name", "desc", "price", TILE_MAX_ANCESTORS, "soldout", TILE_SOLD_OUT_TEXT_PATTERN]
+    out = subprocess.run(
+        ["node", "-e", FAKE_DOM_JS, json.dumps(page), json.dumps(args), TILE_EXTRACTION_JS],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    availability = {tile["name"]: tile["availability"] for tile in json.loads(out)}
+    assert availability == {"mentions": "", "badge-text": "sold_out", "badge-class": "sold_out", "plain": ""}
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import pytest
+import requests
+
+import rate_limit
+from adaptive_concurrency import AdaptiveConcurrencyController, AdaptiveSettings
+from circuit_breaker import STATE_OPEN, BreakerSettings, CircuitOpenError, HostCircuitBreaker, build_circuit_breaker
+from retry_policy import RetryPolicy
+from watch_stock import AIOHTTP_AVAILABLE, FETCH_ENGINE_ASYNC, FETCH_ENGINE_THREADS, FetchOptions, ProductFetchQueue
+
+URL = "https://outlet.arcteryx.com/ca/en/shop/p1"
+
+
+def test_opens_after_consecutive_failures() -> None:
+    breaker = HostCircuitBreaker(BreakerSettings(failure_threshold=3, min_requests=100))
+    for _ in range(2):
+        breaker.before_request(URL)
+        breaker.record(URL, failed=True, status_code=500)
+    breaker.before_request(URL)
+    breaker.record(URL, failed=True, status_code=500)
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request(URL)
+    assert breaker.skipped_by_host() == {"outlet.arcteryx.com": 1}
+    # Other hosts are unaffected.
+    breaker.before_request("https://example.com/x")
+
+
+def test_success_resets_consecutive_failures() -> None:
+    breaker = HostCircuitBreaker(BreakerSettings(failure_threshold=2, min_requests=100))
+    for failed in (True, False, True, False, True):
+        breaker.record(URL, failed=failed, status_code=500 if failed else 200)
+    breaker.before_request(URL)
+
+
+def test_opens_on_blocked_ratio() -> None:
+    breaker = HostCircuitBreaker(BreakerSettings(failure_threshold=100, blocked_ratio=0.5, min_requests=4, window=4))
+    for status in (200, 403, 200, 429):
+        breaker.record(URL, failed=status != 200, status_code=status)
+    with pytest.raises(CircuitOpenError, match="blocked"):
+        breaker.before_request(URL)
+
+
+def test_half_open_probe_closes_or_reopens() -> None:
+    breaker = HostCircuitBreaker(BreakerSettings(failure_threshold=1, cooldown_seconds=0))
+    breaker.record(URL, failed=True, status_code=403)
+    # Cooldown elapsed: one probe goes through, and its failure re-opens the circuit.
+    breaker.before_request(URL)
+    breaker.record(URL, failed=True, status_code=403)
+    assert breaker.to_state()["outlet.arcteryx.com"]["reason"] == "probe failed (HTTP 403)"
+    breaker.before_request(URL)
+    breaker.record(URL, failed=False, status_code=200)
+    assert breaker.to_state() == {}
+    breaker.before_request(URL)
+
+
+def test_open_state_survives_persistence() -> None:
+    breaker = HostCircuitBreaker(BreakerSettings(failure_threshold=1, cooldown_seconds=3600))
+    breaker.record(URL, failed=True, status_code=429)
+    persisted = breaker.to_state()
+    assert persisted["outlet.arcteryx.com"]["state"] == STATE_OPEN
+
+    restored = build_circuit_breaker({}, persisted)
+    assert restored is not None
+    with pytest.raises(CircuitOpenError):
+        restored.before_request(URL)
+    assert build_circuit_breaker({"enabled": False}) is None
+
+
+ENGINES = [
+    pytest.param(FETCH_ENGINE_THREADS, False, id="threads"),
+    pytest.param(FETCH_ENGINE_THREADS, True, id="threads-adaptive"),
+    pytest.param(
+        FETCH_ENGINE_ASYNC,
+        False,
+        id="async",
+        marks=pytest.mark.skipif(not AIOHTTP_AVAILABLE, reason="aiohttp is not installed"),
+    ),
+]
+
+
+@pytest.mark.parametrize("engine,adaptive", ENGINES)
+def test_blocked_host_stops_queued_fetches(blocking_server, restore_rate_limiter, engine: str, adaptive: bool) -> None:
+    # Requests parked behind the rate limit (and concurrency gate) must re-check the breaker
+    # before sending, so only about `failure_threshold` requests reach a blocking host.
+    threshold = 5
+    total = 40
+    rate_limit.configure(rate_limit.HostRateLimiter(default=rate_limit.RateLimit(requests_per_second=20, burst=1)))
+    breaker = HostCircuitBreaker(BreakerSettings(failure_threshold=threshold, cooldown_seconds=3600))
+    controller = AdaptiveConcurrencyController(AdaptiveSettings(initial_limit=4, max_limit=8)) if adaptive else None
+    options = FetchOptions(timeout=5, breaker=breaker, controller=controller, retry_policy=RetryPolicy(max_attempts=1))
+
+    host, port = blocking_server.server_address
+    urls = [f"http://{host}:{port}/ca/en/shop/p{i:03d}" for i in range(total)]
+    queue = ProductFetchQueue(requests.Session(), engine=engine, concurrency=4, options=options)
+    try:
+        futures = [queue.submit(url) for url in urls]
+    finally:
+        queue.close()
+
+    sent = sum(blocking_server.hits.values())
+    assert threshold <= sent <= threshold + 1
+    outcomes = [type(f.exception()) for f in futures]
+    assert outcomes.count(CircuitOpenError) == total - sent
+    assert sum(breaker.skipped_by_host().values()) == total - sent
+    if controller is not None:
+        # Skipped fetches give their slot back without counting as samples.
+        assert controller.in_flight == 0
+        assert controller.samples_total == sent
+
+
+@pytest.mark.parametrize("engine,adaptive", ENGINES)
+def test_open_circuit_takes_no_rate_limit_tokens(blocking_server, restore_rate_limiter, engine: str, adaptive: bool) -> None:
+    # With the circuit already open, short-circuited fetches must not drain the host's bucket.
+    limiter = rate_limit.HostRateLimiter(default=rate_limit.RateLimit(requests_per_second=1, burst=1))
+    rate_limit.configure(limiter)
+    breaker = HostCircuitBreaker(BreakerSettings(failure_threshold=1, cooldown_seconds=3600))
+    host, port = blocking_server.server_address
+    urls = [f"http://{host}:{port}/ca/en/shop/p{i:03d}" for i in range(20)]
+    breaker.before_request(urls[0])
+    breaker.record(urls[0], failed=True, status_code=403)
+
+    controller = AdaptiveConcurrencyController(AdaptiveSettings(initial_limit=4, max_limit=8)) if adaptive else None
+    options = FetchOptions(timeout=5, breaker=breaker, controller=controller, retry_policy=RetryPolicy(max_attempts=1))
+    queue = ProductFetchQueue(requests.Session(), engine=engine, concurrency=4, options=options)
+    try:
+        futures = [queue.submit(url) for url in urls]
+    finally:
+        queue.close()
+
+    assert all(isinstance(f.exception(), CircuitOpenError) for f in futures)
+    assert sum(blocking_server.hits.values()) == 0
+    assert limiter.summary() == "no requests"
+    assert breaker.skipped_by_host() == {host: len(urls)}
+    if controller is not None:
+        assert controller.in_flight == 0 and controller.samples_total == 0
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import os
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import event_log as el
+
+BASE = datetime(2026, 8, 1, tzinfo=timezone.utc)
+
+
+def write_days(directory: str, days: int, per_day: int = 20, max_segment_bytes: int = 8000) -> None:
+    settings = el.EventLogSettings(directory=directory, max_segment_bytes=max_segment_bytes)
+    for day in range(days):
+        log = el.EventLog(settings)
+        for i in range(per_day):
+            log.record(el.EVENT_STOCK if i % 4 else el.EVENT_PRICE, url=f"https://x/shop/p{i % 5}", size="8", in_stock=bool(i % 2))
+            log.pending[-1]["ts"] = el.format_utc(BASE + timedelta(days=day, minutes=i))
+        log.flush()
+
+
+@pytest.fixture
+def log_dir(tmp_path) -> str:
+    directory = str(tmp_path / "events")
+    write_days(directory, 30)
+    return directory
+
+
+def test_rotation_and_manifest(log_dir: str) -> None:
+    segments = el.list_segments(log_dir)
+    assert len(segments) > 1
+    assert all(os.path.getsize(el.segment_path(log_dir, seq)) <= 8000 for seq in segments)
+    summaries = el.load_manifest(log_dir)
+    assert sum(s["count"] for s in summaries) == 30 * 20
+    assert summaries[0]["first_ts"] == "2026-08-01T00:00:00Z"
+
+
+def test_time_range_query(log_dir: str) -> None:
+    since = el.parse_time_arg("2026-08-10")
+    until = el.parse_time_arg("2026-08-11", end_of_day=True)
+    events = list(el.query_events(log_dir, since=since, until=until))
+    assert len(events) == 2 * 20
+    assert events[0]["ts"] == "2026-08-10T00:00:00Z"
+    assert events[-1]["ts"] == "2026-08-11T00:19:00Z"
+
+
+def test_product_and_type_query(log_dir: str) -> None:
+    events = list(el.query_events(log_dir, product="p3"))
+    assert len(events) == 30 * 4
+    assert {e["url"] for e in events} == {"https://x/shop/p3"}
+    prices = list(el.query_events(log_dir, types=[el.EVENT_PRICE], since="2026-08-05T00:00:00Z", until="2026-08-05T23:59:59Z"))
+    assert len(prices) == 5
+    assert all(e["type"] == el.EVENT_PRICE for e in prices)
+
+
+def test_missing_indexes_are_rebuilt_and_torn_tail_dropped(log_dir: str) -> None:
+    seq = el.list_segments(log_dir)[-1]
+    with open(el.segment_path(log_dir, seq), "ab") as f:
+        f.write(b'{"ts":"2026-09-01T00:00:00Z","type":"st')
+    os.remove(el.index_path(log_dir, seq))
+    os.remove(os.path.join(log_dir, el.MANIFEST_FILENAME))
+
+    assert len(list(el.query_events(log_dir))) == 30 * 20
+    log = el.EventLog(el.EventLogSettings(directory=log_dir))
+    log.record(el.EVENT_ERROR, context="ctx", message="boom")
+    log.flush()
+    assert [e["message"] for e in el.query_events(log_dir, types=[el.EVENT_ERROR])] == ["boom"]
+
+
+def test_compaction_applies_retention_and_merges(log_dir: str) -> None:
+    before = len(el.list_segments(log_dir))
+    log = el.EventLog(el.EventLogSettings(directory=log_dir, max_segment_bytes=40000, retention_days=10))
+    stats = log.compact(now=BASE + timedelta(days=30))
+    assert stats["dropped_events"] == 20 * 20
+    assert stats["merged_segments"] > 0
+    assert len(el.list_segments(log_dir)) < before
+    events = list(el.query_events(log_dir))
+    assert len(events) == 10 * 20
+    assert min(e["ts"] for e in events) >= "2026-08-21T00:00:00Z"
+    assert len(list(el.query_events(log_dir, product="p0"))) == 10 * 4
+
+
+def test_parse_time_arg() -> None:
+    now = datetime(2026, 10, 17, 12, 0, tzinfo=timezone.utc)
+    assert el.parse_time_arg("7d", now=now) == "2026-10-10T12:00:00Z"
+    assert el.parse_time_arg("2026-10-08") == "2026-10-08T00:00:00Z"
+    assert el.parse_time_arg("2026-10-08", end_of_day=True) == "2026-10-08T23:59:59Z"
+    assert el.parse_time_arg("2026-10-08T05:00:00+02:00", end_of_day=True) == "2026-10-08T03:00:00Z"
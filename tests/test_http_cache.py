@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterator, List, Optional
+
+import pytest
+import requests
+
+import json_codec
+from http_cache import ProductPageCache
+from watch_stock import AIOHTTP_AVAILABLE, FetchOptions, _fetch_product_json_async, fetch_product_json
+
+if AIOHTTP_AVAILABLE:
+    import aiohttp
+
+URL = "https://outlet.arcteryx.com/ca/en/shop/beta-jacket"
+PRODUCT = {"id": "p1", "name": "Beta Jacket"}
+ETAG = '"v1"'
+
+
+def test_get_reads_only_the_validator_line(tmp_path: str) -> None:
+    cache = ProductPageCache(str(tmp_path))
+    cache.put(URL, etag=ETAG, last_modified="", product=PRODUCT)
+    path = cache._path_for(URL)
+    with open(path, "rb") as f:
+        header = f.readline()
+    # A body that no longer parses does not stop the validators from being read.
+    with open(path, "wb") as f:
+        f.write(header + b"{not json")
+
+    entry = cache.get(URL)
+    assert entry is not None and entry.etag == ETAG
+    assert ProductPageCache.conditional_headers(entry) == {"If-None-Match": ETAG}
+    assert cache.load_product(entry) is None
+    assert not os.path.exists(path)
+
+
+def test_load_product_round_trip_and_legacy_entries(tmp_path: str) -> None:
+    cache = ProductPageCache(str(tmp_path))
+    cache.put(URL, etag=ETAG, last_modified="Tue, 06 Oct 2026 10:00:00 GMT", product=PRODUCT)
+    entry = cache.get(URL)
+    assert entry is not None and cache.load_product(entry) == PRODUCT
+
+    # Single-object files from before the header line are a miss until rewritten.
+    json_codec.dump_file(cache._path_for(URL), {"url": URL, "etag": ETAG, "last_modified": "", "product": PRODUCT})
+    assert cache.get(URL) is None
+
+
+def product_page(product: dict) -> bytes:
+    next_data = {"props": {"pageProps": {"product": json.dumps(product)}}}
+    return f'<html><script id="__NEXT_DATA__" type="application/json">{json.dumps(next_data)}</script></html>'.encode("utf-8")
+
+
+@pytest.fixture
+def etag_server() -> Iterator[ThreadingHTTPServer]:
+    statuses: List[int] = []
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args: object) -> None:
+            pass
+
+        def do_GET(self) -> None:
+            if self.headers.get("If-None-Match") == ETAG:
+                statuses.append(304)
+                self.send_response(304)
+                self.send_header("ETag", ETAG)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            body = product_page(PRODUCT)
+            statuses.append(200)
+            self.send_response(200)
+            self.send_header("ETag", ETAG)
+            self.send_header("Content-Type", "text/html")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.statuses = statuses  # type: ignore[attr-defined]
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_304_reuses_payload_and_refetches_when_it_is_gone(tmp_path: str, etag_server: ThreadingHTTPServer) -> None:
+    url = f"http://127.0.0.1:{etag_server.server_address[1]}/shop/beta-jacket"
+    cache = ProductPageCache(str(tmp_path))
+    with requests.Session() as session:
+        first = fetch_product_json(session, url, cache=cache, rate_limited=False)
+        second = fetch_product_json(session, url, cache=cache, rate_limited=False)
+        assert first is not None and second == first
+        assert etag_server.statuses == [200, 304]  # type: ignore[attr-defined]
+        assert (cache.hits, cache.misses) == (1, 1)
+
+        path = cache._path_for(url)
+        with open(path, "rb") as f:
+            header = f.readline()
+        with open(path, "wb") as f:
+            f.write(header + b"truncated")
+        assert fetch_product_json(session, url, cache=cache, rate_limited=False) == first
+        assert etag_server.statuses == [200, 304, 304, 200]  # type: ignore[attr-defined]
+
+
+@pytest.mark.skipif(not AIOHTTP_AVAILABLE, reason="aiohttp not installed")
+def test_async_304_reuses_payload_and_refetches_when_it_is_gone(tmp_path: str, etag_server: ThreadingHTTPServer) -> None:
+    url = f"http://127.0.0.1:{etag_server.server_address[1]}/shop/beta-jacket"
+    options = FetchOptions(cache=ProductPageCache(str(tmp_path)))
+
+    async def run() -> List[Optional[dict]]:
+        async with aiohttp.ClientSession() as client:
+            results = [await _fetch_product_json_async(client, url, options) for _ in range(2)]
+            with open(options.cache._path_for(url), "r+b") as f:  # type: ignore[union-attr]
+                f.truncate(len(f.readline()) + 3)
+            results.append(await _fetch_product_json_async(client, url, options))
+            return results
+
+    first, second, third = asyncio.run(run())
+    assert first is not None and second == first and third == first
+    assert etag_server.statuses == [200, 304, 304, 200]  # type: ignore[attr-defined]
@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import os
+import stat
+import threading
+from typing import List
+
+import json_codec
+
+
+def test_dump_file_round_trip_and_permissions(tmp_path: str) -> None:
+    path = os.path.join(str(tmp_path), "nested", "state.json")
+    json_codec.dump_file(path, {"a": [1, 2], "name": "Beta é"}, pretty=True)
+    assert json_codec.load_file(path) == {"a": [1, 2], "name": "Beta é"}
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o666 & ~json_codec._UMASK
+    assert os.listdir(os.path.dirname(path)) == ["state.json"]
+
+
+def test_concurrent_writers_never_leave_a_torn_file(tmp_path: str) -> None:
+    path = os.path.join(str(tmp_path), "state.json")
+    payloads = [{"writer": w, "items": [f"{w}-{i}" for i in range(20000)]} for w in range(4)]
+    errors: List[BaseException] = []
+    stop = threading.Event()
+
+    def write(payload: dict) -> None:
+        try:
+            for _ in range(15):
+                json_codec.dump_file(path, payload)
+        except BaseException as e:
+            errors.append(e)
+
+    def read() -> None:
+        while not stop.is_set():
+            try:
+                data = json_codec.load_file(path)
+            except FileNotFoundError:
+                continue
+            except BaseException as e:
+                errors.append(e)
+                return
+            if data not in payloads:
+                errors.append(AssertionError("read a mixed payload"))
+                return
+
+    reader = threading.Thread(target=read)
+    reader.start()
+    writers = [threading.Thread(target=write, args=(p,)) for p in payloads]
+    for t in writers:
+        t.start()
+    for t in writers:
+        t.join()
+    stop.set()
+    reader.join()
+
+    assert errors == []
+    assert json_codec.load_file(path) in payloads
+    assert os.listdir(str(tmp_path)) == ["state.json"]
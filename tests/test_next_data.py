@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterator, List
+
+import pytest
+
+import watch_stock
+from watch_stock import (
+    AIOHTTP_AVAILABLE,
+    ASYNC_DECODE_OFFLOAD_BYTES,
+    FetchOptions,
+    NextDataScanner,
+    _fetch_product_json_async,
+    extract_next_data,
+    extract_next_data_bytes,
+    extract_next_data_streaming,
+    find_next_data_payload,
+)
+
+if AIOHTTP_AVAILABLE:
+    import aiohttp
+
+NEXT_DATA = {"props": {"pageProps": {"product": json.dumps({"id": "p1", "name": "Beta <GTX> é"})}}, "page": "/shop/[slug]"}
+PAYLOAD = json.dumps(NEXT_DATA, ensure_ascii=False).encode("utf-8")
+PAGE = (
+    b"<html><head><script>var x = '</scr' + 'ipt>';</script>"
+    + b'<script id="__NEXT_DATA__" type="application/json">'
+    + PAYLOAD
+    + b"</script></head><body>"
+    + b"<div>tail</div>" * 200
+    + b"</body></html>"
+)
+
+
+def chunked(data: bytes, size: int) -> List[bytes]:
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+def test_bytes_and_text_extraction_agree() -> None:
+    assert find_next_data_payload(PAGE) == PAYLOAD
+    assert extract_next_data_bytes(PAGE) == NEXT_DATA
+    assert extract_next_data(PAGE.decode("utf-8")) == NEXT_DATA
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 26, 64, 1000, len(PAGE)])
+def test_scanner_handles_every_chunk_boundary(size: int) -> None:
+    assert extract_next_data_streaming(chunked(PAGE, size)) == NEXT_DATA
+
+
+def test_scanner_split_at_every_offset() -> None:
+    # Two chunks split at each position, so both tags and the payload are cut everywhere once.
+    for cut in range(1, len(PAGE) - len(b"<div>tail</div>" * 200)):
+        scanner = NextDataScanner()
+        done = scanner.feed(PAGE[:cut]) or scanner.feed(PAGE[cut:])
+        assert done, cut
+        assert scanner.payload == PAYLOAD, cut
+
+
+def test_scanner_stops_after_closing_tag() -> None:
+    scanner = NextDataScanner()
+    chunks = chunked(PAGE, 64)
+    consumed = 0
+    for chunk in chunks:
+        consumed += 1
+        if scanner.feed(chunk):
+            break
+    assert consumed < len(chunks)
+    assert scanner.bytes_read < len(PAGE)
+    assert scanner.feed(b"more") is True
+
+
+def test_missing_or_unterminated_next_data() -> None:
+    assert extract_next_data_streaming(chunked(b"<html><body>no data</body></html>", 5)) is None
+    truncated = PAGE[: PAGE.index(PAYLOAD) + 10]
+    assert extract_next_data_streaming(chunked(truncated, 4)) is None
+    assert extract_next_data_bytes(truncated) is None
+
+
+def product_page(padding: int) -> bytes:
+    product = {"id": "p1", "name": "Beta Jacket", "notes": "x" * padding}
+    next_data = {"props": {"pageProps": {"product": json.dumps(product)}}}
+    return f'<html><script id="__NEXT_DATA__" type="application/json">{json.dumps(next_data)}</script></html>'.encode("utf-8")
+
+
+@pytest.fixture
+def page_server() -> Iterator[ThreadingHTTPServer]:
+    """Serves a product page whose size is the request path, e.g. /100000."""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args: object) -> None:
+            pass
+
+        def do_GET(self) -> None:
+            body = product_page(int(self.path.rsplit("/", 1)[-1]))
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.mark.skipif(not AIOHTTP_AVAILABLE, reason="aiohttp not installed")
+@pytest.mark.parametrize("stream", [False, True])
+def test_async_engine_decodes_large_pages_off_the_loop(page_server: ThreadingHTTPServer, monkeypatch: pytest.MonkeyPatch, stream: bool) -> None:
+    threads: List[str] = []
+    name = "parse_product_payload" if stream else "parse_product_bytes"
+    original = getattr(watch_stock, name)
+
+    def spy(body: bytes, product_url: str) -> object:
+        threads.append(threading.current_thread().name)
+        return original(body, product_url)
+
+    monkeypatch.setattr(watch_stock, name, spy)
+    base = f"http://127.0.0.1:{page_server.server_address[1]}/shop"
+    options = FetchOptions(stream_next_data=stream)
+
+    async def run() -> List[object]:
+        async with aiohttp.ClientSession() as client:
+            return [
+                await _fetch_product_json_async(client, f"{base}/{size}", options)
+                for size in (10, ASYNC_DECODE_OFFLOAD_BYTES * 4)
+            ]
+
+    small, large = asyncio.run(run())
+    assert small is not None and large is not None and large["name"] == "Beta Jacket"
+    loop_thread = threading.current_thread().name
+    assert threads[0] == loop_thread and threads[1] != loop_thread
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import asyncio
+import sqlite3
+import threading
+import time
+
+import pytest
+
+import rate_limit
+from rate_limit import HostRateLimiter, RateLimit, build_rate_limiter
+
+URL = "https://outlet.arcteryx.com/ca/en/shop/p1"
+
+
+def test_reserve_paces_after_burst() -> None:
+    limiter = HostRateLimiter(default=RateLimit(requests_per_second=10, burst=2))
+    waits = [limiter.reserve(URL) for _ in range(4)]
+    assert waits[:2] == [0.0, 0.0]
+    assert waits[2] == pytest.approx(0.1, abs=0.02)
+    assert waits[3] == pytest.approx(0.2, abs=0.02)
+    # Hosts have separate buckets.
+    assert limiter.reserve("https://api.telegram.org/bot/send") == 0.0
+
+
+def test_host_overrides_and_disable() -> None:
+    limiter = build_rate_limiter({"hosts": {"outlet.arcteryx.com": {"requests_per_second": 2, "burst": 1}}})
+    assert limiter is not None
+    assert limiter.limit_for("outlet.arcteryx.com") == RateLimit(2, 1)
+    assert limiter.limit_for("api.telegram.org").requests_per_second == 1.0
+    assert build_rate_limiter({"enabled": False}) is None
+
+
+def test_scoped_restores_previous_limiter(restore_rate_limiter) -> None:
+    shared = HostRateLimiter(default=RateLimit(5, 10))
+    rate_limit.configure(shared)
+    task = HostRateLimiter(default=RateLimit(1, 1))
+    with rate_limit.scoped(task):
+        assert rate_limit.get_rate_limiter() is task
+    assert rate_limit.get_rate_limiter() is shared
+    with pytest.raises(RuntimeError):
+        with rate_limit.scoped(None):
+            assert rate_limit.get_rate_limiter() is None
+            raise RuntimeError("task failed")
+    assert rate_limit.get_rate_limiter() is shared
+
+
+def test_shared_store_reserve_does_not_block_the_event_loop(tmp_path) -> None:
+    path = str(tmp_path / "rate_limit.sqlite")
+    limiter = HostRateLimiter(default=RateLimit(100, 100), shared_store=path)
+    limiter.reserve(URL)
+
+    # Another process holding the write lock makes the reserve wait on SQLite's busy timeout.
+    holder = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+    holder.execute("BEGIN IMMEDIATE")
+    release = threading.Timer(0.3, lambda: holder.execute("COMMIT"))
+    release.start()
+
+    async def main() -> int:
+        ticks = 0
+
+        async def ticker() -> None:
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.ensure_future(ticker())
+        started = time.monotonic()
+        await limiter.acquire_async(URL)
+        assert time.monotonic() - started >= 0.2
+        task.cancel()
+        return ticks
+
+    try:
+        assert asyncio.run(main()) >= 10
+    finally:
+        release.join()
+        holder.close()
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from typing import Dict, Optional
+
+import pytest
+import requests
+
+from retry_policy import RetryBudget, RetryPolicy, build_retry_settings, plan_retry, retry_after_seconds
+
+
+def http_error(status: int, headers: Optional[Dict[str, str]] = None) -> requests.exceptions.HTTPError:
+    response = requests.Response()
+    response.status_code = status
+    response.headers.update(headers or {})
+    return requests.exceptions.HTTPError(f"{status}", response=response)
+
+
+def test_retry_after_seconds_and_http_date() -> None:
+    assert retry_after_seconds(http_error(429, {"Retry-After": "7"})) == 7.0
+    when = datetime.now(timezone.utc) + timedelta(seconds=20)
+    delay = retry_after_seconds(http_error(503, {"Retry-After": format_datetime(when, usegmt=True)}))
+    assert delay is not None and 15 <= delay <= 20
+    assert retry_after_seconds(http_error(503, {"Retry-After": "soon"})) is None
+    assert retry_after_seconds(http_error(503)) is None
+
+
+def test_plan_retry_honours_retry_after_and_its_cap() -> None:
+    policy = RetryPolicy(max_delay_seconds=10.0)
+    assert plan_retry(http_error(429, {"Retry-After": "4"}), attempt=1, policy=policy, budget=None) == 4.0
+    assert plan_retry(http_error(429, {"Retry-After": "60"}), attempt=1, policy=policy, budget=None) is None
+
+
+@pytest.mark.parametrize("status", [403, 404])
+def test_plan_retry_surfaces_non_retryable_statuses(status: int) -> None:
+    assert plan_retry(http_error(status), attempt=1, policy=RetryPolicy(), budget=None) is None
+
+
+def test_plan_retry_stops_at_max_attempts() -> None:
+    policy = RetryPolicy(max_attempts=3)
+    exc = requests.exceptions.ConnectionError("reset")
+    assert plan_retry(exc, attempt=2, policy=policy, budget=None) is not None
+    assert plan_retry(exc, attempt=3, policy=policy, budget=None) is None
+
+
+def test_plan_retry_jitter_stays_under_the_capped_ceiling() -> None:
+    policy = RetryPolicy(max_attempts=10, base_delay_seconds=1.0, max_delay_seconds=5.0)
+    exc = requests.exceptions.Timeout("slow")
+    for attempt, ceiling in [(1, 1.0), (2, 2.0), (3, 4.0), (4, 5.0), (8, 5.0)]:
+        for _ in range(50):
+            delay = plan_retry(exc, attempt=attempt, policy=policy, budget=None)
+            assert delay is not None and 0.0 <= delay <= ceiling
+
+
+def test_budget_caps_retries_and_backoff_time() -> None:
+    policy = RetryPolicy(max_attempts=10)
+    exc = http_error(503, {"Retry-After": "2"})
+    budget = RetryBudget(max_retries=2, max_delay_seconds=100.0)
+    assert [plan_retry(exc, attempt=1, policy=policy, budget=budget) for _ in range(3)] == [2.0, 2.0, None]
+    assert (budget.retries, budget.exhausted, budget.delay_spent) == (2, 1, 4.0)
+
+    budget = RetryBudget(max_retries=50, max_delay_seconds=5.0)
+    assert [plan_retry(exc, attempt=1, policy=policy, budget=budget) for _ in range(3)] == [2.0, 2.0, None]
+    assert budget.exhausted == 1
+
+
+def test_build_retry_settings() -> None:
+    policy, budget = build_retry_settings(None)
+    assert policy == RetryPolicy()
+    assert (budget.max_retries, budget.max_delay_seconds) == (RetryBudget.max_retries, RetryBudget.max_delay_seconds)
+
+    policy, budget = build_retry_settings(
+        {"max_attempts": 5, "base_delay_seconds": 0.5, "max_delay_seconds": 8, "retry_statuses": [429, 503], "budget_retries": 0, "budget_seconds": 30}
+    )
+    assert policy == RetryPolicy(max_attempts=5, base_delay_seconds=0.5, max_delay_seconds=8.0, retry_statuses=frozenset({429, 503}))
+    assert (budget.max_retries, budget.max_delay_seconds) == (0, 30.0)
+    assert plan_retry(http_error(503), attempt=1, policy=policy, budget=budget) is None
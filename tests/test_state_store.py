@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import os
+from typing import Any, Dict
+
+import pytest
+
+import json_codec
+from state_store import JOURNAL_SUFFIX, JournalSettings, JsonStateStore, SqliteStateStore, StateStore, migrate_json_state
+from watch_stock import DEFAULT_JOURNAL_CHECKED_INTERVAL_SECONDS, resolve_last_checked_interval
+
+# Large limits keep the journal from compacting unless a test asks for it.
+NEVER_COMPACT = JournalSettings(max_bytes=1 << 30, max_ratio=1000.0)
+
+
+def size_state(in_stock: bool) -> Dict[str, Any]:
+    return {"in_stock": in_stock, "in_stock_colours": ["Black"] if in_stock else [], "last_checked": "2026-10-01T00:00:00Z"}
+
+
+@pytest.fixture
+def state_path(tmp_path) -> str:
+    path = str(tmp_path / "state.json")
+    store = JsonStateStore(path)
+    for i in range(20):
+        store.put_product(f"u{i}", {"name": f"Shoe {i}", "product_id": str(i)})
+        for size in ("8", "9"):
+            store.put_size(f"u{i}", size, size_state(False))
+    store.set_meta("updated_at", "2026-10-01T00:00:00Z")
+    store.save()
+    return path
+
+
+def test_journal_appends_changes_and_replays(state_path: str) -> None:
+    before = open(state_path, "rb").read()
+    store = JsonStateStore(state_path, journal=NEVER_COMPACT)
+    store.put_size("u3", "8", size_state(True))
+    store.set_meta("updated_at", "2026-10-02T00:00:00Z")
+    store.save()
+    assert open(state_path, "rb").read() == before
+    assert os.path.getsize(state_path + JOURNAL_SUFFIX) > 0
+
+    reopened = JsonStateStore(state_path, journal=NEVER_COMPACT)
+    assert reopened.get_size("u3", "8")["in_stock"] is True
+    assert reopened.get_size("u3", "9")["in_stock"] is False
+    assert reopened.get_meta("updated_at") == "2026-10-02T00:00:00Z"
+
+
+def test_torn_and_uncommitted_tail_is_dropped(state_path: str) -> None:
+    store = JsonStateStore(state_path, journal=NEVER_COMPACT)
+    store.put_size("u1", "8", size_state(True))
+    store.save()
+    committed = os.path.getsize(state_path + JOURNAL_SUFFIX)
+    with open(state_path + JOURNAL_SUFFIX, "ab") as f:
+        # A complete entry without its commit line, then a half-written line.
+        f.write(json_codec.dumps_bytes({"op": "size", "url": "u2", "size": "8", "value": size_state(True)}) + b"\n")
+        f.write(b'{"op": "size", "url": "u5", "si')
+
+    reopened = JsonStateStore(state_path, journal=NEVER_COMPACT)
+    assert reopened.get_size("u1", "8")["in_stock"] is True
+    assert reopened.get_size("u2", "8")["in_stock"] is False
+    assert os.path.getsize(state_path + JOURNAL_SUFFIX) == committed
+
+
+def test_compaction_folds_journal_into_file(state_path: str) -> None:
+    store = JsonStateStore(state_path, journal=JournalSettings(max_bytes=1 << 30, max_ratio=0.001))
+    store.put_size("u4", "9", size_state(True))
+    store.save()
+    assert not os.path.exists(state_path + JOURNAL_SUFFIX)
+    assert json_codec.load_file(state_path)["products"]["u4"]["sizes"]["9"]["in_stock"] is True
+
+
+def test_mostly_dirty_save_skips_the_journal(state_path: str) -> None:
+    store = JsonStateStore(state_path, journal=JournalSettings())
+    for i in range(20):
+        store.put_product(f"u{i}", {"last_checked": "2026-10-02T00:00:00Z"})
+    store.save()
+    assert not os.path.exists(state_path + JOURNAL_SUFFIX)
+    assert json_codec.load_file(state_path)["products"]["u7"]["last_checked"] == "2026-10-02T00:00:00Z"
+
+
+def test_plain_save_folds_leftover_journal(state_path: str) -> None:
+    store = JsonStateStore(state_path, journal=NEVER_COMPACT)
+    store.put_size("u6", "8", size_state(True))
+    store.save()
+
+    plain = JsonStateStore(state_path)
+    plain.save()
+    assert not os.path.exists(state_path + JOURNAL_SUFFIX)
+    assert JsonStateStore(state_path).get_size("u6", "8")["in_stock"] is True
+
+
+def test_migrate_json_state_to_sqlite_includes_journal(state_path: str, tmp_path) -> None:
+    store = JsonStateStore(state_path, journal=NEVER_COMPACT)
+    store.put_size("u9", "9", size_state(True))
+    store.put_product("u9", {"price": 120.0})
+    store.save()
+
+    db = SqliteStateStore(str(tmp_path / "state.sqlite3"))
+    try:
+        assert migrate_json_state(state_path, db) == (20, 40)
+        assert db.get_size("u9", "9")["in_stock_colours"] == ["Black"]
+        assert db.get_size("u9", "8")["in_stock"] is False
+        assert db.get_product("u9")["price"] == 120.0
+        assert db.get_meta("updated_at") == "2026-10-01T00:00:00Z"
+    finally:
+        db.close()
+
+
+def test_last_checked_interval_defaults_on_with_journal() -> None:
+    assert resolve_last_checked_interval(None, {"enabled": True}) == DEFAULT_JOURNAL_CHECKED_INTERVAL_SECONDS
+    assert resolve_last_checked_interval(None, {}) == 0
+    assert resolve_last_checked_interval(0, {"enabled": True}) == 0
+    assert resolve_last_checked_interval(600, {}) == 600
+
+
+def test_backend_missing_a_method_cannot_be_instantiated() -> None:
+    class Partial(StateStore):
+        def get_product(self, product_url: str) -> None:
+            return None
+
+    with pytest.raises(TypeError):
+        Partial()  # type: ignore[abstract]
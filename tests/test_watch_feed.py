@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List, Tuple
+
+from category_scraper import PAGE_PROGRESS_JS, SCROLL_STEP_JS, TILE_EXTRACTION_JS, WAIT_MODE_HARVEST, ScrapeSettings, harvest_tiles
+from watch_stock import CategoryTile, WatchFeed, WatchSpec, category_tiles_from_scraped
+
+URL = "https://outlet.arcteryx.com/ca/en/shop/beta-jacket"
+
+
+class FakeQueue:
+    def __init__(self) -> None:
+        self.submitted: List[str] = []
+
+    def submit(self, product_url: str) -> None:
+        self.submitted.append(product_url)
+
+
+class LazyGridDriver:
+    """Serves one tile whose description only renders on the second extraction step."""
+
+    def __init__(self) -> None:
+        self.extractions = 0
+
+    def execute_script(self, script: str, *args: Any) -> Any:
+        if script == PAGE_PROGRESS_JS:
+            return [1, 1000]
+        if script == SCROLL_STEP_JS:
+            return self.extractions >= 2
+        if script == TILE_EXTRACTION_JS:
+            self.extractions += 1
+            description = "Gore-Tex shell" if self.extractions >= 2 else ""
+            return [{"url": URL, "name": "Beta Jacket Men's", "description": description, "price": "", "availability": ""}]
+        raise AssertionError(f"unexpected script: {script[:40]}")
+
+
+def make_feed(keywords: List[str]) -> Tuple[WatchFeed, FakeQueue]:
+    queue = FakeQueue()
+    feed = WatchFeed(WatchSpec(name="w", category_url="https://example.com/c", keywords=keywords), queue, {})  # type: ignore[arg-type]
+    return feed, queue
+
+
+def test_keyword_miss_on_partial_tile_is_rechecked() -> None:
+    feed, queue = make_feed(["gore-tex"])
+    feed.offer_tiles([CategoryTile(URL, "Beta Jacket Men's", "")])
+    assert queue.submitted == []
+    feed.offer_tiles([CategoryTile(URL, "Beta Jacket Men's", "Gore-Tex shell")])
+    feed.offer_tiles([CategoryTile(URL, "Beta Jacket Men's", "Gore-Tex shell")])
+    assert queue.submitted == [URL]
+    assert (len(feed.seen), feed.matched) == (1, 1)
+
+
+def test_description_filled_after_first_emit_still_matches() -> None:
+    feed, queue = make_feed(["gore-tex"])
+    emitted: List[List[Dict[str, str]]] = []
+
+    def on_tiles(raw: List[Dict[str, str]]) -> None:
+        emitted.append([dict(t) for t in raw])
+        feed.offer_tiles(category_tiles_from_scraped(raw))
+
+    settings = ScrapeSettings(wait_mode=WAIT_MODE_HARVEST, poll_seconds=0, scroll_pause_seconds=0, stable_rounds=1)
+    tiles = harvest_tiles(LazyGridDriver(), category_url="https://example.com/c", link_selector="a", settings=settings, on_tiles=on_tiles)
+    assert emitted and emitted[0][0]["description"] == ""
+    assert queue.submitted == []
+
+    feed.offer_tiles(category_tiles_from_scraped(tiles))
+    assert queue.submitted == [URL]
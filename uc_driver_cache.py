@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import logging
+import os
+import re
+import shutil
+import stat
+import subprocess
+from typing import Any, Dict, Optional, Tuple
+
+import json_codec
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DIRNAME = "uc_driver"
+META_FILENAME = "meta.json"
+DRIVER_FILENAME = "chromedriver.exe" if os.name == "nt" else "chromedriver"
+
+
+def chrome_fingerprint(chrome_path: str) -> Dict[str, Any]:
+    st = os.stat(chrome_path)
+    return {"path": os.path.abspath(chrome_path), "size": st.st_size, "mtime": int(st.st_mtime)}
+
+
+def detect_chrome_major(chrome_path: str) -> Optional[int]:
+    try:
+        out = subprocess.run([chrome_path, "--version"], capture_output=True, text=True, timeout=15).stdout
+    except Exception as e:
+        logger.debug(f"Could not run {chrome_path} --version: {e}")
+        return None
+    match = re.search(r"(\d+)\.\d+\.\d+", out or "")
+    return int(match.group(1)) if match else None
+
+
+class UcDriverCache:
+    """
+    Patched undetected-chromedriver binary plus the detected Chrome major version, kept under
+    `data_dir/uc_driver`. Both are reused until the Chrome binary changes (path, size or mtime),
+    so a warm start neither probes Chrome nor downloads/patches a driver and works offline.
+    """
+
+    def __init__(self, cache_dir: str) -> None:
+        self.cache_dir = cache_dir
+        self.meta_path = os.path.join(cache_dir, META_FILENAME)
+        self.driver_path = os.path.join(cache_dir, DRIVER_FILENAME)
+
+    def _load_meta(self) -> Dict[str, Any]:
+        try:
+            data = json_codec.load_file(self.meta_path)
+            return data if isinstance(data, dict) else {}
+        except Exception:
+            return {}
+
+    def lookup(self, chrome_path: str) -> Tuple[Optional[str], Optional[int]]:
+        """Return (cached driver path or None, Chrome major version or None) for this Chrome binary."""
+        fingerprint = chrome_fingerprint(chrome_path)
+        meta = self._load_meta()
+        if meta.get("chrome") == fingerprint and meta.get("chrome_major"):
+            driver = self.driver_path if meta.get("driver_major") == meta["chrome_major"] and os.path.exists(self.driver_path) else None
+            return driver, int(meta["chrome_major"])
+
+        if meta:
+            logger.info(f"Chrome binary changed ({meta.get('chrome')} -> {fingerprint}); refreshing the driver cache")
+        major = detect_chrome_major(chrome_path)
+        self._write_meta({"chrome": fingerprint, "chrome_major": major})
+        return None, major
+
+    def store(self, source_driver_path: str, chrome_major: Optional[int]) -> None:
+        if not source_driver_path or not os.path.exists(source_driver_path) or not chrome_major:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        if os.path.abspath(source_driver_path) != os.path.abspath(self.driver_path):
+            tmp_path = self.driver_path + ".tmp"
+            shutil.copy2(source_driver_path, tmp_path)
+            os.chmod(tmp_path, os.stat(tmp_path).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+            os.replace(tmp_path, self.driver_path)
+        meta = self._load_meta()
+        meta["driver_major"] = int(chrome_major)
+        self._write_meta(meta)
+        logger.info(f"Cached patched chromedriver for Chrome {chrome_major} at {self.driver_path}")
+
+    def invalidate(self) -> None:
+        meta = self._load_meta()
+        meta.pop("driver_major", None)
+        self._write_meta(meta)
+
+    def _write_meta(self, meta: Dict[str, Any]) -> None:
+        os.makedirs(self.cache_dir, exist_ok=True)
+        json_codec.dump_file(self.meta_path, meta, pretty=True)
@@ -18,29 +18,89 @@ Default behavior:
 from __future__ import annotations
 
 import argparse
+import asyncio
+import contextlib
 import hashlib
 import json
 import logging
 import os
 import re
+import threading
+import time
 import unicodedata
+from concurrent.futures import Future, ThreadPoolExecutor, wait
 from dataclasses import dataclass, field
 from datetime import datetime, timezone
-from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+from urllib.parse import urlparse, urlunparse
 
 import requests
-
+from requests.adapters import HTTPAdapter
+
+import json_codec
+import rate_limit
+from adaptive_concurrency import (
+    DEFAULT_METRICS_FILENAME as DEFAULT_CONCURRENCY_METRICS_FILENAME,
+    OUTCOME_ERROR,
+    OUTCOME_GONE,
+    OUTCOME_OK,
+    OUTCOME_SKIPPED,
+    OUTCOME_THROTTLED,
+    OUTCOME_TIMEOUT,
+    AdaptiveConcurrencyController,
+    build_controller,
+)
+from category_scraper import (
+    CATEGORY_SOURCE_BROWSER,
+    CATEGORY_SOURCE_HTTP,
+    CATEGORY_SOURCES,
+    TILE_SOLD_OUT,
+    WAIT_MODE_FIXED,
+    WAIT_MODES,
+    BrowserSession,
+    ScrapeSettings,
+    configure_chrome_options,
+    extract_category_tiles,
+    find_listing_products,
+    find_page_count,
+    log_page_cost,
+    open_category_page,
+    parse_category_source,
+    render_with_snapshot,
+    settle_page,
+    with_query_param,
+)
+from circuit_breaker import CircuitOpenError, HostCircuitBreaker, build_circuit_breaker
+from event_log import EVENT_ERROR, EVENT_NOTIFY, EVENT_PRICE, EVENT_RUN, EVENT_STOCK, EventLog, build_event_log
+from http_cache import CacheEntry, ProductPageCache, build_product_cache
+from state_store import (
+    DEFAULT_SQLITE_FILENAME,
+    STATE_BACKEND_JSON,
+    STATE_BACKEND_SQLITE,
+    STATE_BACKENDS,
+    StateStore,
+    build_journal_settings,
+    open_state_store,
+    parse_state_backend,
+)
+from retry_policy import RetryBudget, RetryPolicy, build_retry_settings, plan_retry, status_code_of
 from logging_utils import setup_logging
 
 try:
     from selenium import webdriver
     from selenium.webdriver.chrome.options import Options
-    from selenium.webdriver.common.by import By
 
     SELENIUM_AVAILABLE = True
 except Exception:
     SELENIUM_AVAILABLE = False
 
+try:
+    import aiohttp
+
+    AIOHTTP_AVAILABLE = True
+except Exception:
+    AIOHTTP_AVAILABLE = False
+
 try:
     from telegram_notifier import TelegramNotifier, send_stock_notification
 
@@ -61,6 +121,21 @@ IN_STOCK_STATUSES: Set[str] = {"InStock", "LowStock"}
 
 DEFAULT_ERROR_NOTIFY_ENABLED = True
 DEFAULT_ERROR_NOTIFY_REPEAT_INTERVAL_SECONDS = 3600
+DEFAULT_AVAILABILITY_REFRESH_SECONDS = 6 * 3600
+# Used for `last_checked_interval_seconds` when the state journal is on and the interval is not set:
+# with a zero interval every checked entry is rewritten each run and the journal never pays off.
+DEFAULT_JOURNAL_CHECKED_INTERVAL_SECONDS = 3600
+
+DEFAULT_FETCH_CONCURRENCY = 4
+MAX_FETCH_CONCURRENCY = 64
+
+FETCH_ENGINE_THREADS = "threads"
+FETCH_ENGINE_ASYNC = "async"
+FETCH_ENGINES = (FETCH_ENGINE_THREADS, FETCH_ENGINE_ASYNC)
+DEFAULT_ASYNC_MAX_IN_FLIGHT = 100
+MAX_ASYNC_MAX_IN_FLIGHT = 1000
+
+PRODUCT_PAGE_HEADERS = {"User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"}
 
 
 def utc_now_iso() -> str:
@@ -117,20 +192,100 @@ def extract_next_data(html: str) -> Optional[Dict[str, Any]]:
     if not match:
         return None
     try:
-        return json.loads(match.group(1))
+        return json_codec.loads(match.group(1))
     except Exception:
         return None
 
 
-def fetch_product_json(session: requests.Session, product_url: str, timeout: int = 30) -> Optional[Dict[str, Any]]:
-    resp = session.get(
-        product_url,
-        headers={"User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"},
-        timeout=timeout,
-    )
-    resp.raise_for_status()
+NEXT_DATA_OPEN_TAG = b'<script id="__NEXT_DATA__"'
+SCRIPT_CLOSE_TAG = b"</script>"
+STREAM_CHUNK_SIZE = 16 * 1024
+# The async engine decodes pages at least this large on a worker thread instead of the event loop.
+ASYNC_DECODE_OFFLOAD_BYTES = 32 * 1024
+
+
+class NextDataScanner:
+    """
+    Incremental `__NEXT_DATA__` locator over raw response bytes.
+
+    Bytes before the opening tag are discarded as they arrive, and `feed()` returns True as soon as
+    the closing `</script>` has been seen, so callers can stop reading and close the connection.
+    """
+
+    def __init__(self) -> None:
+        self._buf = bytearray()
+        self._payload_start = -1
+        self._scan_from = 0
+        self.bytes_read = 0
+        self.payload: Optional[bytes] = None
+
+    def feed(self, chunk: bytes) -> bool:
+        if self.payload is not None:
+            return True
+        if not chunk:
+            return False
+        self.bytes_read += len(chunk)
+        self._buf += chunk
+
+        if self._payload_start < 0:
+            idx = self._buf.find(NEXT_DATA_OPEN_TAG)
+            if idx < 0:
+                # Keep just enough tail to match an opening tag split across chunks.
+                del self._buf[: max(0, len(self._buf) - len(NEXT_DATA_OPEN_TAG) + 1)]
+                return False
+            gt = self._buf.find(b">", idx + len(NEXT_DATA_OPEN_TAG))
+            if gt < 0:
+                del self._buf[:idx]
+                return False
+            del self._buf[: gt + 1]
+            self._payload_start = 0
+            self._scan_from = 0
+
+        end = self._buf.find(SCRIPT_CLOSE_TAG, self._scan_from)
+        if end < 0:
+            self._scan_from = max(0, len(self._buf) - len(SCRIPT_CLOSE_TAG) + 1)
+            return False
+        self.payload = bytes(self._buf[:end])
+        self._buf = bytearray()
+        return True
+
+
+def decode_next_data_payload(payload: Optional[bytes]) -> Optional[Dict[str, Any]]:
+    if payload is None:
+        return None
+    try:
+        return json_codec.loads(payload)
+    except Exception:
+        return None
+
+
+def find_next_data_payload(raw: bytes) -> Optional[bytes]:
+    start = raw.find(NEXT_DATA_OPEN_TAG)
+    if start < 0:
+        return None
+    gt = raw.find(b">", start + len(NEXT_DATA_OPEN_TAG))
+    if gt < 0:
+        return None
+    end = raw.find(SCRIPT_CLOSE_TAG, gt + 1)
+    if end < 0:
+        return None
+    return raw[gt + 1 : end]
+
+
+def extract_next_data_bytes(raw: bytes) -> Optional[Dict[str, Any]]:
+    # Works on undecoded body bytes: skips requests' charset detection and decodes only the JSON slice.
+    return decode_next_data_payload(find_next_data_payload(raw))
 
-    next_data = extract_next_data(resp.text)
+
+def extract_next_data_streaming(chunks: Iterable[bytes]) -> Optional[Dict[str, Any]]:
+    scanner = NextDataScanner()
+    for chunk in chunks:
+        if scanner.feed(chunk):
+            break
+    return decode_next_data_payload(scanner.payload)
+
+
+def product_from_next_data(next_data: Optional[Dict[str, Any]], product_url: str) -> Optional[Dict[str, Any]]:
     if not next_data:
         return None
 
@@ -142,7 +297,7 @@ def fetch_product_json(session: requests.Session, product_url: str, timeout: int
     if isinstance(product_blob, dict):
         product = product_blob
     elif isinstance(product_blob, str):
-        product = json.loads(product_blob)
+        product = json_codec.loads(product_blob)
     else:
         return None
 
@@ -150,11 +305,435 @@ def fetch_product_json(session: requests.Session, product_url: str, timeout: int
     return product
 
 
+def parse_product_html(html: str, product_url: str) -> Optional[Dict[str, Any]]:
+    return product_from_next_data(extract_next_data(html), product_url)
+
+
+def parse_product_bytes(raw: bytes, product_url: str) -> Optional[Dict[str, Any]]:
+    return product_from_next_data(extract_next_data_bytes(raw), product_url)
+
+
+def parse_product_payload(payload: Optional[bytes], product_url: str) -> Optional[Dict[str, Any]]:
+    return product_from_next_data(decode_next_data_payload(payload), product_url)
+
+
+def product_from_cache_entry(cache: ProductPageCache, entry: CacheEntry, product_url: str) -> Optional[Dict[str, Any]]:
+    # Only a 304 gets here, so the cached payload is parsed just when it is actually reused.
+    product = cache.load_product(entry)
+    if product is None:
+        return None
+    cache.record_hit(entry)
+    product["_product_url"] = product_url
+    return product
+
+
+def store_product_in_cache(
+    cache: Optional[ProductPageCache],
+    product_url: str,
+    headers: Any,
+    product: Optional[Dict[str, Any]],
+) -> None:
+    if cache is None:
+        return
+    cache.record_miss()
+    if product:
+        cache.put(
+            product_url,
+            etag=str(headers.get("ETag") or ""),
+            last_modified=str(headers.get("Last-Modified") or ""),
+            product=product,
+        )
+
+
+def fetch_product_json(
+    session: requests.Session,
+    product_url: str,
+    timeout: int = 30,
+    *,
+    cache: Optional[ProductPageCache] = None,
+    stream: bool = False,
+    rate_limited: bool = True,
+) -> Optional[Dict[str, Any]]:
+    entry = cache.get(product_url) if cache is not None else None
+    if rate_limited:
+        rate_limit.acquire(product_url)
+    resp = session.get(
+        product_url,
+        headers={**PRODUCT_PAGE_HEADERS, **ProductPageCache.conditional_headers(entry)},
+        timeout=timeout,
+        stream=stream,
+    )
+    try:
+        if resp.status_code == 304 and entry is not None and cache is not None:
+            product = product_from_cache_entry(cache, entry, product_url)
+            if product is not None:
+                return product
+            # The cached payload was pruned or unreadable (and is now dropped); ask for the full page.
+            return fetch_product_json(session, product_url, timeout, cache=cache, stream=stream)
+        resp.raise_for_status()
+
+        if stream:
+            product = product_from_next_data(extract_next_data_streaming(resp.iter_content(STREAM_CHUNK_SIZE)), product_url)
+        else:
+            product = parse_product_bytes(resp.content, product_url)
+        store_product_in_cache(cache, product_url, resp.headers, product)
+        return product
+    finally:
+        if stream:
+            # Drops the connection when the body was not read to the end.
+            resp.close()
+
+
+@dataclass
+class FetchOptions:
+    timeout: int = 30
+    cache: Optional[ProductPageCache] = None
+    stream_next_data: bool = False
+    controller: Optional[AdaptiveConcurrencyController] = None
+    retry_policy: RetryPolicy = field(default_factory=RetryPolicy)
+    retry_budget: Optional[RetryBudget] = None
+    breaker: Optional[HostCircuitBreaker] = None
+
+
+def classify_fetch_outcome(exc: Optional[BaseException]) -> str:
+    if exc is None:
+        return OUTCOME_OK
+    if isinstance(exc, requests.exceptions.HTTPError):
+        status_code = getattr(getattr(exc, "response", None), "status_code", None)
+        if status_code in (403, 429):
+            return OUTCOME_THROTTLED
+        if status_code in (404, 410):
+            return OUTCOME_GONE
+    if isinstance(exc, requests.exceptions.Timeout):
+        return OUTCOME_TIMEOUT
+    return OUTCOME_ERROR
+
+
+def record_breaker_outcome(breaker: Optional[HostCircuitBreaker], product_url: str, error: Optional[BaseException]) -> None:
+    if breaker is None:
+        return
+    status_code = status_code_of(error) if error is not None else None
+    # A missing product page says nothing about whether the host is blocking us.
+    failed = isinstance(error, requests.exceptions.RequestException) and status_code not in (404, 410)
+    breaker.record(product_url, failed=failed, status_code=status_code)
+
+
+def _fetch_product_attempt(
+    session: requests.Session,
+    product_url: str,
+    options: FetchOptions,
+) -> Optional[Dict[str, Any]]:
+    # An open circuit fails fast before any gate, so skipped requests take no slot or rate-limit token.
+    # Then the concurrency slot and the rate-limit wait, so the measured latency is the request alone.
+    # The breaker is checked again right before sending: requests parked behind either gate must
+    # see a circuit that opened while they waited.
+    breaker = options.breaker
+    if breaker is not None and not breaker.allow(product_url):
+        raise breaker.open_error(product_url)
+    controller = options.controller
+    if controller is not None:
+        controller.acquire()
+    error: Optional[BaseException] = None
+    sent = False
+    started = time.monotonic()
+    try:
+        rate_limit.acquire(product_url)
+        if breaker is not None:
+            breaker.before_request(product_url)
+        sent = True
+        started = time.monotonic()
+        return fetch_product_json(
+            session,
+            product_url,
+            options.timeout,
+            cache=options.cache,
+            stream=options.stream_next_data,
+            rate_limited=False,
+        )
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        if controller is not None:
+            outcome = classify_fetch_outcome(error) if sent else OUTCOME_SKIPPED
+            controller.release(time.monotonic() - started, outcome)
+        if sent:
+            record_breaker_outcome(breaker, product_url, error)
+
+
+def fetch_product_with_controls(
+    session: requests.Session,
+    product_url: str,
+    options: FetchOptions,
+) -> Optional[Dict[str, Any]]:
+    attempt = 1
+    while True:
+        try:
+            product = _fetch_product_attempt(session, product_url, options)
+            if attempt > 1 and options.retry_budget is not None:
+                options.retry_budget.record_recovered()
+            return product
+        except Exception as e:
+            delay = plan_retry(e, attempt=attempt, policy=options.retry_policy, budget=options.retry_budget)
+            if delay is None:
+                raise
+            logger.info(f"Retrying in {delay:.1f}s (attempt {attempt + 1}/{options.retry_policy.max_attempts}): {product_url} ({e})")
+            time.sleep(delay)
+            attempt += 1
+
+
+def build_http_session(pool_maxsize: int = DEFAULT_FETCH_CONCURRENCY) -> requests.Session:
+    # Size the connection pool to the worker count so parallel fetches reuse keep-alive connections.
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(1, int(pool_maxsize)))
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def clamp_fetch_concurrency(value: Any, default: int = DEFAULT_FETCH_CONCURRENCY) -> int:
+    try:
+        n = int(value)
+    except Exception:
+        n = default
+    return max(1, min(MAX_FETCH_CONCURRENCY, n))
+
+
+def _as_requests_exception(exc: BaseException, product_url: str) -> BaseException:
+    # Map aiohttp failures onto the requests exception hierarchy so run_stock_watch
+    # classifies errors identically for both fetch engines.
+    if isinstance(exc, aiohttp.ClientResponseError):
+        response = requests.Response()
+        response.status_code = exc.status
+        response.url = product_url
+        response.reason = exc.message
+        for key, value in (exc.headers or {}).items():
+            response.headers[key] = value
+        return requests.exceptions.HTTPError(f"{exc.status} Error: {exc.message} for url: {product_url}", response=response)
+    if isinstance(exc, asyncio.TimeoutError):
+        return requests.exceptions.Timeout(f"Timed out fetching {product_url}")
+    if isinstance(exc, aiohttp.ClientError):
+        return requests.exceptions.ConnectionError(str(exc) or exc.__class__.__name__)
+    return exc
+
+
+async def _fetch_product_json_async(
+    client: "aiohttp.ClientSession",
+    product_url: str,
+    options: FetchOptions,
+) -> Optional[Dict[str, Any]]:
+    # Cache lookups and writes are file IO plus JSON decoding, so they run off the event loop.
+    loop = asyncio.get_running_loop()
+    cache = options.cache
+    entry = await loop.run_in_executor(None, cache.get, product_url) if cache is not None else None
+    refetch = False
+    async with client.get(
+        product_url,
+        headers=ProductPageCache.conditional_headers(entry),
+        timeout=aiohttp.ClientTimeout(total=options.timeout),
+    ) as resp:
+        if resp.status == 304 and entry is not None and cache is not None:
+            product = await loop.run_in_executor(None, product_from_cache_entry, cache, entry, product_url)
+            if product is not None:
+                return product
+            refetch = True
+        else:
+            resp.raise_for_status()
+            headers = resp.headers
+            if options.stream_next_data:
+                scanner = NextDataScanner()
+                async for chunk in resp.content.iter_chunked(STREAM_CHUNK_SIZE):
+                    if scanner.feed(chunk):
+                        break
+                resp.close()
+                body, parse = scanner.payload, parse_product_payload
+            else:
+                body, parse = await resp.read(), parse_product_bytes
+            # Finding and decoding __NEXT_DATA__ is CPU-bound; large pages would stall every other fetch.
+            if body is not None and len(body) >= ASYNC_DECODE_OFFLOAD_BYTES:
+                product = await loop.run_in_executor(None, parse, body, product_url)
+            else:
+                product = parse(body, product_url)
+    if refetch:
+        # Same as fetch_product_json: the cached payload was pruned or unreadable, so ask for the full page.
+        await rate_limit.acquire_async(product_url)
+        return await _fetch_product_json_async(client, product_url, options)
+    if cache is not None:
+        await loop.run_in_executor(None, store_product_in_cache, cache, product_url, headers, product)
+    return product
+
+
+async def _fetch_product_with_controls_async(
+    client: "aiohttp.ClientSession",
+    product_url: str,
+    options: FetchOptions,
+) -> Optional[Dict[str, Any]]:
+    async def attempt_once() -> Optional[Dict[str, Any]]:
+        # Same order as _fetch_product_attempt: breaker pre-check, slot, rate-limit wait, breaker check.
+        breaker = options.breaker
+        if breaker is not None and not breaker.allow(product_url):
+            raise breaker.open_error(product_url)
+        controller = options.controller
+        if controller is not None:
+            await controller.acquire_async()
+        error: Optional[BaseException] = None
+        sent = False
+        started = time.monotonic()
+        try:
+            await rate_limit.acquire_async(product_url)
+            if breaker is not None:
+                await breaker.before_request_async(product_url)
+            sent = True
+            started = time.monotonic()
+            return await _fetch_product_json_async(client, product_url, options)
+        except Exception as e:
+            error = _as_requests_exception(e, product_url)
+            if error is e:
+                raise
+            raise error from e
+        finally:
+            if controller is not None:
+                outcome = classify_fetch_outcome(error) if sent else OUTCOME_SKIPPED
+                await controller.release_async(time.monotonic() - started, outcome)
+            if sent:
+                record_breaker_outcome(breaker, product_url, error)
+
+    attempt = 1
+    while True:
+        try:
+            product = await attempt_once()
+            if attempt > 1 and options.retry_budget is not None:
+                options.retry_budget.record_recovered()
+            return product
+        except Exception as e:
+            delay = plan_retry(e, attempt=attempt, policy=options.retry_policy, budget=options.retry_budget)
+            if delay is None:
+                raise
+            logger.info(f"Retrying in {delay:.1f}s (attempt {attempt + 1}/{options.retry_policy.max_attempts}): {product_url} ({e})")
+            await asyncio.sleep(delay)
+            attempt += 1
+
+
+class ProductFetchQueue:
+    """
+    Product fetches submitted one URL at a time, so category discovery can feed them while it is
+    still rendering. Each distinct URL is fetched once per queue; repeated submissions share the
+    first Future. `threads` runs fetches on a pool; `async` runs them on an event loop in a
+    background thread that multiplexes every request over one keep-alive connector.
+    """
+
+    def __init__(
+        self,
+        session: requests.Session,
+        *,
+        engine: str = FETCH_ENGINE_THREADS,
+        concurrency: int = DEFAULT_FETCH_CONCURRENCY,
+        async_max_in_flight: int = DEFAULT_ASYNC_MAX_IN_FLIGHT,
+        thread_name_prefix: str = "fetch",
+        options: Optional[FetchOptions] = None,
+    ) -> None:
+        self.session = session
+        self.options = options or FetchOptions()
+        self.futures: Dict[str, "Future[Optional[Dict[str, Any]]]"] = {}
+        self.finished_at: Dict[str, float] = {}
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._client: Optional["aiohttp.ClientSession"] = None
+
+        if engine == FETCH_ENGINE_ASYNC:
+            if not AIOHTTP_AVAILABLE:
+                raise RuntimeError("aiohttp is not available; cannot use fetch_engine=async. Install it via `pip install aiohttp`.")
+            self._loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=self._loop.run_forever, name=f"{thread_name_prefix}-loop", daemon=True)
+            self._thread.start()
+            self._client = asyncio.run_coroutine_threadsafe(self._open_client(max(1, int(async_max_in_flight))), self._loop).result()
+        else:
+            if self.options.controller is not None:
+                # Workers block on the controller's gate, so the pool only needs to cover its ceiling.
+                concurrency = self.options.controller.settings.max_limit
+            self._pool = ThreadPoolExecutor(max_workers=max(1, int(concurrency)), thread_name_prefix=thread_name_prefix)
+
+    @staticmethod
+    async def _open_client(max_in_flight: int) -> "aiohttp.ClientSession":
+        connector = aiohttp.TCPConnector(limit=max_in_flight, limit_per_host=max_in_flight, ttl_dns_cache=300)
+        return aiohttp.ClientSession(connector=connector, headers=PRODUCT_PAGE_HEADERS)
+
+    def submit(self, product_url: str) -> "Future[Optional[Dict[str, Any]]]":
+        future = self.futures.get(product_url)
+        if future is not None:
+            return future
+        if self._pool is not None:
+            future = self._pool.submit(fetch_product_with_controls, self.session, product_url, self.options)
+        else:
+            assert self._loop is not None and self._client is not None
+            future = asyncio.run_coroutine_threadsafe(
+                _fetch_product_with_controls_async(self._client, product_url, self.options), self._loop
+            )
+        self.futures[product_url] = future
+        future.add_done_callback(lambda _f, url=product_url: self.finished_at.__setitem__(url, time.monotonic()))
+        return future
+
+    def close(self) -> None:
+        """Wait for every submitted fetch, then release the pool or event loop."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            return
+        if self._loop is None:
+            return
+        wait(list(self.futures.values()))
+        if self._client is not None:
+            asyncio.run_coroutine_threadsafe(self._client.close(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        if self._thread is not None:
+            self._thread.join()
+        self._loop.close()
+        self._loop = None
+
+
+def fetch_products(
+    session: requests.Session,
+    product_urls: Sequence[str],
+    *,
+    engine: str = FETCH_ENGINE_THREADS,
+    concurrency: int = DEFAULT_FETCH_CONCURRENCY,
+    async_max_in_flight: int = DEFAULT_ASYNC_MAX_IN_FLIGHT,
+    thread_name_prefix: str = "fetch",
+    options: Optional[FetchOptions] = None,
+) -> List[Tuple[str, "Future[Optional[Dict[str, Any]]]"]]:
+    # Callers consume the futures in input order so that state updates, event detection and
+    # error collection stay deterministic.
+    queue = ProductFetchQueue(
+        session,
+        engine=engine,
+        concurrency=concurrency,
+        async_max_in_flight=async_max_in_flight,
+        thread_name_prefix=thread_name_prefix,
+        options=options,
+    )
+    try:
+        return [(url, queue.submit(url)) for url in product_urls]
+    finally:
+        queue.close()
+
+
+def parse_fetch_engine(value: Any) -> str:
+    engine = str(value or FETCH_ENGINE_THREADS).strip().lower()
+    if engine not in FETCH_ENGINES:
+        raise ValueError(f"Unknown fetch_engine: {value!r} (expected one of: {', '.join(FETCH_ENGINES)})")
+    return engine
+
+
+CATEGORY_LINK_SELECTOR = 'a[href*="/shop/"]'
+
+
 @dataclass(frozen=True)
 class CategoryTile:
     product_url: str
     name: str
     description: str
+    price: str = ""
+    availability: str = ""
 
 
 def tile_matches_keywords(tile: CategoryTile, keywords: Sequence[str]) -> bool:
@@ -170,12 +749,94 @@ def tile_matches_keywords(tile: CategoryTile, keywords: Sequence[str]) -> bool:
     return False
 
 
-def collect_product_tiles_from_category(
+def category_tiles_from_scraped(raw_tiles: Iterable[Dict[str, str]]) -> List[CategoryTile]:
+    tiles: List[CategoryTile] = []
+    for raw in raw_tiles:
+        href = raw["url"]
+        name = raw["name"] or href.rstrip("/").split("/")[-1]
+        tiles.append(
+            CategoryTile(
+                product_url=href,
+                name=name,
+                description=raw["description"],
+                price=raw.get("price") or "",
+                availability=raw.get("availability") or "",
+            )
+        )
+    return tiles
+
+
+def _get_next_data(session: requests.Session, url: str, *, timeout: int) -> Dict[str, Any]:
+    rate_limit.acquire(url)
+    resp = session.get(url, headers=PRODUCT_PAGE_HEADERS, timeout=timeout)
+    resp.raise_for_status()
+    next_data = extract_next_data_bytes(resp.content)
+    if not next_data:
+        raise RuntimeError(f"No __NEXT_DATA__ found at {url}")
+    return next_data
+
+
+def _get_category_page_props(session: requests.Session, page_url: str, build_id: str, *, timeout: int) -> Any:
+    if build_id:
+        # The JSON route Next.js uses for client-side navigation: same pageProps, no HTML around it.
+        parsed = urlparse(page_url)
+        data_url = urlunparse(parsed._replace(path=f"/_next/data/{build_id}{parsed.path.rstrip('/')}.json"))
+        try:
+            rate_limit.acquire(data_url)
+            resp = session.get(data_url, headers=PRODUCT_PAGE_HEADERS, timeout=timeout)
+            resp.raise_for_status()
+            data = json_codec.loads(resp.content)
+            if isinstance(data, dict) and "pageProps" in data:
+                return data["pageProps"]
+        except Exception as e:
+            logger.debug(f"_next/data route failed for {page_url}: {e}")
+    return _get_next_data(session, page_url, timeout=timeout).get("props", {}).get("pageProps")
+
+
+def fetch_category_tiles_http(
+    session: requests.Session,
     category_url: str,
-    headless: bool = True,
-    render_wait_seconds: int = 10,
-    scroll_times: int = 3,
-) -> List[CategoryTile]:
+    *,
+    timeout: int = 30,
+    max_pages: int = 20,
+    page_param: str = "page",
+    on_tiles: Optional[Callable[[List[Dict[str, str]]], None]] = None,
+) -> List[Dict[str, str]]:
+    """
+    Read a category listing without a browser: products come from the page's `__NEXT_DATA__`, and
+    further pages (`?page=N`) from the matching `/_next/data/<buildId>/...json` route. Stops at the
+    advertised page count or the first page that adds nothing. Raises when the first page yields no
+    products, so callers can fall back to Selenium. `on_tiles` receives each page's new tiles.
+    """
+    started = time.monotonic()
+    next_data = _get_next_data(session, category_url, timeout=timeout)
+    page_props = next_data.get("props", {}).get("pageProps")
+    tiles = {t["url"]: t for t in find_listing_products(page_props, category_url)}
+    if not tiles:
+        raise RuntimeError("No products found in the category page __NEXT_DATA__")
+    if on_tiles is not None:
+        on_tiles(list(tiles.values()))
+
+    build_id = str(next_data.get("buildId") or "")
+    page_count = find_page_count(page_props)
+    pages = 1
+    for page in range(2, max(1, max_pages) + 1):
+        if page_count is not None and page > page_count:
+            break
+        data = _get_category_page_props(session, with_query_param(category_url, page_param, page), build_id, timeout=timeout)
+        pages += 1
+        added = [tile for tile in find_listing_products(data, category_url) if tile["url"] not in tiles]
+        if not added:
+            break
+        tiles.update((tile["url"], tile) for tile in added)
+        if on_tiles is not None:
+            on_tiles(added)
+
+    logger.info(f"[{category_url}] HTTP category discovery: {len(tiles)} products from {pages} page(s) in {time.monotonic() - started:.2f}s")
+    return list(tiles.values())
+
+
+def build_chrome_driver(headless: bool = True, scrape: Optional[ScrapeSettings] = None) -> Any:
     if not SELENIUM_AVAILABLE:
         raise RuntimeError("selenium is not available; cannot scrape product URLs from a category page. Install deps via `pip install -r requirements.txt`.")
 
@@ -186,79 +847,66 @@ def collect_product_tiles_from_category(
     options.add_argument("--disable-dev-shm-usage")
     options.add_argument("--disable-gpu")
     options.add_argument("--window-size=1920,1080")
+    return webdriver.Chrome(options=configure_chrome_options(options, scrape))
 
-    driver = webdriver.Chrome(options=options)
-    try:
-        driver.get(category_url)
-        if render_wait_seconds > 0:
-            import time
-
-            time.sleep(render_wait_seconds)
-        for _ in range(max(0, scroll_times)):
-            driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            import time
-
-            time.sleep(2)
-
-        elems = driver.find_elements(By.CSS_SELECTOR, 'a[href*="/shop/"]')
-        tiles: List[CategoryTile] = []
-        seen: Set[str] = set()
-        for e in elems:
-            href = e.get_attribute("href")
-            if not href:
-                continue
-            if "/shop/" not in href:
-                continue
-            href = href.split("?")[0]
-            if href in seen:
-                continue
-            seen.add(href)
-
-            name = ""
-            description = ""
-
-            node = e
-            for _ in range(8):
-                try:
-                    node = node.find_element(By.XPATH, "..")
-                except Exception:
-                    break
-
-                if not name:
-                    try:
-                        name_elems = node.find_elements(By.CSS_SELECTOR, ".product-tile-name, [class*='product-tile-name'], [class*='tile-name']")
-                        for ne in name_elems:
-                            t = (ne.text or "").strip()
-                            if t:
-                                name = t
-                                break
-                    except Exception:
-                        pass
-
-                if not description:
-                    try:
-                        desc_elems = node.find_elements(By.CSS_SELECTOR, "[data-component='body1'], [data-component='body2'], [class*='subtitle'], [class*='description']")
-                        best = ""
-                        for de in desc_elems:
-                            t = (de.text or "").strip()
-                            if len(t) > len(best):
-                                best = t
-                        if best:
-                            description = best
-                    except Exception:
-                        pass
-
-                if name and description:
-                    break
-
-            if not name:
-                name = href.rstrip("/").split("/")[-1]
-
-            tiles.append(CategoryTile(product_url=href, name=name, description=description))
 
+def collect_product_tiles_from_category(
+    category_url: str,
+    headless: bool = True,
+    render_wait_seconds: int = 10,
+    scroll_times: int = 3,
+    scrape: Optional[ScrapeSettings] = None,
+    browser: Optional[BrowserSession] = None,
+    on_tiles: Optional[Callable[[List[CategoryTile]], None]] = None,
+) -> List[CategoryTile]:
+    scrape = scrape or ScrapeSettings()
+
+    def stream(raw_tiles: List[Dict[str, str]]) -> None:
+        if on_tiles is not None:
+            on_tiles(category_tiles_from_scraped(raw_tiles))
+
+    def scrape_page(driver: Any) -> List[Dict[str, str]]:
+        open_category_page(driver, category_url, scrape)
+        settle_page(
+            driver,
+            link_selector=CATEGORY_LINK_SELECTOR,
+            settings=scrape,
+            render_wait_seconds=render_wait_seconds,
+            scroll_times=scroll_times,
+            scroll_sleep_seconds=2,
+            label=category_url,
+        )
+        tiles = extract_category_tiles(
+            driver,
+            category_url=category_url,
+            link_selector=CATEGORY_LINK_SELECTOR,
+            settings=scrape,
+            label=category_url,
+            on_tiles=stream,
+        )
+        log_page_cost(driver, category_url, scrape, label=category_url)
         return tiles
-    finally:
-        driver.quit()
+
+    def render() -> List[Dict[str, str]]:
+        if not SELENIUM_AVAILABLE:
+            raise RuntimeError("selenium is not available; cannot scrape product URLs from a category page. Install deps via `pip install -r requirements.txt`.")
+        if browser is not None:
+            return browser.run(scrape_page)
+        one_shot = BrowserSession(lambda: build_chrome_driver(headless, scrape), max_pages=1)
+        try:
+            return one_shot.run(scrape_page)
+        finally:
+            one_shot.close()
+
+    tiles = render_with_snapshot(
+        category_url,
+        render,
+        scrape,
+        link_selector=CATEGORY_LINK_SELECTOR,
+        extra=(render_wait_seconds, scroll_times),
+        label=category_url,
+    )
+    return category_tiles_from_scraped(tiles)
 
 
 def product_matches_keywords(product: Dict[str, Any], keywords: Sequence[str]) -> bool:
@@ -370,60 +1018,82 @@ def compute_stock_for_size(product: Dict[str, Any], target_size_label: str) -> S
     )
 
 
-def load_state(path: str) -> Dict[str, Any]:
-    if not os.path.exists(path):
-        return {"version": 1, "products": {}}
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        if not isinstance(data, dict):
-            return {"version": 1, "products": {}}
-        if "products" not in data or not isinstance(data.get("products"), dict):
-            data["products"] = {}
-        data.setdefault("version", 1)
-        return data
-    except Exception:
-        return {"version": 1, "products": {}}
-
-
-def save_state(path: str, state: Dict[str, Any]) -> None:
-    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
-    tmp_path = f"{path}.tmp"
-    with open(tmp_path, "w", encoding="utf-8") as f:
-        json.dump(state, f, ensure_ascii=False, indent=2)
-    os.replace(tmp_path, path)
-
-
-def get_previous_in_stock(state: Dict[str, Any], product_url: str, size_label: str) -> Optional[bool]:
-    prod = state.get("products", {}).get(product_url)
-    if not isinstance(prod, dict):
-        return None
-    sizes = prod.get("sizes", {})
-    if not isinstance(sizes, dict):
-        return None
-    size_state = sizes.get(size_label)
-    if not isinstance(size_state, dict):
-        return None
-    if "in_stock" not in size_state:
+def get_previous_in_stock(store: StateStore, product_url: str, size_label: str) -> Optional[bool]:
+    size_state = store.get_size(product_url, size_label)
+    if size_state is None or "in_stock" not in size_state:
         return None
     return bool(size_state.get("in_stock"))
 
 
-def update_state_with_result(state: Dict[str, Any], result: StockResult) -> None:
-    products = state.setdefault("products", {})
-    prod_state = products.setdefault(result.product_url, {})
-    prod_state["name"] = result.name
-    prod_state["product_id"] = result.product_id
-    prod_state["last_checked"] = utc_now_iso()
+def checked_within(last_checked: Any, interval_seconds: int) -> bool:
+    if interval_seconds <= 0:
+        return False
+    last_dt = parse_iso_datetime(last_checked)
+    if last_dt is None:
+        return False
+    if last_dt.tzinfo is None:
+        last_dt = last_dt.replace(tzinfo=timezone.utc)
+    return (datetime.now(timezone.utc) - last_dt).total_seconds() < interval_seconds
+
 
-    sizes = prod_state.setdefault("sizes", {})
-    size_state = sizes.setdefault(result.size_label, {})
+def update_state_with_result(
+    store: StateStore,
+    result: StockResult,
+    *,
+    checked_interval_seconds: int = 0,
+    events: Optional[EventLog] = None,
+) -> None:
+    # With `checked_interval_seconds`, an entry whose values did not change keeps its stored
+    # `last_checked` (and is not written at all) until that timestamp is older than the interval.
+    # `events` gets a line per stock transition (or first sight) and per price change.
+    prod_state = store.get_product(result.product_url) or {}
+    prices = {"currency": result.currency, "price": result.price, "discount_price": result.discount_price}
+    price_changed = "price" in prod_state and any(prod_state.get(k) != v for k, v in prices.items())
+    if events is not None and price_changed:
+        events.record(
+            EVENT_PRICE,
+            url=result.product_url,
+            name=result.name,
+            previous_price=prod_state.get("price"),
+            previous_discount_price=prod_state.get("discount_price"),
+            **prices,
+        )
+    product_changed = (
+        prod_state.get("name") != result.name
+        or prod_state.get("product_id") != result.product_id
+        or any(prod_state.get(k) != v for k, v in prices.items())
+    )
+    if product_changed or not checked_within(prod_state.get("last_checked"), checked_interval_seconds):
+        prod_state["name"] = result.name
+        prod_state["product_id"] = result.product_id
+        prod_state.update(prices)
+        prod_state["last_checked"] = utc_now_iso()
+        store.put_product(result.product_url, prod_state)
+
+    size_state = store.get_size(result.product_url, result.size_label) or {}
     previous = bool(size_state.get("in_stock")) if "in_stock" in size_state else None
+    if events is not None and (previous is None or previous != bool(result.in_stock)):
+        events.record(
+            EVENT_STOCK,
+            url=result.product_url,
+            size=result.size_label,
+            name=result.name,
+            in_stock=bool(result.in_stock),
+            previous=previous,
+            colours=list(result.in_stock_colours),
+            price=result.discount_price or result.price,
+        )
 
-    size_state["in_stock"] = result.in_stock
-    size_state["in_stock_colours"] = list(result.in_stock_colours)
-    size_state["stock_status_by_colour"] = result.stock_status_by_colour
-    size_state["size_ids"] = list(result.size_ids)
+    values = {
+        "in_stock": result.in_stock,
+        "in_stock_colours": list(result.in_stock_colours),
+        "stock_status_by_colour": result.stock_status_by_colour,
+        "size_ids": list(result.size_ids),
+    }
+    if all(size_state.get(k) == v for k, v in values.items()) and checked_within(size_state.get("last_checked"), checked_interval_seconds):
+        return
+
+    size_state.update(values)
     size_state["last_checked"] = utc_now_iso()
     size_state.setdefault("notify_count", 0)
     size_state.setdefault("last_notified_at", None)
@@ -433,19 +1103,57 @@ def update_state_with_result(state: Dict[str, Any], result: StockResult) -> None
     elif bool(previous) != bool(result.in_stock):
         size_state["last_change"] = utc_now_iso()
         size_state["notify_count"] = 0
+    store.put_size(result.product_url, result.size_label, size_state)
 
 
-def get_size_state(state: Dict[str, Any], product_url: str, size_label: str) -> Optional[Dict[str, Any]]:
-    prod = state.get("products", {}).get(product_url)
-    if not isinstance(prod, dict):
-        return None
-    sizes = prod.get("sizes", {})
-    if not isinstance(sizes, dict):
-        return None
-    size_state = sizes.get(size_label)
-    if not isinstance(size_state, dict):
+@dataclass
+class AvailabilityPrefilter:
+    """
+    Skips the product fetch for a tile that shows sold out when the previous run's tile showed the
+    same and state already has every watched size out of stock. Each size is still re-checked once
+    its `last_checked` is older than `refresh_interval_seconds`.
+    """
+
+    refresh_interval_seconds: int = DEFAULT_AVAILABILITY_REFRESH_SECONDS
+
+    def should_skip(self, store: StateStore, tile: CategoryTile, sizes: Sequence[str]) -> bool:
+        if tile.availability != TILE_SOLD_OUT or not sizes:
+            return False
+        prod = store.get_product(tile.product_url)
+        if prod is None or prod.get("tile_availability") != TILE_SOLD_OUT:
+            return False
+        now = datetime.now(timezone.utc)
+        for size_label in sizes:
+            size_state = store.get_size(tile.product_url, size_label)
+            if size_state is None or size_state.get("in_stock") is not False:
+                return False
+            last_checked = parse_iso_datetime(size_state.get("last_checked"))
+            if last_checked is None:
+                return False
+            if last_checked.tzinfo is None:
+                last_checked = last_checked.replace(tzinfo=timezone.utc)
+            if (now - last_checked).total_seconds() >= self.refresh_interval_seconds:
+                return False
+        return True
+
+
+def build_availability_prefilter(cfg: Optional[Dict[str, Any]]) -> Optional[AvailabilityPrefilter]:
+    cfg = cfg if isinstance(cfg, dict) else {}
+    if not bool(cfg.get("enabled", False)):
         return None
-    return size_state
+    refresh = cfg.get("refresh_interval_seconds")
+    return AvailabilityPrefilter(
+        refresh_interval_seconds=max(0, int(refresh if refresh is not None else DEFAULT_AVAILABILITY_REFRESH_SECONDS)),
+    )
+
+
+def record_tile_availability(store: StateStore, hints: Dict[str, str]) -> None:
+    # Only products already tracked in state; the hint is compared on the next run.
+    for product_url, hint in hints.items():
+        prod = store.get_product(product_url)
+        if prod is not None and prod.get("tile_availability") != hint:
+            prod["tile_availability"] = hint
+            store.put_product(product_url, prod)
 
 
 def parse_iso_datetime(value: Any) -> Optional[datetime]:
@@ -474,11 +1182,11 @@ def compute_error_signature(errors: Sequence[Tuple[str, str]], *, max_items: int
 
 def should_send_error_notification(
     *,
-    state: Dict[str, Any],
+    store: StateStore,
     signature: str,
     repeat_interval_seconds: int,
 ) -> bool:
-    meta = state.get("error_notify")
+    meta = store.get_meta("error_notify")
     if not isinstance(meta, dict):
         meta = {}
 
@@ -499,13 +1207,13 @@ def should_send_error_notification(
     return (now - last_dt).total_seconds() >= repeat_interval_seconds
 
 
-def record_error_notification_sent(state: Dict[str, Any], *, signature: str) -> None:
-    meta = state.setdefault("error_notify", {})
+def record_error_notification_sent(store: StateStore, *, signature: str) -> None:
+    meta = store.get_meta("error_notify")
     if not isinstance(meta, dict):
         meta = {}
-        state["error_notify"] = meta
     meta["last_notified_at"] = utc_now_iso()
     meta["last_signature"] = signature
+    store.set_meta("error_notify", meta)
 
 
 def build_error_notification_text(
@@ -558,8 +1266,8 @@ def should_send_repeat_notification(
     return (now - last_dt).total_seconds() >= repeat_interval_seconds
 
 
-def record_notification_sent(state: Dict[str, Any], result: StockResult) -> None:
-    size_state = get_size_state(state, result.product_url, result.size_label)
+def record_notification_sent(store: StateStore, result: StockResult) -> None:
+    size_state = store.get_size(result.product_url, result.size_label)
     if not size_state:
         return
     try:
@@ -568,12 +1276,13 @@ def record_notification_sent(state: Dict[str, Any], result: StockResult) -> None
         current = 0
     size_state["notify_count"] = current + 1
     size_state["last_notified_at"] = utc_now_iso()
+    store.put_size(result.product_url, result.size_label, size_state)
 
 
-def build_notify_note(state: Dict[str, Any], result: StockResult, *, max_notifications_per_item: int) -> str:
+def build_notify_note(store: StateStore, result: StockResult, *, max_notifications_per_item: int) -> str:
     if max_notifications_per_item <= 1:
         return ""
-    size_state = get_size_state(state, result.product_url, result.size_label) or {}
+    size_state = store.get_size(result.product_url, result.size_label) or {}
     try:
         notify_count = int(size_state.get("notify_count") or 0)
     except Exception:
@@ -615,6 +1324,8 @@ class WatchSpec:
     sizes: List[str] = field(default_factory=list)
     max_products: int = 0
     no_category_prefilter: bool = False
+    fetch_concurrency: int = DEFAULT_FETCH_CONCURRENCY
+    category_source: str = CATEGORY_SOURCE_BROWSER
 
 
 @dataclass
@@ -634,6 +1345,23 @@ class StockWatchConfig:
     notify_on_errors: bool
     error_repeat_interval_seconds: int
     watches: List[WatchSpec]
+    fetch_concurrency: int = DEFAULT_FETCH_CONCURRENCY
+    fetch_engine: str = FETCH_ENGINE_THREADS
+    async_max_in_flight: int = DEFAULT_ASYNC_MAX_IN_FLIGHT
+    http_cache: Dict[str, Any] = field(default_factory=dict)
+    stream_next_data: bool = False
+    pretty_state: bool = False
+    state_backend: str = STATE_BACKEND_JSON
+    state_db: str = ""
+    state_journal: Dict[str, Any] = field(default_factory=dict)
+    last_checked_interval_seconds: int = 0
+    rate_limit: Dict[str, Any] = field(default_factory=dict)
+    adaptive_concurrency: Dict[str, Any] = field(default_factory=dict)
+    retry: Dict[str, Any] = field(default_factory=dict)
+    circuit_breaker: Dict[str, Any] = field(default_factory=dict)
+    category_scrape: Dict[str, Any] = field(default_factory=dict)
+    availability_prefilter: Dict[str, Any] = field(default_factory=dict)
+    event_log: Dict[str, Any] = field(default_factory=dict)
 
 
 def _as_str_list(value: Any) -> List[str]:
@@ -659,6 +1387,13 @@ def _as_str_list(value: Any) -> List[str]:
     return [s] if s else []
 
 
+def resolve_last_checked_interval(value: Any, state_journal: Optional[Dict[str, Any]]) -> int:
+    if value is None:
+        journal_enabled = isinstance(state_journal, dict) and bool(state_journal.get("enabled", False))
+        return DEFAULT_JOURNAL_CHECKED_INTERVAL_SECONDS if journal_enabled else 0
+    return max(0, int(value or 0))
+
+
 def load_config_file(path: str) -> Dict[str, Any]:
     with open(path, "r", encoding="utf-8") as f:
         data = json.load(f)
@@ -684,6 +1419,24 @@ def build_config_from_file(data: Dict[str, Any]) -> StockWatchConfig:
         notify_on_first_run = True
     max_products = int(data.get("max_products") or 0)
     no_category_prefilter = bool(data.get("no_category_prefilter") or False)
+    fetch_concurrency = clamp_fetch_concurrency(data.get("fetch_concurrency", DEFAULT_FETCH_CONCURRENCY))
+    fetch_engine = parse_fetch_engine(data.get("fetch_engine"))
+    category_source = parse_category_source(data.get("category_source"))
+    async_max_in_flight = max(1, min(MAX_ASYNC_MAX_IN_FLIGHT, int(data.get("async_max_in_flight") or DEFAULT_ASYNC_MAX_IN_FLIGHT)))
+    http_cache = data.get("http_cache") if isinstance(data.get("http_cache"), dict) else {}
+    stream_next_data = bool(data.get("stream_next_data") or False)
+    pretty_state = bool(data.get("pretty_state") or False)
+    state_backend = parse_state_backend(data.get("state_backend"))
+    state_db = str(data.get("state_db") or os.path.join(data_dir, DEFAULT_SQLITE_FILENAME))
+    state_journal = data.get("state_journal") if isinstance(data.get("state_journal"), dict) else {}
+    last_checked_interval_seconds = resolve_last_checked_interval(data.get("last_checked_interval_seconds"), state_journal)
+    rate_limit_cfg = data.get("rate_limit") if isinstance(data.get("rate_limit"), dict) else {}
+    adaptive_concurrency = data.get("adaptive_concurrency") if isinstance(data.get("adaptive_concurrency"), dict) else {}
+    retry_cfg = data.get("retry") if isinstance(data.get("retry"), dict) else {}
+    circuit_breaker = data.get("circuit_breaker") if isinstance(data.get("circuit_breaker"), dict) else {}
+    category_scrape = data.get("category_scrape") if isinstance(data.get("category_scrape"), dict) else {}
+    availability_prefilter = data.get("availability_prefilter") if isinstance(data.get("availability_prefilter"), dict) else {}
+    event_log = data.get("event_log") if isinstance(data.get("event_log"), dict) else {}
 
     repeat = data.get("repeat") if isinstance(data.get("repeat"), dict) else {}
     max_notifications_per_item = int((repeat or {}).get("max_notifications_per_item") or data.get("max_notifications_per_item") or 1)
@@ -722,6 +1475,8 @@ def build_config_from_file(data: Dict[str, Any]) -> StockWatchConfig:
 
         watch_max_products = int(w.get("max_products") or max_products or 0)
         watch_no_prefilter = bool(w.get("no_category_prefilter") if "no_category_prefilter" in w else no_category_prefilter)
+        watch_fetch_concurrency = clamp_fetch_concurrency(w.get("fetch_concurrency", fetch_concurrency), fetch_concurrency)
+        watch_category_source = parse_category_source(w.get("category_source") or category_source)
 
         if not category_url and not product_urls:
             raise ValueError(f"watches[{idx}] must provide `category_url` or `product_urls`")
@@ -735,6 +1490,8 @@ def build_config_from_file(data: Dict[str, Any]) -> StockWatchConfig:
                 sizes=[s for s in sizes if s],
                 max_products=watch_max_products,
                 no_category_prefilter=watch_no_prefilter,
+                fetch_concurrency=watch_fetch_concurrency,
+                category_source=watch_category_source,
             )
         )
 
@@ -754,6 +1511,23 @@ def build_config_from_file(data: Dict[str, Any]) -> StockWatchConfig:
         notify_on_errors=notify_on_errors,
         error_repeat_interval_seconds=error_repeat_interval_seconds,
         watches=watches,
+        fetch_concurrency=fetch_concurrency,
+        fetch_engine=fetch_engine,
+        async_max_in_flight=async_max_in_flight,
+        http_cache=dict(http_cache or {}),
+        stream_next_data=stream_next_data,
+        pretty_state=pretty_state,
+        state_backend=state_backend,
+        state_db=state_db,
+        state_journal=dict(state_journal or {}),
+        last_checked_interval_seconds=last_checked_interval_seconds,
+        rate_limit=dict(rate_limit_cfg or {}),
+        adaptive_concurrency=dict(adaptive_concurrency or {}),
+        retry=dict(retry_cfg or {}),
+        circuit_breaker=dict(circuit_breaker or {}),
+        category_scrape=dict(category_scrape or {}),
+        availability_prefilter=dict(availability_prefilter or {}),
+        event_log=dict(event_log or {}),
     )
 
 
@@ -771,6 +1545,8 @@ def build_config_from_args(args: argparse.Namespace) -> StockWatchConfig:
         sizes=[args.size],
         max_products=args.max_products or 0,
         no_category_prefilter=bool(args.no_category_prefilter),
+        fetch_concurrency=clamp_fetch_concurrency(args.fetch_concurrency),
+        category_source=parse_category_source(args.category_source),
     )
 
     return StockWatchConfig(
@@ -789,93 +1565,332 @@ def build_config_from_args(args: argparse.Namespace) -> StockWatchConfig:
         notify_on_errors=DEFAULT_ERROR_NOTIFY_ENABLED,
         error_repeat_interval_seconds=DEFAULT_ERROR_NOTIFY_REPEAT_INTERVAL_SECONDS,
         watches=[watch],
+        fetch_concurrency=clamp_fetch_concurrency(args.fetch_concurrency),
+        fetch_engine=parse_fetch_engine(args.fetch_engine),
+        async_max_in_flight=max(1, min(MAX_ASYNC_MAX_IN_FLIGHT, int(args.async_max_in_flight))),
+        http_cache={"enabled": bool(args.http_cache)},
+        stream_next_data=bool(args.stream_next_data),
+        state_backend=parse_state_backend(args.state_backend),
+        state_db=args.state_db or os.path.join(data_dir, DEFAULT_SQLITE_FILENAME),
+        state_journal={"enabled": bool(args.state_journal)},
+        last_checked_interval_seconds=resolve_last_checked_interval(None, {"enabled": bool(args.state_journal)}),
+        rate_limit={
+            k: v
+            for k, v in {"requests_per_second": args.rate_limit_rps, "burst": args.rate_limit_burst}.items()
+            if v
+        },
+        adaptive_concurrency={"enabled": bool(args.adaptive_concurrency)},
+        retry={"max_attempts": args.retry_max_attempts},
+        category_scrape={"wait_mode": args.wait_mode},
+        availability_prefilter={"enabled": bool(args.availability_prefilter)},
+        event_log={"enabled": bool(args.event_log)},
     )
 
 
-def run_stock_watch(cfg: StockWatchConfig, *, dry_run: bool = False) -> int:
+class WatchFeed:
+    """
+    One watch's path from category discovery into the fetch queue: tiles go through the keyword
+    prefilter, the optional availability prefilter and `max_products` as they stream in, and
+    surviving URLs are submitted right away. Timings are measured from when the watch started discovery.
+    """
+
+    def __init__(
+        self,
+        watch: WatchSpec,
+        queue: ProductFetchQueue,
+        watches_by_url: Dict[str, List[WatchSpec]],
+        *,
+        store: Optional[StateStore] = None,
+        availability: Optional[AvailabilityPrefilter] = None,
+    ) -> None:
+        self.watch = watch
+        self.queue = queue
+        self.watches_by_url = watches_by_url
+        self.store = store
+        self.availability = availability
+        self.prefilter = bool(watch.keywords) and not watch.no_category_prefilter
+        self.started = time.monotonic()
+        self.seen: Set[str] = set()
+        self.accepted: Set[str] = set()
+        self.matched = 0
+        self.skipped_sold_out = 0
+        self.hints: Dict[str, str] = {}
+        self.product_urls: List[str] = []
+
+    def offer_tiles(self, tiles: Iterable[CategoryTile]) -> None:
+        for tile in tiles:
+            if tile.product_url in self.accepted:
+                continue
+            self.seen.add(tile.product_url)
+            # A streamed tile may still be missing its lazy-loaded description, so a keyword miss is
+            # not final: the URL is checked again when a fuller tile (or the returned list) arrives.
+            if self.prefilter and not tile_matches_keywords(tile, self.watch.keywords):
+                continue
+            self.accepted.add(tile.product_url)
+            self.matched += 1
+            self.hints[tile.product_url] = tile.availability
+            if self.availability is not None and self.store is not None and self.availability.should_skip(self.store, tile, self.watch.sizes):
+                self.skipped_sold_out += 1
+                continue
+            self.offer_url(tile.product_url)
+
+    def offer_url(self, product_url: str) -> None:
+        if self.watch.max_products and 0 < self.watch.max_products <= len(self.product_urls):
+            return
+        self.product_urls.append(product_url)
+        self.watches_by_url.setdefault(product_url, []).append(self.watch)
+        self.queue.submit(product_url)
+
+    def timings(self) -> Optional[Tuple[float, float]]:
+        """(time to first result, time to last result) in seconds, or None if nothing finished."""
+        done = [self.queue.finished_at[url] for url in self.product_urls if url in self.queue.finished_at]
+        if not done:
+            return None
+        return max(0.0, min(done) - self.started), max(0.0, max(done) - self.started)
+
+
+def run_stock_watch(cfg: StockWatchConfig, *, dry_run: bool = False, browser: Optional[BrowserSession] = None) -> int:
     os.makedirs(cfg.data_dir, exist_ok=True)
-    state_existed = os.path.exists(cfg.state_file)
-    state = load_state(cfg.state_file)
+    store = open_state_store(
+        cfg.state_backend,
+        state_file=cfg.state_file,
+        state_db=cfg.state_db,
+        pretty=cfg.pretty_state,
+        journal=build_journal_settings(cfg.state_journal),
+    )
+    events = build_event_log(cfg.event_log, data_dir=cfg.data_dir)
+    # A config's own `rate_limit` applies to this run only; under monitor_unified.py the process-wide
+    # limiter shared by the other tasks is restored afterwards.
+    limiter_scope = (
+        rate_limit.scoped(rate_limit.build_rate_limiter(cfg.rate_limit, data_dir=cfg.data_dir))
+        if cfg.rate_limit
+        else contextlib.nullcontext()
+    )
+    try:
+        with limiter_scope:
+            return _run_stock_watch(cfg, store, events, dry_run=dry_run, browser=browser)
+    finally:
+        try:
+            store.close()
+        finally:
+            if events is not None:
+                events.close()
+
+
+def _run_stock_watch(
+    cfg: StockWatchConfig,
+    store: StateStore,
+    events: Optional[EventLog],
+    *,
+    dry_run: bool,
+    browser: Optional[BrowserSession],
+) -> int:
+    state_existed = store.existed
+    run_started = time.monotonic()
 
     max_notifications_per_item = max(1, int(cfg.max_notifications_per_item))
     repeat_interval_seconds = max(0, int(cfg.repeat_interval_seconds))
     error_repeat_interval_seconds = max(0, int(cfg.error_repeat_interval_seconds))
     logger.info(
         "Config: "
-        f"data_dir={cfg.data_dir} state_file={cfg.state_file} "
+        f"data_dir={cfg.data_dir} state_backend={cfg.state_backend} "
+        f"state={cfg.state_db if cfg.state_backend == STATE_BACKEND_SQLITE else cfg.state_file} "
         f"max_notifications_per_item={max_notifications_per_item} repeat_interval_seconds={repeat_interval_seconds} "
         f"notify_on_errors={bool(cfg.notify_on_errors)} error_repeat_interval_seconds={error_repeat_interval_seconds}"
     )
+    journal = build_journal_settings(cfg.state_journal)
+    if journal is not None and cfg.state_backend == STATE_BACKEND_JSON:
+        logger.info(f"State journal: max_bytes={journal.max_bytes} max_ratio={journal.max_ratio:g} last_checked_interval_seconds={cfg.last_checked_interval_seconds}")
+        if cfg.last_checked_interval_seconds <= 0:
+            logger.warning(
+                "State journal with last_checked_interval_seconds=0: every checked entry changes each run, so the "
+                "journal compacts (rewrites the state file) on most saves; set a nonzero interval"
+            )
 
-    session = requests.Session()
+    fetch_engine = cfg.fetch_engine
+    if fetch_engine == FETCH_ENGINE_ASYNC and not AIOHTTP_AVAILABLE:
+        logger.warning("fetch_engine=async requested but aiohttp is not installed; falling back to threads")
+        fetch_engine = FETCH_ENGINE_THREADS
+    logger.info(f"Fetch engine: {fetch_engine} json_codec={json_codec.backend_name()}")
+
+    product_cache = build_product_cache(cfg.data_dir, cfg.http_cache)
+
+    limiter = rate_limit.get_rate_limiter()
+    if limiter is None:
+        logger.info("Rate limit: disabled")
+    else:
+        shared = f" shared_store={limiter.shared_store}" if limiter.shared_store else ""
+        logger.info(f"Rate limit: {limiter.default.requests_per_second:g} req/s burst={limiter.default.burst:g} per host{shared}")
+
+    # Product pages are fetched once per run on a shared pool, so it is sized for the busiest watch.
+    fetch_concurrency = max([w.fetch_concurrency for w in cfg.watches] + [cfg.fetch_concurrency])
+    concurrency_metrics_path = os.path.join(cfg.data_dir, DEFAULT_CONCURRENCY_METRICS_FILENAME)
+    controller = build_controller(
+        cfg.adaptive_concurrency,
+        initial_limit=fetch_concurrency,
+        max_limit=MAX_FETCH_CONCURRENCY if fetch_engine == FETCH_ENGINE_THREADS else cfg.async_max_in_flight,
+        metrics_path=concurrency_metrics_path,
+    )
+    if controller is not None:
+        logger.info(f"Adaptive concurrency: {controller.summary()}")
+    session = build_http_session(controller.settings.max_limit if controller is not None else fetch_concurrency)
+    retry_policy, retry_budget = build_retry_settings(cfg.retry)
+    breaker = build_circuit_breaker(cfg.circuit_breaker, store.get_meta("circuit_breakers"))
+    scrape_settings = ScrapeSettings.from_config(cfg.category_scrape, data_dir=cfg.data_dir)
+    logger.info(
+        f"Retry: max_attempts={retry_policy.max_attempts} base_delay={retry_policy.base_delay_seconds:g}s "
+        f"max_delay={retry_policy.max_delay_seconds:g}s budget={retry_budget.max_retries} retries/{retry_budget.max_delay_seconds:g}s"
+    )
 
     matched_results: List[StockResult] = []
     restock_events_by_watch: Dict[str, List[StockResult]] = {}
     errors: List[Tuple[str, str]] = []
     emitted_event_keys: Set[Tuple[str, str]] = set()
 
-    for watch in cfg.watches:
-        if watch.product_urls:
-            product_urls = list(dict.fromkeys([u.split("?")[0] for u in watch.product_urls if u]))
-            category_tiles: Optional[List[CategoryTile]] = None
-        else:
-            logger.info(f"[{watch.name}] Scraping product URLs from category page: {watch.category_url}")
-            try:
-                category_tiles = collect_product_tiles_from_category(
-                    watch.category_url,
-                    headless=not cfg.show_browser,
-                    render_wait_seconds=cfg.render_wait_seconds,
-                    scroll_times=cfg.scroll_times,
-                )
-            except Exception as e:
-                context = f"[{watch.name}] category_url={watch.category_url}"
-                errors.append((context, f"Category scrape failed: {e}"))
-                logger.warning(f"{context} Category scrape failed: {e}", exc_info=True)
-                continue
-
-            if not category_tiles:
-                context = f"[{watch.name}] category_url={watch.category_url}"
-                errors.append((context, "No products found on category page (possible blocking or page structure change)"))
-
-            if watch.keywords and not watch.no_category_prefilter:
-                filtered = [t for t in category_tiles if tile_matches_keywords(t, watch.keywords)]
-                logger.info(f"[{watch.name}] Category items: {len(category_tiles)}, keyword matches: {len(filtered)}")
-                category_tiles = filtered
+    if fetch_engine == FETCH_ENGINE_THREADS and controller is None:
+        logger.info(f"Fetch concurrency: {fetch_concurrency}")
+    # Discovery feeds the fetch queue directly, so product pages download while later category
+    # pages and watches are still rendering.
+    fetch_queue = ProductFetchQueue(
+        session,
+        engine=fetch_engine,
+        concurrency=fetch_concurrency,
+        async_max_in_flight=cfg.async_max_in_flight,
+        options=FetchOptions(
+            cache=product_cache,
+            stream_next_data=bool(cfg.stream_next_data),
+            controller=controller,
+            retry_policy=retry_policy,
+            retry_budget=retry_budget,
+            breaker=breaker,
+        ),
+    )
+    watches_by_url: Dict[str, List[WatchSpec]] = {}
+    feeds: List[WatchFeed] = []
+    availability = build_availability_prefilter(cfg.availability_prefilter)
+    if availability is not None:
+        logger.info(f"Availability prefilter: refresh_interval_seconds={availability.refresh_interval_seconds}")
+    owns_browser = browser is None
+    if browser is None:
+        browser = BrowserSession(
+            lambda: build_chrome_driver(not cfg.show_browser, scrape_settings),
+            max_pages=scrape_settings.browser_max_pages,
+            label="category",
+        )
+    try:
+        for watch in cfg.watches:
+            feed = WatchFeed(watch, fetch_queue, watches_by_url, store=store, availability=availability)
+            feeds.append(feed)
+            if watch.product_urls:
+                for url in dict.fromkeys([u.split("?")[0] for u in watch.product_urls if u]):
+                    feed.offer_url(url)
             else:
-                logger.info(f"[{watch.name}] Category items: {len(category_tiles)} (no keyword prefilter)")
-
-            product_urls = [t.product_url for t in category_tiles]
-
-        if watch.max_products and watch.max_products > 0:
-            product_urls = product_urls[: watch.max_products]
+                discovered: Optional[List[CategoryTile]] = None
+                if watch.category_source == CATEGORY_SOURCE_HTTP:
+                    logger.info(f"[{watch.name}] Reading category listing over HTTP: {watch.category_url}")
+                    try:
+                        discovered = category_tiles_from_scraped(
+                            fetch_category_tiles_http(
+                                session,
+                                watch.category_url,
+                                max_pages=scrape_settings.http_max_pages,
+                                page_param=scrape_settings.http_page_param,
+                                on_tiles=lambda raw, feed=feed: feed.offer_tiles(category_tiles_from_scraped(raw)),
+                            )
+                        )
+                    except Exception as e:
+                        logger.warning(f"[{watch.name}] HTTP category discovery failed ({e}); falling back to the browser")
 
-        logger.info(f"[{watch.name}] Products to check: {len(product_urls)}")
-        logger.info(f"[{watch.name}] Keywords: {watch.keywords or '(none)'}")
-        logger.info(f"[{watch.name}] Target sizes: {watch.sizes or '(none)'}")
+                if discovered is None:
+                    logger.info(f"[{watch.name}] Scraping product URLs from category page: {watch.category_url}")
+                    try:
+                        discovered = collect_product_tiles_from_category(
+                            watch.category_url,
+                            headless=not cfg.show_browser,
+                            render_wait_seconds=cfg.render_wait_seconds,
+                            scroll_times=cfg.scroll_times,
+                            scrape=scrape_settings,
+                            browser=browser,
+                            on_tiles=feed.offer_tiles,
+                        )
+                    except Exception as e:
+                        context = f"[{watch.name}] category_url={watch.category_url}"
+                        errors.append((context, f"Category scrape failed: {e}"))
+                        logger.warning(f"{context} Category scrape failed: {e}", exc_info=True)
+                        continue
+                # Snapshot hits and non-streaming extraction only return the full list; tiles
+                # already streamed are skipped.
+                feed.offer_tiles(discovered)
+
+                if not feed.seen:
+                    context = f"[{watch.name}] category_url={watch.category_url}"
+                    errors.append((context, "No products found on category page (possible blocking or page structure change)"))
+                if feed.prefilter:
+                    logger.info(f"[{watch.name}] Category items: {len(feed.seen)}, keyword matches: {feed.matched}")
+                else:
+                    logger.info(f"[{watch.name}] Category items: {len(feed.seen)} (no keyword prefilter)")
+                if feed.skipped_sold_out:
+                    logger.info(f"[{watch.name}] Availability prefilter: skipped {feed.skipped_sold_out} sold-out product(s) already out of stock in state")
 
-        for url in product_urls:
-            try:
-                product = fetch_product_json(session, url)
-                if not product:
-                    context = f"[{watch.name}] {url}"
-                    errors.append((context, "Unable to parse product JSON (missing __NEXT_DATA__ or product payload)"))
-                    logger.warning(f"[{watch.name}] Skipped (unable to parse product JSON): {url}")
-                    continue
+            logger.info(f"[{watch.name}] Products to check: {len(feed.product_urls)}")
+            logger.info(f"[{watch.name}] Keywords: {watch.keywords or '(none)'}")
+            logger.info(f"[{watch.name}] Target sizes: {watch.sizes or '(none)'}")
+    finally:
+        try:
+            if owns_browser:
+                browser.close()
+        finally:
+            fetch_queue.close()
+    if browser.pages:
+        logger.info(f"Category browser: {browser.summary()}")
+
+    requested_total = sum(len(feed.product_urls) for feed in feeds)
+    logger.info(f"Distinct products fetched: {len(watches_by_url)} (requested across watches: {requested_total})")
+    for feed in feeds:
+        timing = feed.timings()
+        if timing is not None:
+            first, total = timing
+            logger.info(f"[{feed.watch.name}] Time to first result: {first:.2f}s, total: {total:.2f}s ({len(feed.product_urls)} products)")
+
+    # (product_url, size_label) -> (result, previous_in_stock), so overlapping watches share one
+    # state update and all see the pre-run stock status.
+    evaluated: Dict[Tuple[str, str], Tuple[StockResult, Optional[bool]]] = {}
+
+    for url, future in fetch_queue.futures.items():
+        watch_label = ",".join(w.name for w in watches_by_url[url])
+        try:
+            product = future.result()
+            if not product:
+                context = f"[{watch_label}] {url}"
+                errors.append((context, "Unable to parse product JSON (missing __NEXT_DATA__ or product payload)"))
+                logger.warning(f"[{watch_label}] Skipped (unable to parse product JSON): {url}")
+                continue
 
+            for watch in watches_by_url[url]:
                 if not product_matches_keywords(product, watch.keywords):
                     continue
 
                 for size_label in watch.sizes:
-                    result = compute_stock_for_size(product, size_label)
-                    matched_results.append(result)
-
-                    previous_in_stock = get_previous_in_stock(state, result.product_url, result.size_label)
-                    update_state_with_result(state, result)
+                    cached = evaluated.get((url, size_label))
+                    if cached is None:
+                        result = compute_stock_for_size(product, size_label)
+                        matched_results.append(result)
+
+                        previous_in_stock = get_previous_in_stock(store, result.product_url, result.size_label)
+                        update_state_with_result(
+                            store,
+                            result,
+                            checked_interval_seconds=cfg.last_checked_interval_seconds,
+                            events=events,
+                        )
+                        evaluated[(url, size_label)] = (result, previous_in_stock)
+                    else:
+                        result, previous_in_stock = cached
 
                     if not result.in_stock:
                         continue
 
-                    size_state = get_size_state(state, result.product_url, result.size_label) or {}
+                    size_state = store.get_size(result.product_url, result.size_label) or {}
                     try:
                         notify_count = int(size_state.get("notify_count") or 0)
                     except Exception:
@@ -900,26 +1915,66 @@ def run_stock_watch(cfg: StockWatchConfig, *, dry_run: bool = False) -> int:
                             emitted_event_keys.add(key)
                             restock_events_by_watch.setdefault(watch.name, []).append(result)
 
-            except requests.exceptions.HTTPError as e:
-                status_code = getattr(getattr(e, "response", None), "status_code", None)
-                status_part = f"HTTP {status_code}" if status_code else "HTTP error"
-                context = f"[{watch.name}] {url}"
-                errors.append((context, f"{status_part}: {e}"))
-                logger.warning(f"[{watch.name}] Failed: {url} ({status_part}: {e})")
-                continue
-            except requests.exceptions.RequestException as e:
-                context = f"[{watch.name}] {url}"
-                errors.append((context, f"Request error: {e}"))
-                logger.warning(f"[{watch.name}] Failed: {url} (Request error: {e})")
-                continue
-            except Exception as e:
-                context = f"[{watch.name}] {url}"
-                errors.append((context, str(e)))
-                logger.warning(f"[{watch.name}] Failed: {url} ({e})")
-                continue
+        except CircuitOpenError:
+            # Reported once per host below instead of once per skipped URL.
+            continue
+        except requests.exceptions.HTTPError as e:
+            status_code = getattr(getattr(e, "response", None), "status_code", None)
+            status_part = f"HTTP {status_code}" if status_code else "HTTP error"
+            context = f"[{watch_label}] {url}"
+            errors.append((context, f"{status_part}: {e}"))
+            logger.warning(f"[{watch_label}] Failed: {url} ({status_part}: {e})")
+            continue
+        except requests.exceptions.RequestException as e:
+            context = f"[{watch_label}] {url}"
+            errors.append((context, f"Request error: {e}"))
+            logger.warning(f"[{watch_label}] Failed: {url} (Request error: {e})")
+            continue
+        except Exception as e:
+            context = f"[{watch_label}] {url}"
+            errors.append((context, str(e)))
+            logger.warning(f"[{watch_label}] Failed: {url} ({e})")
+            continue
+
+    if breaker is not None:
+        for host, skipped in sorted(breaker.skipped_by_host().items()):
+            context = f"host={host}"
+            message = f"Circuit breaker open: skipped {skipped} product page(s) ({breaker.reason_for(host)})"
+            errors.append((context, message))
+            logger.warning(f"{context} {message}")
+        store.set_meta("circuit_breakers", breaker.to_state())
+
+    if availability is not None:
+        for feed in feeds:
+            record_tile_availability(store, feed.hints)
+
+    store.set_meta("updated_at", utc_now_iso())
+    store.save()
+
+    if events is not None:
+        for context, msg in errors:
+            events.record(EVENT_ERROR, context=context, message=msg)
+        events.record(
+            EVENT_RUN,
+            products=len(watches_by_url),
+            results=len(evaluated),
+            errors=len(errors),
+            duration_seconds=round(time.monotonic() - run_started, 2),
+        )
+
+    if limiter is not None:
+        logger.info(f"Rate limit: {limiter.summary()}")
 
-    state["updated_at"] = utc_now_iso()
-    save_state(cfg.state_file, state)
+    if controller is not None:
+        logger.info(f"Adaptive concurrency: {controller.summary()}")
+        try:
+            controller.export(concurrency_metrics_path)
+        except Exception:
+            logger.warning(f"Failed to export adaptive concurrency metrics: {concurrency_metrics_path}", exc_info=True)
+
+    if product_cache is not None:
+        evicted, cache_bytes = product_cache.prune()
+        logger.info(f"HTTP cache: {product_cache.summary()} evicted={evicted} size_bytes={cache_bytes}")
 
     logger.info(f"Keyword-matched products: {len(matched_results)}")
     for r in matched_results:
@@ -928,6 +1983,8 @@ def run_stock_watch(cfg: StockWatchConfig, *, dry_run: bool = False) -> int:
         colour_str = f" colours={list(r.in_stock_colours)}" if r.in_stock_colours else ""
         logger.info(f"- {r.name} size={r.size_label} {stock_str}{colour_str} price={price_str or 'N/A'} url={r.product_url}")
 
+    logger.info(f"Retries: {retry_budget.summary()}")
+
     if errors:
         logger.info(f"Errors: {len(errors)}")
         for context, msg in errors[:10]:
@@ -944,15 +2001,17 @@ def run_stock_watch(cfg: StockWatchConfig, *, dry_run: bool = False) -> int:
                 else:
                     signature = compute_error_signature(errors)
                     if should_send_error_notification(
-                        state=state,
+                        store=store,
                         signature=signature,
                         repeat_interval_seconds=error_repeat_interval_seconds,
                     ):
                         text = build_error_notification_text(errors=errors, log_file=cfg.log_file)
                         ok = notifier.send_message(text, disable_web_page_preview=True)
                         if ok:
-                            record_error_notification_sent(state, signature=signature)
-                            save_state(cfg.state_file, state)
+                            record_error_notification_sent(store, signature=signature)
+                            store.save()
+                            if events is not None:
+                                events.record(EVENT_NOTIFY, channel="errors", errors=len(errors))
                         else:
                             logger.warning("Telegram error notification failed to send")
             except Exception:
@@ -977,11 +2036,11 @@ def run_stock_watch(cfg: StockWatchConfig, *, dry_run: bool = False) -> int:
     all_ok = True
     state_changed_after_notify = False
     for watch in cfg.watches:
-        events = restock_events_by_watch.get(watch.name) or []
-        if not events:
+        alerts = restock_events_by_watch.get(watch.name) or []
+        if not alerts:
             continue
 
-        logger.info(f"[{watch.name}] Sending restock alerts: {len(events)}")
+        logger.info(f"[{watch.name}] Sending restock alerts: {len(alerts)}")
         size_label = watch.sizes[0] if len(watch.sizes) == 1 else ""
         ok = send_stock_notification(
             [
@@ -991,9 +2050,9 @@ def run_stock_watch(cfg: StockWatchConfig, *, dry_run: bool = False) -> int:
                     "size": r.size_label,
                     "colours": list(r.in_stock_colours),
                     "price": format_price(r.currency, r.discount_price or r.price),
-                    "note": build_notify_note(state, r, max_notifications_per_item=max_notifications_per_item),
+                    "note": build_notify_note(store, r, max_notifications_per_item=max_notifications_per_item),
                 }
-                for r in events
+                for r in alerts
             ],
             size_label=size_label,
             keywords=watch.keywords,
@@ -1001,13 +2060,15 @@ def run_stock_watch(cfg: StockWatchConfig, *, dry_run: bool = False) -> int:
             title=f"🏔️ Arc'teryx Outlet Restock Alert: {watch.name}",
         )
         if ok:
-            for r in events:
-                record_notification_sent(state, r)
+            for r in alerts:
+                record_notification_sent(store, r)
+                if events is not None:
+                    events.record(EVENT_NOTIFY, channel="restock", watch=watch.name, url=r.product_url, size=r.size_label)
             state_changed_after_notify = True
         all_ok = all_ok and ok
 
     if state_changed_after_notify:
-        save_state(cfg.state_file, state)
+        store.save()
 
     return 0 if all_ok else 1
 
@@ -1031,18 +2092,82 @@ def main() -> int:
 
     parser.add_argument("--data-dir", type=str, default=DEFAULT_DATA_DIR, help="Data directory (default: data/)")
     parser.add_argument("--state-file", type=str, default="", help="State file path (default: data/stock_watch_state.json)")
+    parser.add_argument(
+        "--state-backend",
+        choices=list(STATE_BACKENDS),
+        default=STATE_BACKEND_JSON,
+        help="State storage: json (one file, default) or sqlite (seeded once from the JSON state file if present)",
+    )
+    parser.add_argument("--state-db", type=str, default="", help=f"SQLite state path (default: data/{DEFAULT_SQLITE_FILENAME})")
+    parser.add_argument(
+        "--state-journal",
+        action="store_true",
+        help="JSON state: append changed entries to a journal and rewrite the state file only on compaction",
+    )
     parser.add_argument("--log-file", type=str, default="", help=f"Log file path (default: {DEFAULT_LOG_FILE})")
     parser.add_argument("--log-level", type=str, default="INFO", help="Log level (DEBUG/INFO/WARNING/ERROR)")
 
     parser.add_argument("--show-browser", action="store_true", help="Show browser window (debug category scraping)")
     parser.add_argument("--render-wait-seconds", type=int, default=10, help="Seconds to wait for category page rendering")
     parser.add_argument("--scroll-times", type=int, default=3, help="How many times to scroll the category page")
+    parser.add_argument(
+        "--category-source",
+        choices=list(CATEGORY_SOURCES),
+        default=CATEGORY_SOURCE_BROWSER,
+        help="Discover category products by rendering the page (browser) or from its Next.js data over plain HTTP, falling back to the browser",
+    )
+    parser.add_argument(
+        "--wait-mode",
+        choices=list(WAIT_MODES),
+        default=WAIT_MODE_FIXED,
+        help="Category page wait: fixed sleeps (render wait + scroll times), ready (wait for tiles, scroll until the count is stable) or harvest (extract after every scroll step)",
+    )
     parser.add_argument("--max-products", type=int, default=0, help="Max number of products to check (0 = no limit)")
+    parser.add_argument(
+        "--fetch-concurrency",
+        type=int,
+        default=DEFAULT_FETCH_CONCURRENCY,
+        help=f"Parallel product-page fetches (default: {DEFAULT_FETCH_CONCURRENCY}, max: {MAX_FETCH_CONCURRENCY})",
+    )
+    parser.add_argument(
+        "--retry-max-attempts",
+        type=int,
+        default=RetryPolicy.max_attempts,
+        help=f"Attempts per product page on transient errors (default: {RetryPolicy.max_attempts}; 1 = no retries)",
+    )
+    parser.add_argument(
+        "--adaptive-concurrency",
+        action="store_true",
+        help="Adjust in-flight product fetches automatically (AIMD on latency and HTTP 429/403/timeouts)",
+    )
+    parser.add_argument(
+        "--fetch-engine",
+        type=str,
+        choices=list(FETCH_ENGINES),
+        default=FETCH_ENGINE_THREADS,
+        help="Product fetch backend: threads (requests.Session) or async (aiohttp event loop)",
+    )
+    parser.add_argument(
+        "--async-max-in-flight",
+        type=int,
+        default=DEFAULT_ASYNC_MAX_IN_FLIGHT,
+        help=f"Max in-flight requests for --fetch-engine async (default: {DEFAULT_ASYNC_MAX_IN_FLIGHT})",
+    )
     parser.add_argument(
         "--no-category-prefilter",
         action="store_true",
         help="Disable category-page keyword prefilter; fetch all product pages then match keywords (more requests, more coverage)",
     )
+    parser.add_argument(
+        "--availability-prefilter",
+        action="store_true",
+        help="Skip product pages whose category tile shows sold out while every watched size is already out of stock in state",
+    )
+    parser.add_argument(
+        "--event-log",
+        action="store_true",
+        help="Append stock transitions, price changes, notifications and errors to data/events (see event_log.py query)",
+    )
 
     parser.add_argument(
         "--notify-on-first-run",
@@ -1059,6 +2184,30 @@ def main() -> int:
     )
     parser.add_argument("--max-notifications-per-item", type=int, default=1, help="Max alerts per product+size per restock cycle")
     parser.add_argument("--repeat-interval-seconds", type=int, default=0, help="Minimum seconds between repeated alerts (0 = no limit)")
+    parser.add_argument(
+        "--rate-limit-rps",
+        type=float,
+        default=0,
+        help=f"Max requests per second per host (default: {rate_limit.DEFAULT_REQUESTS_PER_SECOND:g})",
+    )
+    parser.add_argument(
+        "--rate-limit-burst",
+        type=int,
+        default=0,
+        help=f"Token-bucket burst size per host (default: {rate_limit.DEFAULT_BURST})",
+    )
+    parser.add_argument(
+        "--no-http-cache",
+        dest="http_cache",
+        action="store_false",
+        help="Disable the conditional-request (ETag / Last-Modified) product page cache",
+    )
+    parser.set_defaults(http_cache=True)
+    parser.add_argument(
+        "--stream-next-data",
+        action="store_true",
+        help="Stream product pages and stop reading once the __NEXT_DATA__ script tag closes",
+    )
     parser.add_argument("--dry-run", action="store_true", help="Do everything except sending Telegram")
 
     args = parser.parse_args()